@@ -0,0 +1,183 @@
+"""
+Streaming NDJSON bulk analysis for backfills.
+
+The request body is read incrementally and split into lines; records are analyzed in chunks of
+`chunk_size` through the batch pipeline and each chunk's results are streamed back as NDJSON as soon
+as it finishes. Memory stays bounded by a handful of chunks regardless of upload size:
+
+- a reader task parses the body and runs chunks, handing finished chunks to a queue of at most
+  `max_pending_chunks`;
+- the response drains that queue. When the client reads slowly, ASGI `send` blocks, the queue fills,
+  the reader stops pulling the request body, and TCP flow control pushes back on the uploader.
+"""
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from starlette.requests import ClientDisconnect
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.models.request_models import AnalysisRequestPayload, AnalysisResponse, AnalysisResult, StreamAnalysisError
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+AnalyzeChunk = Callable[[List[str]], Awaitable[List[Dict[str, Any]]]]
+AnalyzeOne = Callable[[str], Awaitable[Dict[str, Any]]]
+
+_END = object() # Queue sentinel: the reader is done
+
+
+class LineTooLong(ValueError):
+    pass
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Tuple[int, bytes]]:
+    """Splits a byte stream into (line number, line) pairs without ever buffering more than one line."""
+    buffer = bytearray()
+    line_number = 0
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        start = 0
+        while True:
+            newline = buffer.find(b"\n", start)
+            if newline < 0:
+                break
+            line_number += 1
+            yield line_number, bytes(buffer[start:newline])
+            start = newline + 1
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            raise LineTooLong(f"Line {line_number + 1} exceeds {max_line_bytes} bytes")
+    if buffer.strip():
+        yield line_number + 1, bytes(buffer)
+
+
+def _error_line(line_number: int, task_id: Optional[str], status: str, error: str) -> bytes:
+    return StreamAnalysisError(line=line_number, task_id=task_id, status=status, error=error).model_dump_json().encode("utf-8") + b"\n"
+
+
+def _result_line(task_id: str, analysis_result: Dict[str, Any]) -> bytes:
+    response = AnalysisResponse(task_id=task_id, status="processed_sync", analysis_output=AnalysisResult(**analysis_result))
+    return response.model_dump_json(by_alias=True).encode("utf-8") + b"\n"
+
+
+def _task_id_of(line: bytes) -> Optional[str]:
+    # Best effort, so a client can match an "invalid" line to its record
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    task_id = record.get("task_id") if isinstance(record, dict) else None
+    return task_id if isinstance(task_id, str) else None
+
+
+# One input record: its line number, and either the parsed payload or a ready-made error line
+Entry = Tuple[int, Optional[AnalysisRequestPayload], Optional[bytes]]
+
+
+async def _analyze_records(records: List[Tuple[int, AnalysisRequestPayload]], analyze_chunk: AnalyzeChunk,
+                           analyze_one: AnalyzeOne) -> List[bytes]:
+    try:
+        results = await analyze_chunk([payload.text_content for _, payload in records])
+        return [_result_line(payload.task_id, result) for (_, payload), result in zip(records, results)]
+    except Exception as e:
+        # One bad text must not fail its neighbours: retry item by item to isolate the failure
+        logger.warning(f"(Stream) Chunk of {len(records)} records failed ({e}), falling back to per-record processing.")
+    lines = []
+    for line_number, payload in records:
+        try:
+            lines.append(_result_line(payload.task_id, await analyze_one(payload.text_content)))
+        except Exception as e:
+            logger.error(f"(Stream) Error processing task {payload.task_id}: {e}", exc_info=True)
+            lines.append(_error_line(line_number, payload.task_id, "failed", str(e)))
+    return lines
+
+
+async def _analyze_chunk(entries: List[Entry], analyze_chunk: AnalyzeChunk, analyze_one: AnalyzeOne) -> bytes:
+    """Analyzes the valid records of a chunk in one batch call; output keeps the input line order."""
+    records = [(line_number, payload) for line_number, payload, _ in entries if payload is not None]
+    result_lines = iter(await _analyze_records(records, analyze_chunk, analyze_one) if records else [])
+    return b"".join(error if payload is None else next(result_lines) for _, payload, error in entries)
+
+
+async def _read_and_analyze(body: AsyncIterator[bytes], analyze_chunk: AnalyzeChunk, analyze_one: AnalyzeOne,
+                            chunk_size: int, max_line_bytes: int, output: "asyncio.Queue"):
+    entries: List[Entry] = []
+
+    async def flush():
+        nonlocal entries
+        if entries:
+            block = await _analyze_chunk(entries, analyze_chunk, analyze_one)
+            entries = []
+            await output.put(block) # Blocks while the client is behind: this is the backpressure point
+
+    cancelled = False
+    try:
+        async for line_number, line in iter_lines(body, max_line_bytes):
+            if not line.strip():
+                continue
+            try:
+                entries.append((line_number, AnalysisRequestPayload.model_validate_json(line), None))
+            except ValidationError as e:
+                entries.append((line_number, None, _error_line(
+                    line_number, _task_id_of(line), "invalid", str(e.errors()[0]["msg"])
+                )))
+            if len(entries) >= chunk_size:
+                await flush()
+        await flush()
+    except LineTooLong as e:
+        await flush()
+        await output.put(_error_line(0, None, "invalid", str(e)))
+    except ClientDisconnect:
+        logger.info("(Stream) Client disconnected during upload")
+    except asyncio.CancelledError:
+        cancelled = True
+        raise
+    finally:
+        # The response drains the queue until it sees the end marker, so wait for space like any block
+        # (a slow client keeps it full). Only a cancelled reader skips it: the response is gone, and
+        # nothing would ever make room.
+        if not cancelled:
+            await output.put(_END)
+
+
+async def stream_analysis(body: AsyncIterator[bytes], analyze_chunk: AnalyzeChunk, analyze_one: AnalyzeOne,
+                          chunk_size: int = 64, max_pending_chunks: int = 2,
+                          max_line_bytes: int = 1024 * 1024) -> AsyncIterator[bytes]:
+    """Yields NDJSON result lines, one block per analyzed chunk, in input order."""
+    output: "asyncio.Queue" = asyncio.Queue(maxsize=max_pending_chunks)
+    reader = asyncio.create_task(
+        _read_and_analyze(body, analyze_chunk, analyze_one, chunk_size, max_line_bytes, output)
+    )
+    try:
+        while True:
+            block = await output.get()
+            if block is _END:
+                break
+            yield block
+        await reader # Surface unexpected reader errors
+    finally:
+        if not reader.done():
+            reader.cancel() # The response was abandoned (client gone): stop reading and analyzing
+            await asyncio.wait({reader}) # Let it unwind, without swallowing a cancellation of this task
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for full-duplex use. The stock response listens for client disconnects on
+    `receive` (for ASGI < 2.4), which would steal request body messages still being read by
+    stream_analysis; here the body reader alone owns `receive` and notices disconnects itself.
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect()
@@ -0,0 +1,192 @@
+"""
+Asynchronous, batched status callbacks to Laravel.
+
+Status updates are buffered in a bounded in-memory queue and sent by a background thread as one bulk
+POST per flush over a pooled keep-alive session, so the consumer loop never waits on Laravel. Several
+updates for the same task inside one flush are coalesced into the latest one (typically "processing"
+is superseded by "completed"). Transient failures (connection errors, 5xx) are retried with
+exponential backoff; once retries are exhausted, or Laravel rejects the payload, `on_failed` runs.
+Laravel validates each update on its own and lists malformed ones in `rejected`: only those fail, the
+rest of the batch is delivered.
+The body is JSON or msgpack (`wire_format`), encoded once per flush (see app/wire_format.py).
+"""
+import logging
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.metrics import CALLBACK_DURATION, CALLBACK_UPDATES
+from app.wire_format import encode_status_updates
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StatusUpdate:
+    task_id: str
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    on_delivered: List[Callable[[], None]] = field(default_factory=list)
+    on_failed: List[Callable[[], None]] = field(default_factory=list)
+
+
+def _run_hooks(hooks: List[Callable[[], None]]):
+    for hook in hooks:
+        try:
+            hook()
+        except Exception as e:
+            logger.error(f"Status callback hook failed: {e}", exc_info=True)
+
+
+class CallbackDispatcher:
+    def __init__(self, bulk_url: str, max_batch_size: int = 100, flush_interval_ms: int = 50,
+                 max_buffer: int = 10000, max_retries: int = 5, backoff_base: float = 0.5,
+                 backoff_max: float = 10.0, timeout: float = 10.0, session: Optional[requests.Session] = None,
+                 wire_format: str = "json"):
+        self.bulk_url = bulk_url
+        self.wire_format = wire_format
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.session = session or self._build_session()
+        self._buffer: "queue.Queue[StatusUpdate]" = queue.Queue(maxsize=max_buffer)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.delivered = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @staticmethod
+    def _build_session() -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4) # One host, reused keep-alive connections
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="laravel-callbacks", daemon=True)
+        self._thread.start()
+
+    def submit(self, task_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+               on_delivered: Optional[Callable[[], None]] = None, on_failed: Optional[Callable[[], None]] = None):
+        """Queues a status update without blocking. A full buffer fails the update immediately."""
+        update = StatusUpdate(
+            task_id, status, result,
+            on_delivered=[on_delivered] if on_delivered else [],
+            on_failed=[on_failed] if on_failed else [],
+        )
+        try:
+            self._buffer.put_nowait(update)
+        except queue.Full:
+            self.dropped += 1
+            CALLBACK_UPDATES.inc(outcome="dropped")
+            logger.error(f"Callback buffer full, dropping {status} update for task {task_id}")
+            _run_hooks(update.on_failed)
+
+    def pending(self) -> int:
+        return self._buffer.qsize()
+
+    def close(self, timeout: float = 30.0):
+        """Flushes everything still buffered (within `timeout` seconds), then stops the sender thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+        self.session.close()
+
+    def _collect_batch(self) -> List[StatusUpdate]:
+        try:
+            batch = [self._buffer.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._buffer.get(timeout=remaining))
+                else:
+                    batch.append(self._buffer.get_nowait()) # Linger is over, only take what is already there
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _coalesce(batch: List[StatusUpdate]) -> List[StatusUpdate]:
+        latest: Dict[str, StatusUpdate] = {}
+        for update in batch:
+            previous = latest.pop(update.task_id, None)
+            if previous:
+                # Superseded updates are delivered (or failed) together with the one that replaces them
+                update.on_delivered = previous.on_delivered + update.on_delivered
+                update.on_failed = previous.on_failed + update.on_failed
+            latest[update.task_id] = update
+        return list(latest.values())
+
+    def _run(self):
+        while not (self._stop.is_set() and self._buffer.empty()):
+            batch = self._collect_batch()
+            if batch:
+                self._send(self._coalesce(batch))
+
+    def _send(self, updates: List[StatusUpdate]):
+        body, content_type = encode_status_updates(
+            ((update.task_id, update.status, update.result) for update in updates), self.wire_format
+        )
+        for attempt in range(self.max_retries + 1):
+            try:
+                with CALLBACK_DURATION.time(endpoint="bulk"):
+                    response = self.session.post(
+                        self.bulk_url, data=body, headers={"Content-Type": content_type}, timeout=self.timeout
+                    )
+                if response.status_code < 500:
+                    response.raise_for_status() # 4xx: Laravel rejected the payload, retrying won't help
+                    rejected_ids = self._rejected_ids(response)
+                    delivered = [update for update in updates if update.task_id not in rejected_ids]
+                    self.delivered += len(delivered)
+                    CALLBACK_UPDATES.inc(len(delivered), outcome="delivered")
+                    logger.info(f"Delivered {len(delivered)} status updates to Laravel")
+                    for update in delivered:
+                        _run_hooks(update.on_delivered)
+                    rejected = [update for update in updates if update.task_id in rejected_ids]
+                    if rejected:
+                        logger.error(f"Laravel rejected status updates for tasks {[u.task_id for u in rejected]}")
+                        self._fail(rejected)
+                    return
+                logger.warning(f"Laravel bulk update returned {response.status_code} (attempt {attempt + 1})")
+            except requests.exceptions.HTTPError as e:
+                logger.error(f"Laravel rejected {len(updates)} status updates: {e}")
+                break
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Laravel bulk update failed (attempt {attempt + 1}): {e}")
+            if attempt < self.max_retries:
+                backoff = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                time.sleep(backoff * random.uniform(0.5, 1.0)) # Jitter so restarted workers don't retry in lockstep
+
+        logger.error(f"Giving up on {len(updates)} status updates for tasks {[u.task_id for u in updates]}")
+        self._fail(updates)
+
+    @staticmethod
+    def _rejected_ids(response: requests.Response) -> set:
+        """Task IDs of the updates Laravel refused individually (none if the body doesn't say)."""
+        try:
+            body = response.json()
+        except ValueError:
+            return set()
+        rejected = body.get("rejected") if isinstance(body, dict) else None
+        return {task_id for task_id in rejected if isinstance(task_id, str)} if isinstance(rejected, list) else set()
+
+    def _fail(self, updates: List[StatusUpdate]):
+        self.failed += len(updates)
+        CALLBACK_UPDATES.inc(len(updates), outcome="failed")
+        for update in updates:
+            _run_hooks(update.on_failed)
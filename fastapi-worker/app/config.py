@@ -9,16 +9,100 @@ class Settings(BaseSettings):
 
     # AI Model Configurations (for plug-in architecture)
     SUMMARIZER_MODEL_TYPE: str = "gpt_summarizer" # Options: "gpt_summarizer", "hf_summarizer", "rule_based_summarizer"
-    SENTIMENT_MODEL_TYPE: str = "hf_sentiment_analyzer" # Options: "hf_sentiment_analyzer", "custom_sentiment_analyzer"
-    KEYWORD_EXTRACTOR_TYPE: str = "keybert_extractor" # Options: "keybert_extractor", "llm_keyword_extractor"
-    INTENT_RECOGNIZER_TYPE: str = "openai_function_calling_recognizer" # Options: "openai_function_calling_recognizer", "custom_intent_recognizer"
+    SENTIMENT_MODEL_TYPE: str = "hf_sentiment_analyzer" # Options: "hf_sentiment_analyzer", "onnx_sentiment_analyzer", "custom_sentiment_analyzer"
+    KEYWORD_EXTRACTOR_TYPE: str = "keybert_extractor" # Options: "keybert_extractor", "aho_corasick_extractor", "onnx_keyword_extractor", "llm_keyword_extractor"
+    INTENT_RECOGNIZER_TYPE: str = "openai_function_calling_recognizer" # Options: "openai_function_calling_recognizer", "aho_corasick_recognizer", "custom_intent_recognizer"
 
     SENTIMENT_MODEL_NAME: str = "distilbert-base-uncased-finetuned-sst2" # Specific HF model name
+    RECOMMENDER_RELOAD_INTERVAL_SECONDS: float = 30.0 # How often products.json/segments.json are checked for changes (0 = never)
+    RECOMMENDER_MAX_PRODUCTS: int = 3
+    TERM_DICTIONARY_PATH: str = "/app/data/term_dictionary.json" # Terms for the aho_corasick_* strategies
+
+    # onnx_* strategies: int8 models written by benchmarks/export_onnx.py, run with length-bucketed batches.
+    # Keep one intra-op thread per process when the supervisor forks several consumers.
+    ONNX_SENTIMENT_MODEL_DIR: str = "/app/models/sentiment-int8"
+    ONNX_KEYWORD_MODEL_DIR: str = "/app/models/keywords-int8"
+    ONNX_MAX_SEQUENCE_LENGTH: int = 256 # Tokens per text; longer texts are truncated (chunking keeps windows short)
+    ONNX_MAX_BATCH_SIZE: int = 32
+    ONNX_MAX_BATCH_TOKENS: int = 8192 # Padded tokens per inference call
+    ONNX_INTRA_OP_THREADS: int = 1
+
+    # Strategies are constructed on first use; warm-up loads them all and runs a sample before serving
+    # (consumers: in the supervisor before forking; API: in the background, reported by /ready)
+    LAZY_MODULE_LOADING: bool = True
+    WARMUP_ON_STARTUP: bool = True
+
+    # Pipeline execution: "sequential" or "concurrent" (fan out summary/sentiment/keywords/intent to threads)
+    PIPELINE_EXECUTION_MODE: str = "sequential"
+    PIPELINE_STAGE_TIMEOUT_SECONDS: float = 30.0
+    PIPELINE_STAGE_TIMEOUTS: str = "" # Per-stage overrides, e.g. "summarize=20,intent=10"
+
+    # Long texts: split into sentence-aligned windows of CHUNK_MAX_TOKENS, analyzed in parallel and merged
+    CHUNKING_ENABLED: bool = True
+    CHUNK_MAX_TOKENS: int = 1500
+    CHUNK_MAP_WORKERS: int = 4
+    CHUNK_MEMO_MAX_ENTRIES: int = 16384 # Per-window results kept so edited/appended transcripts reuse them (0 = off)
+
+    # FastAPI app: size of the thread pool that runs the blocking pipeline off the event loop
+    API_ANALYSIS_THREADS: int = 8
+    # /analyze_stream: records per batch-pipeline call, finished chunks buffered ahead of a slow client, max record size
+    STREAM_CHUNK_SIZE: int = 64
+    STREAM_MAX_PENDING_CHUNKS: int = 2
+    STREAM_MAX_LINE_BYTES: int = 1048576
 
     # Redis Configuration for worker consumer
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     REDIS_QUEUE_NAME: str = "fastapi_analysis_queue"
+    # Reliable queue: in-flight tasks are re-queued when a worker's lease is older than the visibility timeout
+    REDIS_VISIBILITY_TIMEOUT_SECONDS: float = 300.0
+    REDIS_REAPER_INTERVAL_SECONDS: float = 30.0
+    REDIS_MAX_DELIVERIES: int = 5 # Reclaims/nacks before a task goes to the "<queue>:dead" list
+    # Priority lanes: "standard" is REDIS_QUEUE_NAME itself, the others "<REDIS_QUEUE_NAME>:<lane>".
+    # Batches are shared between lanes by weight; a lane left unserved for STARVATION_SECONDS goes first.
+    QUEUE_LANE_WEIGHTS: str = "interactive=8,standard=3,bulk=1"
+    QUEUE_LANE_STARVATION_SECONDS: float = 30.0
+    QUEUE_IDLE_POLL_SECONDS: float = 0.1 # While idle, how often lanes other than the heaviest are re-checked
+
+    # Result cache for repeated feedback texts (in-process LRU, optional shared Redis tier)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_MAX_ENTRIES: int = 4096
+    RESULT_CACHE_REDIS_ENABLED: bool = False
+    RESULT_CACHE_REDIS_TTL_SECONDS: int = 86400
+    # Near-duplicate reuse (app/core/near_duplicate.py): texts the result cache misses reuse the analysis of a
+    # stored text whose embedding is at least NEAR_DUPLICATE_THRESHOLD cosine-similar. Needs numpy.
+    NEAR_DUPLICATE_ENABLED: bool = False
+    NEAR_DUPLICATE_EMBEDDER_TYPE: str = "hashed_ngram_embedder" # or "onnx_embedder" (ONNX_KEYWORD_MODEL_DIR)
+    NEAR_DUPLICATE_THRESHOLD: float = 0.92
+    NEAR_DUPLICATE_MAX_ENTRIES: int = 20000
+    NEAR_DUPLICATE_MAX_TOKENS: int = 512 # Longer texts are always analyzed (they would be truncated or chunked)
+    NEAR_DUPLICATE_PERSIST_DIR: str = "" # Empty: the index starts empty on every restart
+    NEAR_DUPLICATE_PERSIST_INTERVAL_SECONDS: float = 300.0
+
+    # Wire formats (app/wire_format.py): "json" or "msgpack". TASK_WIRE_FORMAT is what consumers advertise to producers
+    TASK_WIRE_FORMAT: str = "json"
+    CALLBACK_WIRE_FORMAT: str = "json" # msgpack needs the PHP msgpack extension in Laravel
+
+    # Consumer micro-batching: drain up to BATCH_SIZE tasks per cycle, waiting at most LINGER_MS for stragglers
+    CONSUMER_BATCH_SIZE: int = 16
+    CONSUMER_BATCH_LINGER_MS: int = 20
+
+    # Supervisor (app/supervisor.py): consumer processes forked after the models are loaded
+    WORKER_PROCESSES: int = os.cpu_count() or 1
+    WORKER_SHUTDOWN_TIMEOUT_SECONDS: float = 30.0
+
+    # Laravel status callbacks: coalesced into bulk requests by a background sender
+    CALLBACK_BATCH_SIZE: int = 100
+    CALLBACK_FLUSH_INTERVAL_MS: int = 50
+    CALLBACK_MAX_BUFFER: int = 10000
+    CALLBACK_MAX_RETRIES: int = 5
+    CALLBACK_TIMEOUT_SECONDS: float = 10.0
+
+    # Metrics: consumers publish their registry to Redis for the API's /metrics endpoint
+    METRICS_PUBLISH_INTERVAL_SECONDS: float = 10.0
+    # Sampling profiler, toggled per consumer process with `kill -USR1 <pid>`
+    PROFILER_INTERVAL_MS: float = 5.0
+    PROFILER_OUTPUT_DIR: str = "/tmp/insightflow-profiles"
 
 settings = Settings()
@@ -1,37 +1,68 @@
 import redis
-import json
 import time
 import logging
+import signal
+import threading
 import os # Import os for environment variables
-from app.core.insight_flow_core import InsightFlowCore
+from app.core.factory import create_insight_flow_core
 from app.config import settings
 from app.models.request_models import AnalysisRequestPayload
+from app.priority_lanes import PriorityLaneQueue, parse_lane_weights
+from app.reliable_queue import ReliableQueue
+from app.wire_format import decode_task, publish_accepted_version
+from app.callbacks import CallbackDispatcher
+from app.metrics import (
+    CALLBACK_DURATION, CALLBACK_UPDATES, QUEUE_BATCH_SIZE, QUEUE_POP_DURATION, QUEUE_WAIT_DURATION, REGISTRY, TASKS_PROCESSED, MetricsPublisher,
+)
+from app.profiler import SamplingProfiler
 import requests # To update Laravel backend
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Initialize Redis client
-r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB)
-
-# Initialize InsightFlow core (assuming it's stateless and can be reused)
-insight_flow = InsightFlowCore({
-    "OPENAI_API_KEY": settings.OPENAI_API_KEY,
-    "HUGGINGFACE_API_TOKEN": settings.HUGGINGFACE_API_TOKEN,
-    "summarizer_model_type": settings.SUMMARIZER_MODEL_TYPE,
-    "sentiment_model_type": settings.SENTIMENT_MODEL_TYPE,
-    "keyword_extractor_type": settings.KEYWORD_EXTRACTOR_TYPE,
-    "intent_recognizer_type": settings.INTENT_RECOGNIZER_TYPE,
-    "sentiment_model_name": settings.SENTIMENT_MODEL_NAME,
-    "recommender_config": {
-        "product_catalog_path": "/app/data/products.json", # Docker container path
-        "customer_segments_path": "/app/data/segments.json"
-    }
-})
+# Redis client and InsightFlow core, created on first use so importing this module stays cheap.
+# Tests and benchmarks may assign either attribute directly.
+r = None
+insight_flow = None
+_globals_lock = threading.Lock()
+
+def get_redis() -> redis.Redis:
+    global r
+    with _globals_lock:
+        if r is None:
+            r = redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB)
+        return r
+
+def get_insight_flow_core():
+    """The process-wide InsightFlowCore (thread-safe to call, shared across forked consumers)."""
+    global insight_flow
+    with _globals_lock:
+        if insight_flow is None:
+            insight_flow = create_insight_flow_core(settings)
+        return insight_flow
+
+# Started by consume_tasks (inside each consumer process, since threads do not survive fork).
+# When it is not running, status updates fall back to synchronous single-task callbacks.
+callback_dispatcher = None
+
+# Set by SIGTERM/SIGINT: the loop finishes the batch in hand, then exits instead of popping more work
+shutdown_event = threading.Event()
+
+# Toggled per process with SIGUSR1 (see app/profiler.py)
+profiler = SamplingProfiler(interval_ms=settings.PROFILER_INTERVAL_MS, output_dir=settings.PROFILER_OUTPUT_DIR)
+
+def request_shutdown(signum=None, frame=None):
+    logger.info(f"Shutdown requested (signal {signum}), draining current batch...")
+    shutdown_event.set()
+
+def install_signal_handlers():
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.toggle())
 
-def update_laravel_task_status(task_id: str, status: str, result: dict = None):
+def update_laravel_task_status(task_id: str, status: str, result: dict = None) -> bool:
     """
-    Sends an update back to the Laravel backend.
+    Sends an update back to the Laravel backend. Returns True if Laravel accepted it.
     """
     # This URL must be reachable from the FastAPI worker container to the Laravel app container.
     # 'app' is the service name in docker-compose, which resolves to the Laravel container's IP.
@@ -43,47 +74,160 @@ def update_laravel_task_status(task_id: str, status: str, result: dict = None):
         "result": result
     }
     try:
-        response = requests.post(laravel_update_url, json=payload, timeout=30)
+        with CALLBACK_DURATION.time(endpoint="single"):
+            response = requests.post(laravel_update_url, json=payload, timeout=30)
         response.raise_for_status() # Raise an exception for HTTP errors
         logger.info(f"Successfully updated Laravel for task {task_id} with status {status}")
+        CALLBACK_UPDATES.inc(outcome="delivered")
+        return True
     except requests.exceptions.RequestException as e:
         logger.error(f"Failed to update Laravel for task {task_id}: {e}")
+        CALLBACK_UPDATES.inc(outcome="failed")
+        return False
+
+
+def notify_laravel(task_id: str, status: str, result: dict = None, on_delivered=None, on_failed=None):
+    """Reports a task status to Laravel off the hot path; `on_delivered`/`on_failed` run once the outcome is known."""
+    if callback_dispatcher is not None:
+        callback_dispatcher.submit(task_id, status, result, on_delivered=on_delivered, on_failed=on_failed)
+        return
+    delivered = update_laravel_task_status(task_id, status, result)
+    hook = on_delivered if delivered else on_failed
+    if hook:
+        hook()
+
+
+def create_callback_dispatcher() -> CallbackDispatcher:
+    laravel_bulk_update_url = os.getenv("LARAVEL_INTERNAL_BULK_UPDATE_URL", "http://app/api/internal/analysis/bulk-update")
+    dispatcher = CallbackDispatcher(
+        laravel_bulk_update_url,
+        max_batch_size=settings.CALLBACK_BATCH_SIZE,
+        flush_interval_ms=settings.CALLBACK_FLUSH_INTERVAL_MS,
+        max_buffer=settings.CALLBACK_MAX_BUFFER,
+        max_retries=settings.CALLBACK_MAX_RETRIES,
+        timeout=settings.CALLBACK_TIMEOUT_SECONDS,
+        wire_format=settings.CALLBACK_WIRE_FORMAT,
+    )
+    dispatcher.start()
+    return dispatcher
+
+
+def _decode_task(task_json) -> AnalysisRequestPayload:
+    # JSON or msgpack (see app/wire_format.py), validated in one pass without an intermediate dict
+    return decode_task(task_json)
+
+
+def _record_queue_wait(request_payload: AnalysisRequestPayload, picked_up_at: float):
+    # Wall-clock difference between hosts: only meaningful with synchronized clocks (NTP)
+    if request_payload.enqueued_at is not None:
+        QUEUE_WAIT_DURATION.observe(max(picked_up_at - request_payload.enqueued_at, 0.0), lane=request_payload.priority)
+
+
+def _finish_task(task_queue: ReliableQueue, raw_task, task_id: str, status: str, result: dict):
+    # The task leaves the processing list only once Laravel has recorded the outcome
+    TASKS_PROCESSED.inc(status=status)
+    notify_laravel(
+        task_id, status, result,
+        on_delivered=lambda: task_queue.ack(raw_task),
+        on_failed=lambda: task_queue.nack(raw_task),
+    )
+
+
+def _process_single_task(task_queue: ReliableQueue, raw_task, request_payload: AnalysisRequestPayload):
+    task_id = request_payload.task_id
+    try:
+        analysis_output = get_insight_flow_core().process_customer_feedback(request_payload.text_content)
+    except Exception as e:
+        logger.error(f"Error processing task {task_id}: {e}", exc_info=True)
+        _finish_task(task_queue, raw_task, task_id, "failed", {"error": str(e), "details": "Worker processing failed"})
+        return
+    _finish_task(task_queue, raw_task, task_id, "completed", {"analysis_output": analysis_output})
+    logger.info(f"Task {task_id} completed successfully.")
+
+
+def process_task_batch(task_queue: ReliableQueue, raw_tasks: list):
+    """Decodes a batch of raw Redis messages, runs them through the core in one call and acks each one."""
+    picked_up_at = time.time()
+    decoded = [] # (raw_task, request_payload)
+    for task_json in raw_tasks:
+        try:
+            decoded.append((task_json, _decode_task(task_json)))
+        except Exception as e:
+            logger.error(f"Invalid task payload from Redis: {task_json}. Error: {e}")
+            task_queue.dead_letter(task_json)
+            TASKS_PROCESSED.inc(status="invalid")
+
+    if not decoded:
+        return
+
+    for _, request_payload in decoded:
+        _record_queue_wait(request_payload, picked_up_at)
+        logger.info(f"Processing task: {request_payload.task_id}")
+        notify_laravel(request_payload.task_id, "processing") # Inform Laravel
+
+    try:
+        analysis_outputs = get_insight_flow_core().process_customer_feedback_batch(
+            [request_payload.text_content for _, request_payload in decoded]
+        )
+    except Exception as e:
+        # One bad text must not fail its neighbours: retry item by item to isolate the failure
+        logger.warning(f"Batch of {len(decoded)} tasks failed ({e}), falling back to per-task processing.")
+        for raw_task, request_payload in decoded:
+            _process_single_task(task_queue, raw_task, request_payload)
+        return
+
+    for (raw_task, request_payload), analysis_output in zip(decoded, analysis_outputs):
+        _finish_task(task_queue, raw_task, request_payload.task_id, "completed", {"analysis_output": analysis_output})
+        logger.info(f"Task {request_payload.task_id} completed successfully.")
+
+
+def create_task_queue(client: redis.Redis = None) -> PriorityLaneQueue:
+    # Called inside each consumer process so the worker id reflects the post-fork pid
+    return PriorityLaneQueue(
+        client if client is not None else get_redis(),
+        settings.REDIS_QUEUE_NAME,
+        parse_lane_weights(settings.QUEUE_LANE_WEIGHTS),
+        starvation_seconds=settings.QUEUE_LANE_STARVATION_SECONDS,
+        idle_poll_seconds=settings.QUEUE_IDLE_POLL_SECONDS,
+        visibility_timeout=settings.REDIS_VISIBILITY_TIMEOUT_SECONDS,
+        reaper_interval=settings.REDIS_REAPER_INTERVAL_SECONDS,
+        max_deliveries=settings.REDIS_MAX_DELIVERIES,
+    )
 
 
 def consume_tasks():
-    logger.info(f"FastAPI worker starting to consume tasks from Redis queue: {settings.REDIS_QUEUE_NAME}")
-    while True:
-        # Blocking pop from list. Timeout 1 second.
+    global callback_dispatcher
+    task_queue = create_task_queue()
+    callback_dispatcher = create_callback_dispatcher()
+    wire_version = publish_accepted_version(get_redis(), settings.REDIS_QUEUE_NAME, settings.TASK_WIRE_FORMAT)
+    metrics_publisher = MetricsPublisher(get_redis(), task_queue.worker_id, REGISTRY, settings.METRICS_PUBLISH_INTERVAL_SECONDS)
+    logger.info(
+        f"FastAPI worker {task_queue.worker_id} starting to consume tasks from Redis queue: {settings.REDIS_QUEUE_NAME} "
+        f"(lanes {settings.QUEUE_LANE_WEIGHTS}, task wire version {wire_version}, batch size {settings.CONSUMER_BATCH_SIZE}, linger {settings.CONSUMER_BATCH_LINGER_MS} ms)"
+    )
+    while not shutdown_event.is_set():
+        task_queue.maybe_reap() # Re-queue tasks held by dead or stuck workers
+
+        # Blocking move for the first task (timeout 1 second) followed by a short non-blocking drain.
         # This makes the consumer sleep if there are no tasks, reducing CPU usage.
-        task_data_raw = r.brpop(settings.REDIS_QUEUE_NAME, timeout=1) 
-        
-        if task_data_raw:
-            # task_data_raw returns a tuple: (queue_name, task_data_json_string)
-            queue_name, task_json = task_data_raw
-            task_id = None # Initialize for logging in case of parsing error
-            try:
-                payload = json.loads(task_json)
-                request_payload = AnalysisRequestPayload(**payload)
-                task_id = request_payload.task_id
-                text_content = request_payload.text_content
-
-                logger.info(f"Processing task: {task_id}")
-                update_laravel_task_status(task_id, "processing") # Inform Laravel
-
-                analysis_output = insight_flow.process_customer_feedback(text_content)
-                
-                # Success
-                update_laravel_task_status(task_id, "completed", {"analysis_output": analysis_output})
-                logger.info(f"Task {task_id} completed successfully.")
-
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to decode JSON from Redis: {task_json}. Error: {e}")
-            except Exception as e:
-                logger.error(f"Error processing task {task_id}: {e}", exc_info=True)
-                update_laravel_task_status(task_id, "failed", {"error": str(e), "details": "Worker processing failed"})
+        with QUEUE_POP_DURATION.time():
+            raw_tasks = task_queue.pop_batch(settings.CONSUMER_BATCH_SIZE, settings.CONSUMER_BATCH_LINGER_MS)
+
+        if raw_tasks:
+            QUEUE_BATCH_SIZE.observe(len(raw_tasks))
+            process_task_batch(task_queue, raw_tasks)
         else:
             # No tasks in queue, sleep briefly before checking again
-            time.sleep(0.5)
+            shutdown_event.wait(0.5)
+        metrics_publisher.maybe_publish()
+    # Deliver (and ack) every outcome still buffered before the process exits
+    callback_dispatcher.close(timeout=settings.WORKER_SHUTDOWN_TIMEOUT_SECONDS)
+    if insight_flow is not None:
+        insight_flow.shutdown() # Also saves the near-duplicate index, if persisted
+    metrics_publisher.publish()
+    profiler.stop()
+    logger.info("FastAPI worker stopped consuming tasks.")
 
 if __name__ == "__main__":
+    install_signal_handlers()
     consume_tasks()
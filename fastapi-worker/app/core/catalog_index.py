@@ -0,0 +1,190 @@
+"""
+In-memory indexes over the product catalog and customer segment rules used by RuleBasedRecommender.
+
+A CatalogIndex is an immutable snapshot: every lookup is a few dict hits plus slicing of lists that
+were pre-sorted at build time, so it stays sub-millisecond with ~100k SKUs. CatalogStore owns the
+current snapshot and hot-reloads it when the files change on disk: the new index is built off the
+request path and swapped in with a single reference assignment, so readers never take a lock.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Equality conditions rules are indexed by. Rules may also use "min_sentiment_score" and
+# "summary_contains"; rules with only those are checked on every lookup.
+SEGMENT_CONDITION_KEYS = ("intent", "product_category", "sentiment_label", "keyword")
+
+# Used when no segments file is available; reproduces the recommender's original built-in rules.
+DEFAULT_SEGMENT_RULES = [
+    {"name": "睡眠需求", "when": {"product_category": "睡眠產品"}, "recommendations": ["寄送「睡眠系列產品」推薦郵件。"]},
+    {"name": "腸胃需求", "when": {"product_category": "腸胃照護產品"}, "recommendations": ["觸發自動推薦「腸胃照護」商品模組。"]},
+    {"name": "促銷關注", "when": {"intent": "促銷活動查詢"}, "recommendations": ["促銷訊息應優先展示在首頁。"]},
+    {"name": "促銷關注", "when": {"summary_contains": "促銷方案"}, "recommendations": ["促銷訊息應優先展示在首頁。"]},
+    {"name": "負面情緒", "when": {"sentiment_label": "negative", "min_sentiment_score": 0.8}, "recommendations": ["客戶情緒較為負面，建議人工介入。"]},
+]
+
+
+def _products_from(data: Any) -> List[Dict[str, Any]]:
+    if isinstance(data, dict):
+        data = data.get("products", [])
+    return [p for p in data if isinstance(p, dict) and p.get("sku")]
+
+
+def _segments_from(data: Any) -> List[Dict[str, Any]]:
+    if isinstance(data, dict):
+        data = data.get("segments", [])
+    return [s for s in data if isinstance(s, dict) and isinstance(s.get("when"), dict)]
+
+
+class CatalogIndex:
+    def __init__(self, products: Any, segment_rules: Any):
+        """Accepts lists, or the files' wrapped forms ({"products": [...]}, {"segments": [...]})."""
+        products = sorted(_products_from(products), key=lambda p: -float(p.get("score", 0)))
+        self.product_count = len(products)
+
+        by_category: Dict[str, List[Dict[str, Any]]] = {}
+        by_keyword: Dict[str, List[Dict[str, Any]]] = {}
+        for product in products: # Already sorted by score, so every posting list is too
+            if product.get("category"):
+                by_category.setdefault(product["category"], []).append(product)
+            for keyword in dict.fromkeys(product.get("keywords", [])):
+                by_keyword.setdefault(keyword, []).append(product)
+        self.by_category: Dict[str, Tuple[Dict[str, Any], ...]] = {k: tuple(v) for k, v in by_category.items()}
+        self.by_keyword: Dict[str, Tuple[Dict[str, Any], ...]] = {k: tuple(v) for k, v in by_keyword.items()}
+
+        # Each rule is filed under one of its equality conditions; the remaining conditions are checked on lookup
+        self.rules_by_condition: Dict[Tuple[str, str], List[Tuple[int, Dict[str, Any]]]] = {}
+        self.unconditional_rules: List[Tuple[int, Dict[str, Any]]] = []
+        for order, rule in enumerate(_segments_from(segment_rules)):
+            trigger = next((key for key in SEGMENT_CONDITION_KEYS if key in rule["when"]), None)
+            if trigger is None:
+                self.unconditional_rules.append((order, rule))
+            else:
+                self.rules_by_condition.setdefault((trigger, str(rule["when"][trigger])), []).append((order, rule))
+
+    @classmethod
+    def from_files(cls, product_catalog_path: Optional[str], customer_segments_path: Optional[str]) -> "CatalogIndex":
+        products = _read_json(product_catalog_path)
+        segments = _read_json(customer_segments_path)
+        return cls(products or [], segments if segments else DEFAULT_SEGMENT_RULES)
+
+    def products_for(self, product_category: Optional[str], keywords: List[str], limit: int, per_list_limit: int = 50) -> List[Dict[str, Any]]:
+        """Top products matching the category and/or keywords, ranked by number of hits, then catalog score."""
+        hits: Dict[str, int] = {}
+        candidates: Dict[str, Dict[str, Any]] = {}
+        posting_lists = [self.by_keyword.get(keyword, ()) for keyword in keywords]
+        if product_category:
+            posting_lists.append(self.by_category.get(product_category, ()))
+        for posting_list in posting_lists:
+            for product in posting_list[:per_list_limit]: # Lists are score-sorted, so the head is enough
+                hits[product["sku"]] = hits.get(product["sku"], 0) + 1
+                candidates[product["sku"]] = product
+        ranked = sorted(candidates.values(), key=lambda p: (-hits[p["sku"]], -float(p.get("score", 0))))
+        return ranked[:limit]
+
+    def matching_rules(self, facts: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Segment rules whose conditions all hold, in file order."""
+        candidates = list(self.unconditional_rules)
+        for key in ("intent", "product_category", "sentiment_label"):
+            if facts.get(key) is not None:
+                candidates.extend(self.rules_by_condition.get((key, str(facts[key])), ()))
+        for keyword in facts.get("keywords", ()):
+            candidates.extend(self.rules_by_condition.get(("keyword", keyword), ()))
+        matched = {}
+        for order, rule in candidates:
+            if order not in matched and _rule_holds(rule["when"], facts):
+                matched[order] = rule
+        return [matched[order] for order in sorted(matched)]
+
+
+def _rule_holds(conditions: Dict[str, Any], facts: Dict[str, Any]) -> bool:
+    for key, expected in conditions.items():
+        if key == "keyword":
+            if expected not in facts.get("keywords", ()):
+                return False
+        elif key == "summary_contains":
+            if expected not in facts.get("summary_text", ""):
+                return False
+        elif key == "min_sentiment_score":
+            if float(facts.get("sentiment_score") or 0) <= float(expected):
+                return False
+        elif facts.get(key) != expected:
+            return False
+    return True
+
+
+def _read_json(file_path: Optional[str]) -> Any:
+    if file_path and os.path.exists(file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    logger.warning(f"Data file not found: {file_path}")
+    return None
+
+
+def _mtime(file_path: Optional[str]) -> Optional[float]:
+    try:
+        return os.stat(file_path).st_mtime_ns if file_path else None
+    except OSError:
+        return None
+
+
+class CatalogStore:
+    """Holds the current CatalogIndex and swaps in a rebuilt one when the source files change."""
+
+    def __init__(self, product_catalog_path: Optional[str], customer_segments_path: Optional[str],
+                 reload_interval_seconds: float = 30.0):
+        self.product_catalog_path = product_catalog_path
+        self.customer_segments_path = customer_segments_path
+        self.reload_interval_seconds = reload_interval_seconds
+        self._signature = self._file_signature()
+        self._index = CatalogIndex.from_files(product_catalog_path, customer_segments_path)
+        self._next_check = time.monotonic() + reload_interval_seconds
+        self._reload_lock = threading.Lock() # Only serializes rebuilders; readers never touch it
+        self.reloads = 0
+
+    @property
+    def version(self) -> str:
+        """Identifies the loaded files (by mtime), the same in every process reading them."""
+        return f"{self._signature[0]}:{self._signature[1]}"
+
+    def _file_signature(self) -> Tuple[Optional[float], Optional[float]]:
+        return (_mtime(self.product_catalog_path), _mtime(self.customer_segments_path))
+
+    def current(self) -> CatalogIndex:
+        """Returns the live snapshot. At most once per interval, kicks off a background reload if files changed."""
+        if self.reload_interval_seconds > 0 and time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.reload_interval_seconds
+            if self._file_signature() != self._signature and self._reload_lock.acquire(blocking=False):
+                threading.Thread(target=self._reload_locked, name="catalog-reload", daemon=True).start()
+        return self._index
+
+    def reload(self) -> bool:
+        """Synchronously rebuilds the index if the files changed. Returns True if a new index was swapped in."""
+        with self._reload_lock:
+            return self._rebuild()
+
+    def _reload_locked(self):
+        try:
+            self._rebuild()
+        finally:
+            self._reload_lock.release()
+
+    def _rebuild(self) -> bool:
+        signature = self._file_signature()
+        if signature == self._signature:
+            return False
+        try:
+            index = CatalogIndex.from_files(self.product_catalog_path, self.customer_segments_path)
+        except (OSError, ValueError) as e:
+            # Keep serving the previous snapshot; a half-written file will be picked up on the next change
+            logger.error(f"Catalog reload failed, keeping previous index: {e}")
+            return False
+        self._index, self._signature = index, signature # Atomic reference swap
+        self.reloads += 1
+        logger.info(f"Catalog reloaded: {index.product_count} products")
+        return True
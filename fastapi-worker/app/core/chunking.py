@@ -0,0 +1,137 @@
+"""
+Long-text chunking for InsightFlowCore's map-reduce path.
+
+Texts whose estimated size exceeds the token budget are split on sentence boundaries (Chinese and
+Western punctuation) into windows of at most `max_tokens`. Each window is analyzed on its own (map)
+and the per-window results are merged (reduce) into the usual single-text shapes.
+
+Window boundaries are content-defined: besides the budget, a window also ends after any sentence whose
+hash marks it as a boundary. An edit therefore only changes the windows around it and later windows
+re-align at the next boundary sentence; appending only adds windows at the end. Together with the
+per-window memo in InsightFlowCore, an edited or growing transcript re-analyzes only what changed.
+"""
+import hashlib
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+# Sentence terminators, optionally followed by closing quotes/brackets and line breaks, or a line break
+# (line breaks stay with their sentence: whitespace-only pieces are dropped). A period only
+# ends a sentence before whitespace, a closing quote/bracket or the end, so "3.5" or "v1.2" stay whole.
+_AFTER_PERIOD = r"[\s」』”’）)\]]|$"
+_SENTENCE_END = re.compile(
+    rf"(?:[^。！？；!?;….\n]|\.(?!{_AFTER_PERIOD}))*(?:(?:[。！？；!?;…]|\.(?={_AFTER_PERIOD}))+[」』”’）)\]]*\n*|\n+|$)"
+)
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+_LATIN_WORD = re.compile(r"[A-Za-z0-9]+")
+_UNIT = re.compile(r"[A-Za-z0-9]+|\s+|.", re.DOTALL)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Splits text after sentence punctuation, keeping the punctuation (and closing quotes) with its sentence."""
+    return [sentence for sentence in _SENTENCE_END.findall(text) if sentence.strip()]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough model-agnostic token count: one per CJK character, about 4 characters per Latin word piece."""
+    cjk = len(_CJK.findall(text))
+    latin = sum((len(word) + 3) // 4 for word in _LATIN_WORD.findall(text))
+    return cjk + latin + (len(text) - cjk) // 16 # Punctuation and whitespace, loosely
+
+
+def _hard_split(sentence: str, max_tokens: int) -> List[str]:
+    # A single sentence over budget (e.g. an unpunctuated transcript) is cut between words/characters
+    pieces, current, current_tokens = [], [], 0
+    for unit in _UNIT.findall(sentence):
+        unit_tokens = estimate_tokens(unit) or (1 if not unit.isspace() else 0)
+        if current and current_tokens + unit_tokens > max_tokens:
+            pieces.append("".join(current))
+            current, current_tokens = [], 0
+        current.append(unit)
+        current_tokens += unit_tokens
+    if current:
+        pieces.append("".join(current))
+    return pieces
+
+
+def _is_boundary(sentence: str, boundary_every: int) -> bool:
+    digest = hashlib.blake2b(sentence.strip().encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big") % boundary_every == 0
+
+
+def chunk_text(text: str, max_tokens: int, boundary_every: int = 8) -> List[str]:
+    """
+    Packs sentences into windows of at most `max_tokens`. A window also closes after a boundary
+    sentence (about one in `boundary_every`) once it holds at least half the budget.
+    """
+    windows: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for sentence in split_sentences(text):
+        for piece in _hard_split(sentence, max_tokens) if estimate_tokens(sentence) > max_tokens else [sentence]:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                windows.append("".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+            if current_tokens >= max_tokens // 2 and _is_boundary(piece, boundary_every):
+                windows.append("".join(current))
+                current, current_tokens = [], 0
+    if current:
+        windows.append("".join(current))
+    return windows
+
+
+# --- Reduce step: merge per-window results into the single-text shapes ---
+
+def reduce_sentiments(sentiments: List[Dict[str, Any]], weights: List[int]) -> Dict[str, Any]:
+    """The label carrying the most (length x confidence) wins; its score is the weighted mean for that label."""
+    totals: Dict[str, float] = {}
+    weight_by_label: Dict[str, float] = {}
+    for sentiment, weight in zip(sentiments, weights):
+        label = sentiment.get("label")
+        score = float(sentiment.get("score", 0.0))
+        totals[label] = totals.get(label, 0.0) + weight * score
+        weight_by_label[label] = weight_by_label.get(label, 0.0) + weight
+    label = max(totals, key=lambda candidate: totals[candidate]) # Ties: first label seen
+    return {"label": label, "score": round(totals[label] / weight_by_label[label], 4) if weight_by_label[label] else 0.0}
+
+
+def reduce_keywords(keyword_lists: List[List[str]], top_n: int) -> List[str]:
+    """Keywords found in the most windows first, then by first appearance."""
+    counts: Dict[str, int] = {}
+    for keywords in keyword_lists:
+        for keyword in dict.fromkeys(keywords):
+            counts[keyword] = counts.get(keyword, 0) + 1
+    return sorted(counts, key=lambda keyword: -counts[keyword])[:top_n]
+
+
+def reduce_intents(intents: List[Optional[Dict[str, Any]]], weights: List[int]) -> Optional[Dict[str, Any]]:
+    """The intent covering the most text; the first window with that intent supplies the details."""
+    weight_by_intent: Dict[Any, int] = {}
+    first_by_intent: Dict[Any, Dict[str, Any]] = {}
+    for intent, weight in zip(intents, weights):
+        if not intent:
+            continue
+        name = intent.get("intent")
+        weight_by_intent[name] = weight_by_intent.get(name, 0) + weight
+        first_by_intent.setdefault(name, intent)
+    if not weight_by_intent:
+        return None
+    return first_by_intent[max(weight_by_intent, key=lambda name: weight_by_intent[name])]
+
+
+def reduce_summaries(summaries: List[List[str]], summarize: Callable[[str], List[str]], max_tokens: int) -> List[str]:
+    """
+    Concatenates the window summaries in order. While the result is still over budget, it is chunked
+    and summarized again (a summary-of-summaries), so the final summary fits one model call.
+    """
+    merged = list(dict.fromkeys(sentence for summary in summaries for sentence in summary))
+    for _ in range(8): # Each round shrinks the text; the cap only guards against a summarizer that doesn't
+        joined = "\n".join(merged)
+        if estimate_tokens(joined) <= max_tokens or len(merged) <= 1:
+            break
+        merged = list(dict.fromkeys(
+            sentence for window in chunk_text(joined, max_tokens) for sentence in summarize(window)
+        ))
+    return merged
@@ -0,0 +1,84 @@
+from typing import Dict
+
+from app.config import Settings
+from app.core.insight_flow_core import InsightFlowCore
+
+# Docker container paths (see docker-compose.yml volumes)
+PRODUCT_CATALOG_PATH = "/app/data/products.json"
+CUSTOMER_SEGMENTS_PATH = "/app/data/segments.json"
+
+def parse_stage_timeouts(spec: str) -> Dict[str, float]:
+    """Parses "summarize=20,intent=10". Stages left out use PIPELINE_STAGE_TIMEOUT_SECONDS."""
+    timeouts: Dict[str, float] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        stage, _, seconds = item.partition("=")
+        stage = stage.strip()
+        if stage not in InsightFlowCore.TIMED_STAGES:
+            raise ValueError(f"Unknown pipeline stage '{stage}' (expected one of {', '.join(InsightFlowCore.TIMED_STAGES)})")
+        try:
+            timeout = float(seconds)
+        except ValueError:
+            timeout = None
+        if timeout is None or not timeout > 0:
+            raise ValueError(f"Stage '{stage}' needs a positive timeout in seconds, got '{seconds.strip()}'")
+        timeouts[stage] = timeout
+    return timeouts
+
+def build_core_config(settings: Settings) -> dict:
+    """Translates Settings into the plain config dict InsightFlowCore expects."""
+    return {
+        "OPENAI_API_KEY": settings.OPENAI_API_KEY,
+        "HUGGINGFACE_API_TOKEN": settings.HUGGINGFACE_API_TOKEN,
+        "summarizer_model_type": settings.SUMMARIZER_MODEL_TYPE,
+        "sentiment_model_type": settings.SENTIMENT_MODEL_TYPE,
+        "keyword_extractor_type": settings.KEYWORD_EXTRACTOR_TYPE,
+        "intent_recognizer_type": settings.INTENT_RECOGNIZER_TYPE,
+        "sentiment_model_name": settings.SENTIMENT_MODEL_NAME,
+        "term_dictionary_path": settings.TERM_DICTIONARY_PATH,
+        "lazy_modules": settings.LAZY_MODULE_LOADING,
+        "execution_mode": settings.PIPELINE_EXECUTION_MODE,
+        "stage_timeout_seconds": settings.PIPELINE_STAGE_TIMEOUT_SECONDS,
+        "stage_timeouts": parse_stage_timeouts(settings.PIPELINE_STAGE_TIMEOUTS),
+        "result_cache": {
+            "enabled": settings.RESULT_CACHE_ENABLED,
+            "max_entries": settings.RESULT_CACHE_MAX_ENTRIES,
+            "redis_enabled": settings.RESULT_CACHE_REDIS_ENABLED,
+            "redis_host": settings.REDIS_HOST,
+            "redis_port": settings.REDIS_PORT,
+            "redis_db": settings.REDIS_DB,
+            "redis_ttl_seconds": settings.RESULT_CACHE_REDIS_TTL_SECONDS,
+        },
+        "near_duplicate": {
+            "enabled": settings.NEAR_DUPLICATE_ENABLED,
+            "embedder_type": settings.NEAR_DUPLICATE_EMBEDDER_TYPE,
+            "threshold": settings.NEAR_DUPLICATE_THRESHOLD,
+            "max_entries": settings.NEAR_DUPLICATE_MAX_ENTRIES,
+            "max_tokens": settings.NEAR_DUPLICATE_MAX_TOKENS,
+            "persist_dir": settings.NEAR_DUPLICATE_PERSIST_DIR or None,
+            "persist_interval_seconds": settings.NEAR_DUPLICATE_PERSIST_INTERVAL_SECONDS,
+        },
+        "chunking": {
+            "enabled": settings.CHUNKING_ENABLED,
+            "max_tokens": settings.CHUNK_MAX_TOKENS,
+            "map_workers": settings.CHUNK_MAP_WORKERS,
+            "memo_max_entries": settings.CHUNK_MEMO_MAX_ENTRIES,
+        },
+        "onnx": {
+            "sentiment_model_dir": settings.ONNX_SENTIMENT_MODEL_DIR,
+            "keyword_model_dir": settings.ONNX_KEYWORD_MODEL_DIR,
+            "max_length": settings.ONNX_MAX_SEQUENCE_LENGTH,
+            "max_batch_size": settings.ONNX_MAX_BATCH_SIZE,
+            "max_batch_tokens": settings.ONNX_MAX_BATCH_TOKENS,
+            "intra_op_threads": settings.ONNX_INTRA_OP_THREADS,
+        },
+        "recommender_config": {
+            "product_catalog_path": PRODUCT_CATALOG_PATH,
+            "customer_segments_path": CUSTOMER_SEGMENTS_PATH,
+            "reload_interval_seconds": settings.RECOMMENDER_RELOAD_INTERVAL_SECONDS,
+            "max_products": settings.RECOMMENDER_MAX_PRODUCTS,
+        }
+    }
+
+def create_insight_flow_core(settings: Settings) -> InsightFlowCore:
+    """Builds a long-lived InsightFlowCore. Construct once per process and share it; it is thread-safe to call."""
+    return InsightFlowCore(build_core_config(settings))
@@ -1,37 +1,77 @@
 import os
-import json
-from typing import List, Dict, Any, Optional
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from abc import ABC, abstractmethod # For Abstract Base Classes
 import logging
+import math
+import threading
+import zlib
+from app.core.result_cache import ResultCache, config_fingerprint, normalize_text
+from app.core.near_duplicate import NearDuplicateIndex
+from app.core.pattern_matcher import AhoCorasickMatcher, PatternMatch, load_term_dictionary
+from app.core.catalog_index import CatalogStore
+from app.core.onnx_encoder import OnnxTextEncoder, candidate_phrases
+from app.core.chunking import chunk_text, estimate_tokens, reduce_intents, reduce_keywords, reduce_sentiments, reduce_summaries
+from app.metrics import (
+    CHUNK_MEMO_LOOKUPS, MODULE_LOAD_DURATION, NEAR_DUPLICATE_LOOKUPS, PIPELINE_DURATION, RESULT_CACHE_LOOKUPS, STAGE_DURATION,
+)
 
 logger = logging.getLogger(__name__)
 
 # --- Define Abstract Interfaces for AI Modules (Strategy Pattern) ---
+# Each interface also exposes a batch method. The default implementation loops over the
+# single-text method; backends that can vectorize (HF pipelines, KeyBERT) should override it.
 class Summarizer(ABC):
     @abstractmethod
     def summarize(self, text: str) -> List[str]:
         pass
 
+    def summarize_batch(self, texts: List[str]) -> List[List[str]]:
+        return [self.summarize(text) for text in texts]
+
 class SentimentAnalyzer(ABC):
     @abstractmethod
     def analyze(self, text: str) -> Dict[str, float]:
         pass
 
+    def analyze_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        return [self.analyze(text) for text in texts]
+
 class KeywordExtractor(ABC):
     @abstractmethod
     def extract(self, text: str, top_n: int = 5) -> List[str]:
         pass
 
+    def extract_batch(self, texts: List[str], top_n: int = 5) -> List[List[str]]:
+        return [self.extract(text, top_n=top_n) for text in texts]
+
 class IntentRecognizer(ABC):
     @abstractmethod
     def recognize(self, text: str) -> Optional[Dict[str, Any]]:
         pass
 
+    def recognize_batch(self, texts: List[str]) -> List[Optional[Dict[str, Any]]]:
+        return [self.recognize(text) for text in texts]
+
 class Recommender(ABC):
     @abstractmethod
     def generate_recommendations(self, summary: List[str], sentiment: Dict[str, float], keywords: List[str], intent: Optional[Dict[str, Any]]) -> List[str]:
         pass
 
+    def generate_recommendations_batch(self, summaries: List[List[str]], sentiments: List[Dict[str, float]], keywords_list: List[List[str]], intents: List[Optional[Dict[str, Any]]]) -> List[List[str]]:
+        return [
+            self.generate_recommendations(summary=summary, sentiment=sentiment, keywords=keywords, intent=intent)
+            for summary, sentiment, keywords, intent in zip(summaries, sentiments, keywords_list, intents)
+        ]
+
+class TextEmbedder(ABC):
+    """Vectors whose cosine similarity says how alike two texts are; used to find near-duplicate feedback."""
+    @abstractmethod
+    def embed_batch(self, texts: List[str]) -> Any: # (len(texts), dim) array
+        pass
+
 # --- Concrete Implementations (Placeholders) ---
 # These classes would live in fastapi-worker/app/modules/
 # For brevity in this script, they are placed here.
@@ -74,6 +114,93 @@ class KeyBERTKeywordExtractor(KeywordExtractor):
         if "促銷方案" in text: keywords.append("促銷方案")
         return keywords[:top_n]
 
+class OnnxSentimentAnalyzer(SentimentAnalyzer):
+    """Sentiment from a sequence classifier exported to int8 ONNX; batches run in length buckets (see onnx_encoder)."""
+
+    def __init__(self, model_dir: str, **encoder_options):
+        self.encoder = OnnxTextEncoder(model_dir, **encoder_options)
+        id2label = self.encoder.model_config.get("id2label") or {}
+        self.labels = {int(label_id): str(label).lower() for label_id, label in id2label.items()}
+
+    def analyze(self, text: str) -> Dict[str, float]:
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        results = []
+        for logits in self.encoder.encode(texts):
+            logits = [float(value) for value in logits]
+            peak = max(logits)
+            exps = [math.exp(value - peak) for value in logits]
+            best = max(range(len(exps)), key=lambda label_id: exps[label_id])
+            results.append({"label": self.labels.get(best, str(best)), "score": round(exps[best] / sum(exps), 4)})
+        return results
+
+class OnnxKeywordExtractor(KeywordExtractor):
+    """
+    KeyBERT-style keywords on an int8 ONNX sentence-embedding model: the candidate phrases closest to
+    the whole text. A batch embeds every text and every distinct candidate in one bucketed pass.
+    """
+
+    def __init__(self, model_dir: str, max_candidates: int = 48, **encoder_options):
+        self.encoder = OnnxTextEncoder(model_dir, **encoder_options)
+        self.max_candidates = max_candidates
+
+    def extract(self, text: str, top_n: int = 5) -> List[str]:
+        return self.extract_batch([text], top_n=top_n)[0]
+
+    def extract_batch(self, texts: List[str], top_n: int = 5) -> List[List[str]]:
+        candidates = [candidate_phrases(text, max_candidates=self.max_candidates) for text in texts]
+        unique_phrases = list(dict.fromkeys(phrase for phrases in candidates for phrase in phrases))
+        vectors = self.encoder.encode(list(texts) + unique_phrases) # Phrases shared by texts are embedded once
+        phrase_vectors = dict(zip(unique_phrases, vectors[len(texts):]))
+
+        results = []
+        for text_vector, phrases in zip(vectors, candidates):
+            similarities = self.encoder.similarities(text_vector, [phrase_vectors[phrase] for phrase in phrases])
+            keywords: List[str] = []
+            for phrase, _ in sorted(zip(phrases, similarities), key=lambda pair: -pair[1]):
+                # Overlapping n-grams ("胃部不適", "部不適") would otherwise crowd out other keywords
+                if not any(phrase in keyword or keyword in phrase for keyword in keywords):
+                    keywords.append(phrase)
+                if len(keywords) == top_n:
+                    break
+            results.append(keywords)
+        return results
+
+class HashedNgramEmbedder(TextEmbedder):
+    """
+    Character n-gram counts hashed into `dim` buckets: no model, one pass over the text. Close wording
+    (a changed particle, punctuation, an added greeting) scores high; paraphrases do not. crc32 rather
+    than hash() keeps vectors stable across processes, as the persisted index needs.
+    """
+
+    def __init__(self, dim: int = 512, ngram_range: Tuple[int, int] = (2, 3)):
+        import numpy as np # Only when near-duplicate reuse is enabled
+        self._np = np
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def embed_batch(self, texts: List[str]) -> Any:
+        vectors = self._np.zeros((len(texts), self.dim), dtype=self._np.float32)
+        low, high = self.ngram_range
+        for row, text in enumerate(texts):
+            text = normalize_text(text).lower()
+            for size in range(low, high + 1):
+                for start in range(len(text) - size + 1):
+                    vectors[row, zlib.crc32(text[start:start + size].encode("utf-8")) % self.dim] += 1.0
+        return vectors
+
+class OnnxTextEmbedder(TextEmbedder):
+    """Mean-pooled sentence embeddings from an int8 ONNX model (e.g. the keyword model); catches paraphrases too."""
+
+    def __init__(self, model_dir: str, **encoder_options):
+        import numpy as np
+        self._np = np
+        self.encoder = OnnxTextEncoder(model_dir, **encoder_options)
+
+    def embed_batch(self, texts: List[str]) -> Any:
+        return self._np.stack(self.encoder.encode(list(texts)))
+
 class OpenAIIntentRecognizer(IntentRecognizer):
     def __init__(self, api_key: str = None):
         self.api_key = api_key if api_key else os.getenv("OPENAI_API_KEY")
@@ -86,88 +213,616 @@ class OpenAIIntentRecognizer(IntentRecognizer):
         if "促銷" in text: return {"intent": "促銷活動查詢"}
         return {"intent": "產品諮詢", "product_category": "保健食品"} # Default
 
+class AhoCorasickKeywordExtractor(KeywordExtractor):
+    """Dictionary-driven keywords: one automaton pass per text, ranked by occurrence count then first position."""
+
+    def __init__(self, term_dictionary_path: str):
+        self.matcher = AhoCorasickMatcher(load_term_dictionary(term_dictionary_path).get("keywords", []))
+
+    def match(self, text: str) -> List[PatternMatch]:
+        return self.matcher.find_all(text)
+
+    def extract(self, text: str, top_n: int = 5) -> List[str]:
+        counts = self.matcher.count(text) # Insertion order = first appearance
+        ranked = sorted(counts, key=lambda term: -counts[term]) # Stable sort keeps first appearance on ties
+        return ranked[:top_n]
+
+class AhoCorasickIntentRecognizer(IntentRecognizer):
+    """
+    Dictionary-driven intents. Rules are tried in file order, like an if/elif chain, but every rule's
+    patterns are matched in the same single pass over the text.
+    """
+
+    def __init__(self, term_dictionary_path: str):
+        term_dictionary = load_term_dictionary(term_dictionary_path)
+        self.rules = term_dictionary.get("intents", [])
+        self.default_intent = term_dictionary.get("default_intent")
+        self._rule_index_by_pattern: Dict[str, int] = {}
+        for rule_index, rule in enumerate(self.rules):
+            for pattern in rule.get("patterns", []):
+                self._rule_index_by_pattern.setdefault(pattern.lower(), rule_index)
+        self.matcher = AhoCorasickMatcher(self._rule_index_by_pattern)
+
+    def recognize(self, text: str) -> Optional[Dict[str, Any]]:
+        counts = self.matcher.count(text)
+        if not counts:
+            return dict(self.default_intent) if self.default_intent else None
+        rule_index = min(self._rule_index_by_pattern[term.lower()] for term in counts)
+        rule = self.rules[rule_index]
+        intent = {key: value for key, value in rule.items() if key != "patterns"}
+        intent["matched_terms"] = {
+            term: count for term, count in counts.items() if self._rule_index_by_pattern[term.lower()] == rule_index
+        }
+        return intent
+
 class RuleBasedRecommender(Recommender):
-    def __init__(self, product_catalog_path: str, customer_segments_path: str):
-        self.product_catalog = self._load_json_data(product_catalog_path)
-        self.customer_segments = self._load_json_data(customer_segments_path)
+    """
+    Catalog-driven recommendations: segment rules from `customer_segments_path` (built-in defaults when
+    absent) plus top products from `product_catalog_path`, answered from pre-built inverted indexes.
+    """
 
-    def _load_json_data(self, file_path: str) -> Dict[str, Any]:
-        if os.path.exists(file_path):
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        logger.warning(f"Data file not found: {file_path}")
-        return {}
+    def __init__(self, product_catalog_path: str, customer_segments_path: str,
+                 reload_interval_seconds: float = 30.0, max_products: int = 3):
+        self.catalog = CatalogStore(product_catalog_path, customer_segments_path, reload_interval_seconds)
+        self.max_products = max_products
 
     def generate_recommendations(self, summary: List[str], sentiment: Dict[str, float], keywords: List[str], intent: Optional[Dict[str, Any]]) -> List[str]:
-        recommendations = ["根據分析，建議："]
-        summary_text = " ".join(summary)
+        index = self.catalog.current() # One snapshot for the whole call, even if a reload swaps mid-way
+        intent = intent or {}
+        facts = {
+            "intent": intent.get("intent"),
+            "product_category": intent.get("product_category"),
+            "sentiment_label": sentiment.get("label"),
+            "sentiment_score": sentiment.get("score", 0),
+            "keywords": keywords,
+            "summary_text": " ".join(summary),
+        }
 
-        if intent and intent.get("product_category") == "睡眠產品":
-            recommendations.append("寄送「睡眠系列產品」推薦郵件。")
-        if intent and intent.get("product_category") == "腸胃照護產品":
-            recommendations.append("觸發自動推薦「腸胃照護」商品模組。")
-        if "促銷方案" in summary_text or (intent and intent.get("intent") == "促銷活動查詢"):
-            recommendations.append("促銷訊息應優先展示在首頁。")
-        if sentiment.get("label") == "negative" and sentiment.get("score", 0) > 0.8:
-            recommendations.append("客戶情緒較為負面，建議人工介入。")
+        recommendations = ["根據分析，建議："]
+        for rule in index.matching_rules(facts):
+            recommendations.extend(rule.get("recommendations", []))
+        for product in index.products_for(facts["product_category"], keywords, limit=self.max_products):
+            recommendations.append(f"推薦商品：{product.get('name', product['sku'])}（{product['sku']}）")
 
-        return list(set(recommendations)) # Remove duplicates
+        return list(dict.fromkeys(recommendations)) # Remove duplicates, keep order
 
 # --- InsightFlow Core Class ---
+def _timed_call(call: Callable[[], Any]) -> Tuple[Any, float]:
+    start = time.perf_counter()
+    result = call()
+    return result, (time.perf_counter() - start) * 1000.0
+
+def _record_timings(timings: Dict[str, float], mode: str, started: float):
+    for stage_name, elapsed_ms in timings.items():
+        STAGE_DURATION.observe(elapsed_ms / 1000.0, stage=stage_name)
+    PIPELINE_DURATION.observe(time.perf_counter() - started, mode=mode)
+
+def _without_metadata(result: Dict[str, Any]) -> Dict[str, Any]:
+    # Stage timings describe one particular run, so they are not worth caching
+    return {key: value for key, value in result.items() if key != "中繼資料"}
+
+class _LazyModule:
+    """
+    Descriptor for a strategy attribute of InsightFlowCore. The strategy is constructed (importing its
+    heavy dependencies and loading weights) the first time it is accessed, unless the core is eager.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __get__(self, core: Optional["InsightFlowCore"], owner=None):
+        if core is None:
+            return self
+        return core._get_module(self.name)
+
+    def __set__(self, core: "InsightFlowCore", module):
+        core._modules[self.name] = module
+
 class InsightFlowCore:
+    EXECUTION_MODES = ("sequential", "concurrent")
+    STAGE_NAMES = ("summarize", "sentiment", "keywords", "intent") # Independent stages, each with its own timeout
+    TIMED_STAGES = STAGE_NAMES + ("chunk_map",) # chunk_map: all windows of a long text
+    MODULE_NAMES = ("summarizer", "sentiment_analyzer", "keyword_extractor", "intent_recognizer", "recommender")
+    WARMUP_TEXT = "顧客抱怨胃部不適，想了解睡眠品質相關的保健食品與促銷方案。"
+
+    summarizer = _LazyModule("summarizer")
+    sentiment_analyzer = _LazyModule("sentiment_analyzer")
+    keyword_extractor = _LazyModule("keyword_extractor")
+    intent_recognizer = _LazyModule("intent_recognizer")
+    recommender = _LazyModule("recommender")
+    embedder = _LazyModule("embedder") # Only configured when near-duplicate reuse is enabled
+    RESULT_SCHEMA_VERSION = 1 # Bump when the result layout changes so cached results are not reused
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
-        # Initialize modules based on configuration (Strategy Pattern)
-        self.summarizer = self._load_module(config.get("summarizer_model_type"), {
+        # "sequential" runs the stages one after another; "concurrent" fans the four independent
+        # stages (summary, sentiment, keywords, intent) out to a thread pool before recommending.
+        self.execution_mode = config.get("execution_mode") or "sequential"
+        if self.execution_mode not in self.EXECUTION_MODES:
+            raise ValueError(f"Unknown execution mode: {self.execution_mode}")
+        self.stage_timeout_seconds = config.get("stage_timeout_seconds")
+        self.stage_timeouts = config.get("stage_timeouts", {}) # Per-stage overrides, e.g. {"summarize": 20}
+        self._stage_executor = None
+        if self.execution_mode == "concurrent":
+            self._stage_executor = ThreadPoolExecutor(
+                max_workers=config.get("max_stage_workers", 8), thread_name_prefix="insightflow-stage"
+            )
+
+        # Texts estimated above chunking.max_tokens are split into windows that are analyzed in parallel
+        # (map) and merged (reduce); per-window results are memoized so edited transcripts reuse them.
+        chunking_config = config.get("chunking") or {}
+        self.chunk_max_tokens = chunking_config.get("max_tokens", 1500) if chunking_config.get("enabled") else None
+        self.chunk_keywords_per_window = chunking_config.get("keywords_per_window", 10)
+        self._chunk_executor = None
+        if self.chunk_max_tokens:
+            self._chunk_executor = ThreadPoolExecutor(
+                max_workers=chunking_config.get("map_workers", 4), thread_name_prefix="insightflow-chunk"
+            )
+
+        # Resolve modules based on configuration (Strategy Pattern). Unknown types fail here; construction
+        # (heavy imports, model weights) is deferred to first use unless `lazy_modules` is False.
+        self._modules: Dict[str, Any] = {}
+        self._module_specs: Dict[str, Tuple[type, Dict[str, Any]]] = {}
+        self._module_lock = threading.Lock()
+        self.module_load_ms: Dict[str, float] = {}
+        self.warmed_up = False
+
+        self._module_specs["summarizer"] = self._resolve_module(config.get("summarizer_model_type"), {
             "gpt_summarizer": GPTSummarizer,
             # "hf_summarizer": HFSummarizer, # Add actual HF summarizer class here
         }, api_key=config.get("OPENAI_API_KEY"))
 
-        self.sentiment_analyzer = self._load_module(config.get("sentiment_model_type"), {
+        onnx_config = config.get("onnx") or {}
+        onnx_encoder_options = {
+            key: onnx_config[key] for key in ("max_length", "max_batch_size", "max_batch_tokens", "intra_op_threads")
+            if key in onnx_config
+        }
+        self._module_specs["sentiment_analyzer"] = self._resolve_module(config.get("sentiment_model_type"), {
             "hf_sentiment_analyzer": HFSentimentAnalyzer,
-        }, model_name=config.get("sentiment_model_name"))
+            "onnx_sentiment_analyzer": OnnxSentimentAnalyzer,
+        }, model_name=config.get("sentiment_model_name"), type_kwargs={
+            "onnx_sentiment_analyzer": {"model_dir": onnx_config.get("sentiment_model_dir"), **onnx_encoder_options},
+        })
 
-        self.keyword_extractor = self._load_module(config.get("keyword_extractor_type"), {
+        term_dictionary_kwargs = {"term_dictionary_path": config.get("term_dictionary_path")}
+        self._module_specs["keyword_extractor"] = self._resolve_module(config.get("keyword_extractor_type"), {
             "keybert_extractor": KeyBERTKeywordExtractor,
+            "aho_corasick_extractor": AhoCorasickKeywordExtractor,
+            "onnx_keyword_extractor": OnnxKeywordExtractor,
+        }, type_kwargs={
+            "aho_corasick_extractor": term_dictionary_kwargs,
+            "onnx_keyword_extractor": {"model_dir": onnx_config.get("keyword_model_dir"), **onnx_encoder_options},
         })
 
-        self.intent_recognizer = self._load_module(config.get("intent_recognizer_type"), {
+        self._module_specs["intent_recognizer"] = self._resolve_module(config.get("intent_recognizer_type"), {
             "openai_function_calling_recognizer": OpenAIIntentRecognizer,
-        }, api_key=config.get("OPENAI_API_KEY"))
+            "aho_corasick_recognizer": AhoCorasickIntentRecognizer,
+        }, api_key=config.get("OPENAI_API_KEY"), type_kwargs={"aho_corasick_recognizer": term_dictionary_kwargs})
 
-        self.recommender = self._load_module("rule_based_recommender", { # Current fixed to rule-based
+        self._module_specs["recommender"] = self._resolve_module("rule_based_recommender", { # Current fixed to rule-based
             "rule_based_recommender": RuleBasedRecommender,
         }, product_catalog_path=config.get("recommender_config", {}).get("product_catalog_path"),
-           customer_segments_path=config.get("recommender_config", {}).get("customer_segments_path"))
+           customer_segments_path=config.get("recommender_config", {}).get("customer_segments_path"),
+           reload_interval_seconds=config.get("recommender_config", {}).get("reload_interval_seconds", 30.0),
+           max_products=config.get("recommender_config", {}).get("max_products", 3))
+
+        # Texts the exact-match cache misses can reuse the result of a near-duplicate (see near_duplicate.py)
+        near_duplicate_config = config.get("near_duplicate") or {}
+        if near_duplicate_config.get("enabled"):
+            self._module_specs["embedder"] = self._resolve_module(
+                near_duplicate_config.get("embedder_type", "hashed_ngram_embedder"), {
+                    "hashed_ngram_embedder": HashedNgramEmbedder,
+                    "onnx_embedder": OnnxTextEmbedder,
+                }, dim=near_duplicate_config.get("dim", 512), type_kwargs={
+                    "onnx_embedder": {
+                        "model_dir": near_duplicate_config.get("model_dir") or onnx_config.get("keyword_model_dir"),
+                        **onnx_encoder_options,
+                    },
+                })
+        if not config.get("lazy_modules", True):
+            self.load_modules()
+
+        self.result_cache = self._build_result_cache(config.get("result_cache") or {})
+        self.chunk_memo = None
+        if self.chunk_max_tokens and chunking_config.get("memo_max_entries", 16384) > 0:
+            self.chunk_memo = ResultCache(
+                fingerprint=self._module_fingerprint(),
+                max_entries=chunking_config.get("memo_max_entries", 16384),
+                redis_client=self.result_cache.redis_client if self.result_cache else None, # Share the Redis tier if any
+                redis_ttl_seconds=self.result_cache.redis_ttl_seconds if self.result_cache else 86400,
+                key_prefix="insightflow:chunk:",
+            )
+        self.near_duplicates = None
+        self.near_duplicate_max_tokens = near_duplicate_config.get("max_tokens", 512)
+        if near_duplicate_config.get("enabled"):
+            self.near_duplicates = NearDuplicateIndex(
+                fingerprint=config_fingerprint({"modules": self._module_fingerprint(), "embedder": {
+                    key: value for key, value in near_duplicate_config.items()
+                    if key in ("embedder_type", "dim", "model_dir")
+                }}),
+                threshold=near_duplicate_config.get("threshold", 0.92),
+                max_entries=near_duplicate_config.get("max_entries", 20000),
+                persist_dir=near_duplicate_config.get("persist_dir"),
+                persist_interval_seconds=near_duplicate_config.get("persist_interval_seconds", 300.0),
+            )
+
+    def _module_fingerprint(self) -> str:
+        """Fingerprint of the active strategies; part of every cache key, so a config change invalidates the cache."""
+        module_classes = [module_class for module_class, _ in self._module_specs.values()]
+        return config_fingerprint({
+            "schema_version": self.RESULT_SCHEMA_VERSION,
+            "summarizer_model_type": self.config.get("summarizer_model_type"),
+            "sentiment_model_type": self.config.get("sentiment_model_type"),
+            "sentiment_model_name": self.config.get("sentiment_model_name"),
+            "keyword_extractor_type": self.config.get("keyword_extractor_type"),
+            "intent_recognizer_type": self.config.get("intent_recognizer_type"),
+            "term_dictionary_path": self.config.get("term_dictionary_path"),
+            "recommender_config": self.config.get("recommender_config", {}),
+            "chunking": self.config.get("chunking") or {},
+            "onnx": self.config.get("onnx") or {},
+            "module_classes": [
+                f"{getattr(c, '__module__', '')}.{getattr(c, '__qualname__', repr(c))}" for c in module_classes
+            ],
+        })
+
+    def _data_version(self) -> str:
+        # Recommendations depend on the hot-reloadable catalog, so its version is part of every cache key
+        catalog = getattr(self.recommender, "catalog", None)
+        return catalog.version if isinstance(catalog, CatalogStore) else ""
 
-    def _load_module(self, module_type: str, module_map: Dict[str, type], **kwargs):
-        """Helper to load module based on type."""
+    def _build_result_cache(self, cache_config: Dict[str, Any]) -> Optional[ResultCache]:
+        if not cache_config.get("enabled"):
+            return None
+        redis_client = None
+        if cache_config.get("redis_enabled"):
+            import redis # Only needed for the shared tier
+            redis_client = redis.Redis(
+                host=cache_config.get("redis_host", "redis"),
+                port=cache_config.get("redis_port", 6379),
+                db=cache_config.get("redis_db", 0),
+            )
+        return ResultCache(
+            fingerprint=self._module_fingerprint(),
+            max_entries=cache_config.get("max_entries", 4096),
+            redis_client=redis_client,
+            redis_ttl_seconds=cache_config.get("redis_ttl_seconds", 86400),
+        )
+
+    def _resolve_module(self, module_type: str, module_map: Dict[str, type], type_kwargs: Optional[Dict[str, Dict[str, Any]]] = None, **kwargs) -> Tuple[type, Dict[str, Any]]:
+        """
+        Helper to pick the module class (and its constructor arguments) based on type.
+        `kwargs` go to every implementation; `type_kwargs` replaces them for specific types that need other arguments.
+        """
         module_class = module_map.get(module_type)
         if not module_class:
             raise ValueError(f"Unknown module type: {module_type}")
-        return module_class(**kwargs)
+        if type_kwargs and module_type in type_kwargs:
+            kwargs = type_kwargs[module_type]
+        return module_class, kwargs
+
+    def _get_module(self, name: str):
+        module = self._modules.get(name)
+        if module is not None:
+            return module
+        with self._module_lock: # Concurrent first uses (stage threads, API requests) build it once
+            module = self._modules.get(name)
+            if module is None:
+                module_class, kwargs = self._module_specs[name]
+                start = time.perf_counter()
+                module = module_class(**kwargs)
+                self.module_load_ms[name] = (time.perf_counter() - start) * 1000.0
+                MODULE_LOAD_DURATION.observe(self.module_load_ms[name] / 1000.0, module=name)
+                logger.info(f"Loaded {name} ({module_class.__name__ if isinstance(module_class, type) else module_class}) in {self.module_load_ms[name]:.1f} ms")
+                self._modules[name] = module
+        return module
+
+    def load_modules(self):
+        """Constructs every strategy now (e.g. before forking workers, so they share the loaded weights)."""
+        for name in self._module_specs:
+            self._get_module(name)
+
+    def warm_up(self, sample_text: Optional[str] = None) -> Dict[str, float]:
+        """
+        Loads every strategy and runs one sample through each (bypassing the result cache) so the first
+        real request does not pay for imports, weight loading or lazy initialization.
+        Returns per-module load times plus the sample run, in ms.
+        """
+        start = time.perf_counter()
+        self.load_modules()
+        # Called directly rather than through the stage/chunk pools: the supervisor warms up before forking,
+        # and executor threads started in the parent would not exist in the children.
+        sample = self._analyze_window(sample_text or self.WARMUP_TEXT)
+        self.recommender.generate_recommendations(
+            summary=sample["summarize"], sentiment=sample["sentiment"], keywords=sample["keywords"], intent=sample["intent"]
+        )
+        self.warmed_up = True
+        timings = {**self.module_load_ms, "warmup_total": (time.perf_counter() - start) * 1000.0}
+        logger.info(f"InsightFlowCore warmed up in {timings['warmup_total']:.1f} ms")
+        return timings
+
+    def shutdown(self):
+        """Releases the stage (concurrent mode) and chunk (chunking enabled) thread pools and saves the near-duplicate index."""
+        for executor in (self._stage_executor, self._chunk_executor):
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+        if self.near_duplicates is not None:
+            self.near_duplicates.save()
+
+    def _stage_timeout(self, stage_name: str) -> Optional[float]:
+        return self.stage_timeouts.get(stage_name, self.stage_timeout_seconds)
+
+    def _run_stages(self, stage_calls: Dict[str, Callable[[], Any]]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """Runs the independent analysis stages and returns their outputs and timings (ms) by stage name."""
+        outputs, timings = {}, {}
+        if not self._stage_executor:
+            for stage_name, call in stage_calls.items():
+                outputs[stage_name], timings[stage_name] = _timed_call(call)
+            return outputs, timings
+
+        start = time.monotonic()
+        futures = {stage_name: self._stage_executor.submit(_timed_call, call) for stage_name, call in stage_calls.items()}
+        try:
+            for stage_name, future in futures.items():
+                timeout = self._stage_timeout(stage_name)
+                remaining = None if timeout is None else max(0.0, start + timeout - time.monotonic())
+                try:
+                    outputs[stage_name], timings[stage_name] = future.result(timeout=remaining)
+                except FuturesTimeoutError:
+                    raise TimeoutError(f"Stage '{stage_name}' timed out after {timeout}s")
+        except BaseException:
+            # Don't start stages whose result can no longer be used. Running ones finish in the background.
+            for future in futures.values():
+                future.cancel()
+            raise
+        return outputs, timings
+
+    def _build_metadata(self, timings: Dict[str, float], batch_size: int = 1) -> Dict[str, Any]:
+        return {
+            "execution_mode": self.execution_mode,
+            "batch_size": batch_size,
+            "stage_timings_ms": {stage_name: round(elapsed, 3) for stage_name, elapsed in timings.items()},
+        }
 
     def process_customer_feedback(self, user_input: str) -> Dict[str, Any]:
         """Processes customer feedback through various AI modules."""
+        if not self.result_cache:
+            return self._process_misses([user_input])[0]
+
+        data_version = self._data_version()
+        cache_key = self.result_cache.make_key(user_input, data_version)
+        cached = self.result_cache.get(cache_key)
+        RESULT_CACHE_LOOKUPS.inc(outcome="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+        result = self._process_misses([user_input])[0]
+        self.result_cache.set(cache_key, _without_metadata(result))
+        return result
+
+    def process_customer_feedback_batch(self, user_inputs: List[str]) -> List[Dict[str, Any]]:
+        """
+        Processes a batch of customer feedback texts, calling each module once for the whole batch.
+        Results are returned in the same order as `user_inputs`.
+        """
+        if not self.result_cache:
+            return self._process_misses(user_inputs, batch=True)
+
+        data_version = self._data_version()
+        results: List[Optional[Dict[str, Any]]] = [None] * len(user_inputs)
+        pending: Dict[str, List[int]] = {} # cache key -> input positions; duplicates are analyzed once
+        for position, user_input in enumerate(user_inputs):
+            cache_key = self.result_cache.make_key(user_input, data_version)
+            if cache_key in pending:
+                pending[cache_key].append(position)
+                continue
+            cached = self.result_cache.get(cache_key)
+            RESULT_CACHE_LOOKUPS.inc(outcome="miss" if cached is None else "hit")
+            if cached is not None:
+                results[position] = cached
+            else:
+                pending[cache_key] = [position]
+
+        if pending:
+            miss_keys = list(pending)
+            fresh_results = self._process_misses([user_inputs[pending[key][0]] for key in miss_keys], batch=True)
+            for cache_key, result in zip(miss_keys, fresh_results):
+                self.result_cache.set(cache_key, _without_metadata(result))
+                first, *duplicates = pending[cache_key]
+                results[first] = result
+                for position in duplicates:
+                    results[position] = copy.deepcopy(result)
+        return results
+
+    def _process_misses(self, user_inputs: List[str], batch: bool = False) -> List[Dict[str, Any]]:
+        """
+        Analyzes texts the exact-match cache did not have (in one batch call if `batch`), first reusing
+        the results of near-duplicates: earlier texts in the index, or an earlier text of the same batch.
+        """
+        analyze = self._process_batch_uncached if batch else lambda texts: [self._process_uncached(texts[0])]
+        eligible = [position for position, user_input in enumerate(user_inputs)
+                    if self.near_duplicates is not None and not self._needs_chunking(user_input)
+                    and estimate_tokens(user_input) <= self.near_duplicate_max_tokens]
+        if not eligible:
+            return analyze(user_inputs)
+
+        data_version = self._data_version()
+        vectors = self.embedder.embed_batch([user_inputs[position] for position in eligible])
+        results: List[Optional[Dict[str, Any]]] = [None] * len(user_inputs)
+        reused = self.near_duplicates.search(vectors, data_version)
+        for position, result in zip(eligible, reused):
+            results[position] = result
+        NEAR_DUPLICATE_LOOKUPS.inc(len(reused) - reused.count(None), outcome="hit")
+
+        # Among the misses, near-duplicates of an earlier text in this batch wait for its result
+        missed = [row for row, result in enumerate(reused) if result is None]
+        representatives = self.near_duplicates.representatives(vectors[missed]) if missed else []
+        followers = {missed[row]: missed[leader] for row, leader in enumerate(representatives) if leader != row}
+        NEAR_DUPLICATE_LOOKUPS.inc(len(followers), outcome="batch_hit")
+        NEAR_DUPLICATE_LOOKUPS.inc(len(missed) - len(followers), outcome="miss")
+        follower_positions = {eligible[row] for row in followers}
+
+        fresh_positions = [position for position, result in enumerate(results)
+                           if result is None and position not in follower_positions]
+        fresh_results = analyze([user_inputs[position] for position in fresh_positions]) if fresh_positions else []
+        for position, result in zip(fresh_positions, fresh_results):
+            results[position] = result
+        for row, leader in followers.items():
+            results[eligible[row]] = copy.deepcopy(_without_metadata(results[eligible[leader]]))
+
+        stored = [row for row in missed if row not in followers]
+        if stored:
+            self.near_duplicates.add(vectors[stored], [_without_metadata(results[eligible[row]]) for row in stored], data_version)
+        return results
+
+    def _needs_chunking(self, user_input: str) -> bool:
+        return bool(self.chunk_max_tokens) and estimate_tokens(user_input) > self.chunk_max_tokens
+
+    def _analyze_batch(self, user_inputs: List[str]) -> Tuple[Dict[str, List[Any]], Dict[str, float]]:
+        """Runs the four analysis stages over a batch with one call each; long texts take the map-reduce path."""
+        long_positions = [position for position, text in enumerate(user_inputs) if self._needs_chunking(text)]
+        if not long_positions:
+            return self._run_stages({
+                "summarize": lambda: self.summarizer.summarize_batch(user_inputs),
+                "sentiment": lambda: self.sentiment_analyzer.analyze_batch(user_inputs),
+                "keywords": lambda: self.keyword_extractor.extract_batch(user_inputs),
+                "intent": lambda: self.intent_recognizer.recognize_batch(user_inputs),
+            })
+
+        outputs: Dict[str, List[Any]] = {stage_name: [None] * len(user_inputs) for stage_name in self.STAGE_NAMES}
+        timings: Dict[str, float] = {}
+        long_set = set(long_positions)
+        short_positions = [position for position in range(len(user_inputs)) if position not in long_set]
+        if short_positions:
+            short_outputs, timings = self._analyze_batch([user_inputs[position] for position in short_positions])
+            for stage_name, values in short_outputs.items():
+                for position, value in zip(short_positions, values):
+                    outputs[stage_name][position] = value
+        for position in long_positions:
+            long_outputs, long_timings = self._map_reduce(user_inputs[position])
+            for stage_name, value in long_outputs.items():
+                outputs[stage_name][position] = value
+            for stage_name, elapsed in long_timings.items():
+                timings[stage_name] = timings.get(stage_name, 0.0) + elapsed
+        return outputs, timings
+
+    def _analyze_window(self, window: str) -> Dict[str, Any]:
+        return {
+            "summarize": self.summarizer.summarize(window),
+            "sentiment": self.sentiment_analyzer.analyze(window),
+            "keywords": self.keyword_extractor.extract(window, top_n=self.chunk_keywords_per_window),
+            "intent": self.intent_recognizer.recognize(window),
+        }
+
+    def _map_reduce(self, user_input: str) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """Analyzes a long text window by window (memoized, in parallel), then merges the window results."""
+        map_start = time.perf_counter()
+        windows = chunk_text(user_input, self.chunk_max_tokens)
+        window_results: Dict[str, Dict[str, Any]] = {} # memo key -> result; repeated windows are analyzed once
+        window_keys = []
+        for window in windows:
+            key = self.chunk_memo.make_key(window) if self.chunk_memo else window
+            window_keys.append(key)
+            if key in window_results:
+                continue
+            cached = self.chunk_memo.get(key) if self.chunk_memo else None
+            CHUNK_MEMO_LOOKUPS.inc(outcome="miss" if cached is None else "hit")
+            if cached is not None:
+                window_results[key] = cached
+
+        pending = {key: window for key, window in zip(window_keys, windows) if key not in window_results}
+        futures = {key: self._chunk_executor.submit(self._analyze_window, window) for key, window in pending.items()}
         try:
-            summary_output = self.summarizer.summarize(user_input)
-            sentiment_score = self.sentiment_analyzer.analyze(user_input)
-            keywords = self.keyword_extractor.extract(user_input)
-            intent = self.intent_recognizer.recognize(user_input)
-            recommendations = self.recommender.generate_recommendations(
-                summary=summary_output,
-                sentiment=sentiment_score,
-                keywords=keywords,
-                intent=intent
-            )
+            timeout = self._stage_timeout("chunk_map")
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for key, future in futures.items():
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                try:
+                    window_results[key] = future.result(timeout=remaining)
+                except FuturesTimeoutError:
+                    raise TimeoutError(f"Stage 'chunk_map' timed out after {timeout}s")
+                if self.chunk_memo:
+                    self.chunk_memo.set(key, window_results[key])
+        except BaseException:
+            for future in futures.values():
+                future.cancel()
+            raise
+        timings = {"chunk_map": (time.perf_counter() - map_start) * 1000.0}
+
+        reduce_start = time.perf_counter()
+        results = [window_results[key] for key in window_keys]
+        weights = [estimate_tokens(window) for window in windows]
+        outputs = {
+            "summarize": reduce_summaries([r["summarize"] for r in results], self.summarizer.summarize, self.chunk_max_tokens),
+            "sentiment": reduce_sentiments([r["sentiment"] for r in results], weights),
+            "keywords": reduce_keywords([r["keywords"] for r in results], top_n=5),
+            "intent": reduce_intents([r["intent"] for r in results], weights),
+        }
+        timings["chunk_reduce"] = (time.perf_counter() - reduce_start) * 1000.0
+        logger.info(f"Map-reduce over {len(windows)} windows ({len(pending)} analyzed, {len(windows) - len(pending)} reused)")
+        return outputs, timings
+
+    def _process_uncached(self, user_input: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            if self._needs_chunking(user_input):
+                outputs, timings = self._map_reduce(user_input)
+            else:
+                outputs, timings = self._run_stages({
+                    "summarize": lambda: self.summarizer.summarize(user_input),
+                    "sentiment": lambda: self.sentiment_analyzer.analyze(user_input),
+                    "keywords": lambda: self.keyword_extractor.extract(user_input),
+                    "intent": lambda: self.intent_recognizer.recognize(user_input),
+                })
+            recommendations, timings["recommend"] = _timed_call(lambda: self.recommender.generate_recommendations(
+                summary=outputs["summarize"],
+                sentiment=outputs["sentiment"],
+                keywords=outputs["keywords"],
+                intent=outputs["intent"]
+            ))
 
-            return {
-                "摘要": summary_output,
+            result = {
+                "摘要": outputs["summarize"],
                 "推薦": recommendations,
-                "情緒分數": sentiment_score,
-                "關鍵字": keywords,
-                "意圖": intent,
+                "情緒分數": outputs["sentiment"],
+                "關鍵字": outputs["keywords"],
+                "意圖": outputs["intent"],
             }
+            _record_timings(timings, "single", started)
+            if self._stage_executor:
+                result["中繼資料"] = self._build_metadata(timings)
+            return result
         except Exception as e:
             logger.error(f"Error during feedback processing: {e}", exc_info=True)
             raise # Re-raise to be handled by caller
+
+    def _process_batch_uncached(self, user_inputs: List[str]) -> List[Dict[str, Any]]:
+        if not user_inputs:
+            return []
+        started = time.perf_counter()
+        try:
+            outputs, timings = self._analyze_batch(user_inputs)
+            recommendations_list, timings["recommend"] = _timed_call(lambda: self.recommender.generate_recommendations_batch(
+                summaries=outputs["summarize"],
+                sentiments=outputs["sentiment"],
+                keywords_list=outputs["keywords"],
+                intents=outputs["intent"]
+            ))
+
+            results = [
+                {
+                    "摘要": summary_output,
+                    "推薦": recommendations,
+                    "情緒分數": sentiment_score,
+                    "關鍵字": keywords,
+                    "意圖": intent,
+                }
+                for summary_output, recommendations, sentiment_score, keywords, intent
+                in zip(outputs["summarize"], recommendations_list, outputs["sentiment"], outputs["keywords"], outputs["intent"])
+            ]
+            _record_timings(timings, "batch", started)
+            if self._stage_executor:
+                for result in results: # One dict each: callers (and the caches) may modify a result in place
+                    result["中繼資料"] = self._build_metadata(timings, batch_size=len(user_inputs))
+            return results
+        except Exception as e:
+            logger.error(f"Error during batch feedback processing ({len(user_inputs)} texts): {e}", exc_info=True)
+            raise # Re-raise to be handled by caller
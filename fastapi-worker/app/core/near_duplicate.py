@@ -0,0 +1,246 @@
+"""
+Near-duplicate result reuse for InsightFlowCore.
+
+A lot of feedback repeats earlier feedback almost word for word (a different particle, punctuation, a
+greeting added), which the exact-match ResultCache never sees. Texts that miss it are embedded (a
+TextEmbedder strategy) and looked up in a NearDuplicateIndex; when the most similar stored text reaches
+`threshold` cosine similarity, its analysis is reused and the summarizer, intent recognizer and the
+other stages are not called for that text at all.
+
+The index is an in-process NumPy matrix of unit vectors, searched with one matrix product per batch.
+A worker keeps a few tens of thousands of entries at most, where a brute-force scan costs a few
+milliseconds per batch (benchmarks/bench_near_duplicate.py), next to seconds for the model calls it
+saves, and unlike a partitioned (IVF) or graph index it needs no training or rebuilds as entries are
+evicted and replaced. Once `max_entries` is reached, the least recently used entry (by hit or insert)
+is overwritten in place.
+
+Persistence: save() writes the vector matrix to a file of its own (vectors-<id>.npy) and then the
+entries (entries.json), which name that file, to `persist_dir` every `persist_interval_seconds` while
+entries change and on shutdown. Replacing entries.json is the only step other processes can observe,
+so a reader always gets vectors and results from the same save, however the saves of the consumers
+(which all share the directory) interleave; the last entries.json written wins. Vector files no
+entries.json refers to any more are deleted once they are STALE_VECTORS_SECONDS old (younger ones may
+belong to a save still in progress). A new index loads the files (a full matrix is memory-mapped
+copy-on-write); the supervisor builds the core before forking, so consumers start with the saved
+entries. Files written under a different fingerprint (other strategies or embedder) are ignored.
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ENTRIES_FILE = "entries.json"
+VECTORS_PATTERN = "vectors*.npy"
+STALE_VECTORS_SECONDS = 600.0
+
+
+class NearDuplicateIndex:
+    """Cosine-similarity lookup from text embeddings to stored results. Thread-safe."""
+
+    def __init__(self, fingerprint: str, threshold: float = 0.92, max_entries: int = 20000,
+                 persist_dir: Optional[str] = None, persist_interval_seconds: float = 300.0):
+        try:
+            import numpy as np
+        except ImportError as e:
+            raise ImportError(f"Near-duplicate reuse needs numpy installed ({e})") from e
+        self._np = np
+        self.fingerprint = fingerprint
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.persist_dir = persist_dir or None
+        self.persist_interval_seconds = persist_interval_seconds
+        self.data_version = ""
+        self._vectors = None # (max_entries, dim) float32, allocated on the first insert or load
+        self._results: List[Optional[str]] = [] # JSON per slot, so every hit hands out a fresh copy
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._size = 0
+        self._tick = 0
+        self._lock = threading.Lock()
+        self._next_save = time.monotonic() + persist_interval_seconds
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.persist_dir:
+            self.load()
+
+    def normalize(self, vectors) -> Any:
+        """Rows scaled to unit length (all-zero rows stay zero and never match)."""
+        np = self._np
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def representatives(self, vectors) -> List[int]:
+        """
+        For texts of one batch that are near-duplicates of each other: the position of the first such
+        text for each row (its own position when it has none), so only one of them is analyzed.
+        """
+        vectors = self.normalize(vectors)
+        similarities = vectors @ vectors.T
+        representatives: List[int] = []
+        for row in range(len(vectors)):
+            earlier = [position for position in range(row)
+                       if representatives[position] == position and similarities[row, position] >= self.threshold]
+            representatives.append(earlier[0] if earlier else row)
+        return representatives
+
+    def _reset_if_stale(self, data_version: str):
+        # Results embed recommendations, so a catalog reload invalidates every entry
+        if data_version != self.data_version:
+            if self._size:
+                logger.info(f"Near-duplicate index cleared: data version {self.data_version!r} -> {data_version!r}")
+            self._size = 0
+            self._results = []
+            self._last_used[:] = 0
+            self.data_version = data_version
+            self._dirty = True
+
+    def search(self, vectors, data_version: str = "") -> List[Optional[Dict[str, Any]]]:
+        """The stored result of each row's nearest entry when it is similar enough, else None."""
+        vectors = self.normalize(vectors)
+        with self._lock:
+            self._reset_if_stale(data_version)
+            if not self._size or vectors.shape[1] != self._vectors.shape[1]:
+                self.misses += len(vectors)
+                return [None] * len(vectors)
+            similarities = vectors @ self._vectors[:self._size].T
+            best = similarities.argmax(axis=1)
+            results: List[Optional[Dict[str, Any]]] = []
+            for row, slot in enumerate(best.tolist()):
+                if similarities[row, slot] >= self.threshold:
+                    self._tick += 1
+                    self._last_used[slot] = self._tick
+                    self.hits += 1
+                    results.append(json.loads(self._results[slot]))
+                else:
+                    self.misses += 1
+                    results.append(None)
+            return results
+
+    def add(self, vectors, results: List[Dict[str, Any]], data_version: str = ""):
+        np = self._np
+        vectors = self.normalize(vectors)
+        with self._lock:
+            self._reset_if_stale(data_version)
+            if self._vectors is None or vectors.shape[1] != self._vectors.shape[1]:
+                self._vectors = np.zeros((self.max_entries, vectors.shape[1]), dtype=np.float32)
+                self._size = 0
+                self._results = []
+            for vector, result in zip(vectors, results):
+                if self._size < self.max_entries:
+                    slot = self._size
+                    self._size += 1
+                    self._results.append(None)
+                else:
+                    slot = int(self._last_used.argmin())
+                    self.evictions += 1
+                self._tick += 1
+                self._vectors[slot] = vector
+                self._results[slot] = json.dumps(result, ensure_ascii=False)
+                self._last_used[slot] = self._tick
+            self._dirty = True
+        self.maybe_save()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def maybe_save(self):
+        if self.persist_dir and self._dirty and time.monotonic() >= self._next_save:
+            self.save()
+
+    def save(self) -> bool:
+        """Writes the index to `persist_dir`. Failures are logged, never raised: the index is only a cache."""
+        if not self.persist_dir:
+            return False
+        np = self._np
+        with self._lock:
+            self._next_save = time.monotonic() + self.persist_interval_seconds
+            if self._vectors is None:
+                return False
+            vectors = np.array(self._vectors[:self._size])
+            save_id = uuid.uuid4().hex
+            vectors_file = f"vectors-{save_id}.npy"
+            entries = {
+                "fingerprint": self.fingerprint,
+                "vectors_file": vectors_file,
+                "data_version": self.data_version,
+                "results": self._results[:self._size],
+                "last_used": self._last_used[:self._size].tolist(),
+            }
+            self._dirty = False
+        try:
+            os.makedirs(self.persist_dir, exist_ok=True)
+            entries_path = os.path.join(self.persist_dir, ENTRIES_FILE)
+            with open(os.path.join(self.persist_dir, vectors_file), "wb") as f:
+                np.save(f, vectors) # Nobody reads it before entries.json names it
+            with open(f"{entries_path}.{save_id}.tmp", "w", encoding="utf-8") as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(f"{entries_path}.{save_id}.tmp", entries_path)
+        except OSError as e:
+            logger.warning(f"Could not save the near-duplicate index to {self.persist_dir}: {e}")
+            return False
+        logger.info(f"Saved {len(vectors)} near-duplicate index entries to {self.persist_dir}")
+        self._remove_stale_vectors()
+        return True
+
+    def _remove_stale_vectors(self):
+        try:
+            with open(os.path.join(self.persist_dir, ENTRIES_FILE), encoding="utf-8") as f:
+                current = json.load(f).get("vectors_file")
+        except (OSError, ValueError):
+            return
+        for path in glob.glob(os.path.join(self.persist_dir, VECTORS_PATTERN)):
+            try:
+                if os.path.basename(path) != current and time.time() - os.path.getmtime(path) > STALE_VECTORS_SECONDS:
+                    os.remove(path)
+            except OSError:
+                pass # Removed by another consumer
+
+    def load(self) -> bool:
+        """Loads what save() wrote, unless it is missing, unreadable or from another fingerprint."""
+        np = self._np
+        try:
+            with open(os.path.join(self.persist_dir, ENTRIES_FILE), encoding="utf-8") as f:
+                entries = json.load(f)
+            if entries.get("fingerprint") != self.fingerprint:
+                logger.info(f"Ignoring near-duplicate index in {self.persist_dir}: written for another configuration")
+                return False
+            vectors = np.load(os.path.join(self.persist_dir, os.path.basename(entries["vectors_file"])), mmap_mode="c")
+            count = len(vectors)
+            if not count == len(entries["results"]) == len(entries["last_used"]):
+                raise ValueError(f"{count} vectors for {len(entries['results'])} results")
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable near-duplicate index in {self.persist_dir}: {e}")
+            return False
+
+        slots = list(range(count))
+        if count > self.max_entries: # Configured smaller since: keep the most recently used entries
+            slots = sorted(sorted(slots, key=lambda slot: entries["last_used"][slot])[-self.max_entries:])
+        with self._lock:
+            if count == self.max_entries:
+                self._vectors = vectors # Full: use the copy-on-write mapping, pages are read in as needed
+            else:
+                self._vectors = np.zeros((self.max_entries, vectors.shape[1]), dtype=np.float32)
+                self._vectors[:len(slots)] = vectors[slots]
+            self._results = [entries["results"][slot] for slot in slots]
+            self._last_used[:] = 0
+            self._last_used[:len(slots)] = [entries["last_used"][slot] for slot in slots]
+            self._tick = int(self._last_used.max(initial=0))
+            self._size = len(slots)
+            self.data_version = entries.get("data_version", "")
+            self._dirty = False
+        logger.info(f"Loaded {self._size} near-duplicate index entries from {self.persist_dir}")
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": self._size}
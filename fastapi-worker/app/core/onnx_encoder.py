@@ -0,0 +1,162 @@
+"""
+Local int8 ONNX Runtime inference for the onnx_* strategies (CPU-only worker nodes).
+
+A model directory holds an exported, dynamically quantized model plus its tokenizer, as written by
+benchmarks/export_onnx.py:
+
+    model.onnx       int8 weights, dynamic batch and sequence axes
+    tokenizer.json   Hugging Face fast tokenizer
+    config.json      the original model config (id2label, pad_token_id)
+
+Texts are batched, but never padded to the longest text of the whole batch: they are sorted by token
+length and cut into buckets, each padded only to its own longest member (rounded up to a multiple of
+`pad_multiple`). A bucket closes at `max_batch_size` texts or `max_batch_tokens` padded tokens, so a
+few long transcripts neither blow up memory nor make every short text pay for their padding.
+
+numpy, onnxruntime and tokenizers are imported when an encoder is constructed, so selecting another
+strategy never needs them installed.
+"""
+import json
+import logging
+import os
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_CJK_RUN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_LATIN_WORD = re.compile(r"[A-Za-z][A-Za-z0-9\-]+")
+
+
+def padded_length(length: int, pad_multiple: int) -> int:
+    return -(-max(length, 1) // pad_multiple) * pad_multiple
+
+
+def length_buckets(lengths: Sequence[int], max_batch_size: int, max_batch_tokens: int,
+                   pad_multiple: int = 8) -> List[List[int]]:
+    """
+    Groups text indices into batches of similar length. Each bucket holds at most `max_batch_size`
+    indices and at most `max_batch_tokens` tokens once padded to its longest member.
+    """
+    order = sorted(range(len(lengths)), key=lambda index: lengths[index])
+    buckets: List[List[int]] = []
+    current: List[int] = []
+    for index in order:
+        # Sorted ascending, so the newcomer sets the bucket's padded length
+        width = padded_length(lengths[index], pad_multiple)
+        if current and (len(current) >= max_batch_size or (len(current) + 1) * width > max_batch_tokens):
+            buckets.append(current)
+            current = []
+        current.append(index)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def candidate_phrases(text: str, ngram_range: Tuple[int, int] = (2, 4), max_candidates: int = 48) -> List[str]:
+    """
+    Keyword candidates for embedding-similarity ranking (what KeyBERT gets from CountVectorizer, which
+    does not segment Chinese): character n-grams of CJK runs plus Latin words, most frequent first.
+    """
+    counts: Dict[str, int] = {}
+    low, high = ngram_range
+    for run in _CJK_RUN.findall(text):
+        for size in range(low, min(high, len(run)) + 1):
+            for start in range(len(run) - size + 1):
+                gram = run[start:start + size]
+                counts[gram] = counts.get(gram, 0) + 1
+    for word in _LATIN_WORD.findall(text):
+        word = word.lower()
+        counts[word] = counts.get(word, 0) + 1
+    return sorted(counts, key=lambda phrase: -counts[phrase])[:max_candidates] # Ties: first appearance
+
+
+class OnnxTextEncoder:
+    """Tokenizer plus ONNX Runtime session, running texts in length buckets. Thread-safe to call."""
+
+    def __init__(self, model_dir: str, model_file: str = "model.onnx", max_length: int = 256,
+                 max_batch_size: int = 32, max_batch_tokens: int = 8192, pad_multiple: int = 8,
+                 intra_op_threads: int = 1):
+        try:
+            import numpy as np
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                f"The onnx_* strategies need numpy, onnxruntime and tokenizers installed ({e})"
+            ) from e
+        self._np = np
+        self._onnxruntime = onnxruntime
+        self.model_path = os.path.join(model_dir, model_file)
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.pad_multiple = pad_multiple
+        self.intra_op_threads = intra_op_threads
+
+        config_path = os.path.join(model_dir, "config.json")
+        self.model_config: Dict[str, Any] = {}
+        if os.path.exists(config_path):
+            with open(config_path, encoding="utf-8") as f:
+                self.model_config = json.load(f)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.no_padding() # Padding is per bucket, below
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.pad_token_id = self.model_config.get("pad_token_id")
+        if self.pad_token_id is None:
+            self.pad_token_id = self.tokenizer.token_to_id("[PAD]") or self.tokenizer.token_to_id("<pad>") or 0
+
+        self._session = self._create_session()
+        self._session_pid = os.getpid()
+        self.input_names = {model_input.name for model_input in self._session.get_inputs()}
+        logger.info(f"Loaded ONNX model {self.model_path} (inputs: {sorted(self.input_names)})")
+
+    def _create_session(self):
+        options = self._onnxruntime.SessionOptions()
+        options.graph_optimization_level = self._onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = 1
+        return self._onnxruntime.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+
+    @property
+    def session(self):
+        # With one intra-op thread a session forked by the supervisor keeps working (and its weights stay
+        # shared); a multi-threaded session's pool does not survive fork, so each child builds its own.
+        if self.intra_op_threads > 1 and os.getpid() != self._session_pid:
+            self._session = self._create_session()
+            self._session_pid = os.getpid()
+        return self._session
+
+    def encode(self, texts: List[str]) -> List[Any]:
+        """Returns one vector per text, in input order: logits for classifiers, mean-pooled embeddings otherwise."""
+        np = self._np
+        encodings = self.tokenizer.encode_batch(list(texts))
+        outputs: List[Any] = [None] * len(texts)
+        for bucket in length_buckets([len(encoding.ids) for encoding in encodings],
+                                     self.max_batch_size, self.max_batch_tokens, self.pad_multiple):
+            width = padded_length(max(len(encodings[index].ids) for index in bucket), self.pad_multiple)
+            input_ids = np.full((len(bucket), width), self.pad_token_id, dtype=np.int64)
+            attention_mask = np.zeros((len(bucket), width), dtype=np.int64)
+            for row, index in enumerate(bucket):
+                ids = encodings[index].ids
+                input_ids[row, :len(ids)] = ids
+                attention_mask[row, :len(ids)] = 1
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+            result = self.session.run(None, {name: value for name, value in feeds.items() if name in self.input_names})[0]
+            if result.ndim == 3: # Token embeddings: mean over real (unpadded) tokens
+                mask = attention_mask[:, :, None].astype(result.dtype)
+                result = (result * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1.0)
+            for row, index in enumerate(bucket):
+                outputs[index] = result[row]
+        return outputs
+
+    def similarities(self, query: Any, vectors: List[Any]) -> List[float]:
+        """Cosine similarity of `query` to each of `vectors` (as returned by encode)."""
+        if not vectors:
+            return []
+        np = self._np
+        matrix = np.stack(vectors)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        return (matrix @ query / np.maximum(norms, 1e-12)).tolist()
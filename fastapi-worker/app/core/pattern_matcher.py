@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PatternMatch:
+    term: str
+    start: int # Inclusive character offset into the original text
+    end: int   # Exclusive
+
+
+class AhoCorasickMatcher:
+    """
+    Single-pass multi-pattern matcher (Aho–Corasick automaton).
+
+    The automaton is compiled once from the term list; each `find_all` call walks the text exactly
+    once regardless of how many terms there are, so adding terms does not add passes over the text.
+    Matching is case-insensitive for Latin script and reports overlapping matches. Text and terms are
+    lowercased one character at a time, so a character that lowercases to several ("İ") never shifts
+    the reported offsets.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self.terms: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[int]] = [[]] # Term indexes ending at each state (including via fail links)
+        self._lengths: List[int] = [] # Lowercased length of each term, in automaton steps
+        for term in dict.fromkeys(t for t in terms if t): # Dedupe, keep order
+            self._add_term(term)
+        self._build_fail_links()
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def _add_term(self, term: str):
+        state = 0
+        lowered = _lower_chars(term)
+        for char in lowered:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append(len(self.terms))
+        self.terms.append(term)
+        self._lengths.append(len(lowered))
+
+    def _build_fail_links(self):
+        pending = deque(self._goto[0].values()) # Depth-1 states fail back to the root
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self._goto[state].items():
+                pending.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # Merge outputs along the fail chain once here, instead of walking it on every match
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def find_all(self, text: str) -> List[PatternMatch]:
+        """Returns every (possibly overlapping) occurrence of every term, ordered by end position."""
+        goto, fail, outputs, terms, lengths = self._goto, self._fail, self._outputs, self.terms, self._lengths
+        lowered = _lower_chars(text)
+        # Original offset of each lowercased character (only needed when some character expanded)
+        origins = range(len(text)) if len(lowered) == len(text) else [
+            position for position, char in enumerate(text) for _ in char.lower()
+        ]
+        matches = []
+        state = 0
+        for step, char in enumerate(lowered):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for term_index in outputs[state]:
+                matches.append(PatternMatch(terms[term_index], origins[step + 1 - lengths[term_index]], origins[step] + 1))
+        return matches
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Occurrences per matched term, in order of first appearance."""
+        counts: Dict[str, int] = {}
+        for match in sorted(self.find_all(text), key=lambda m: m.start):
+            counts[match.term] = counts.get(match.term, 0) + 1
+        return counts
+
+
+def _lower_chars(text: str) -> str:
+    # Unlike str.lower() (e.g. word-final "Σ" -> "ς"), every character lowercases the same way wherever it is.
+    # Texts with nothing to lowercase (most CJK feedback) or only ASCII agree with str.lower() and skip the join.
+    lowered = text.lower()
+    if lowered == text or text.isascii():
+        return lowered
+    return "".join([char.lower() for char in text])
+
+
+def load_term_dictionary(file_path: str) -> Dict[str, Any]:
+    """Loads the keyword/intent term dictionary (see app/data/term_dictionary.json for the format)."""
+    if file_path and os.path.exists(file_path):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    logger.warning(f"Term dictionary not found: {file_path}")
+    return {}
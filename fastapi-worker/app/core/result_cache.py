@@ -0,0 +1,103 @@
+import hashlib
+import json
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """NFKC-normalizes and collapses whitespace so trivially different copies share a cache entry."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def config_fingerprint(module_config: Dict[str, Any]) -> str:
+    """Stable short hash of everything that influences the analysis output."""
+    canonical = json.dumps(module_config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Content-addressed cache for InsightFlowCore results.
+
+    Keys are sha256(config fingerprint + normalized text), so results produced by another set of
+    strategies can never be returned. Tier 1 is an in-process LRU; tier 2 is an optional shared
+    Redis tier with a TTL. Values are stored as JSON so every hit hands out a fresh copy.
+    """
+
+    def __init__(self, fingerprint: str, max_entries: int = 4096, redis_client=None,
+                 redis_ttl_seconds: int = 86400, key_prefix: str = "insightflow:result:"):
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.redis_client = redis_client
+        self.redis_ttl_seconds = redis_ttl_seconds
+        self.key_prefix = key_prefix
+        self._local: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.redis_hits = 0
+
+    def make_key(self, text: str, version: str = "") -> str:
+        """`version` identifies mutable inputs (e.g. the loaded catalog) that the fingerprint cannot capture."""
+        digest = hashlib.sha256(f"{self.fingerprint}\x00{version}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}{self.fingerprint}:{digest}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            encoded = self._local.get(key)
+            if encoded is not None:
+                self._local.move_to_end(key)
+                self.hits += 1
+                return json.loads(encoded)
+
+        if self.redis_client is not None:
+            try:
+                encoded = self.redis_client.get(key)
+            except Exception as e:
+                logger.warning(f"Result cache Redis lookup failed, treating as miss: {e}")
+                encoded = None
+            if encoded is not None:
+                encoded = encoded.decode("utf-8") if isinstance(encoded, bytes) else encoded
+                self._store_local(key, encoded)
+                with self._lock:
+                    self.hits += 1
+                    self.redis_hits += 1
+                return json.loads(encoded)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        encoded = json.dumps(value, ensure_ascii=False)
+        self._store_local(key, encoded)
+        if self.redis_client is not None:
+            try:
+                self.redis_client.set(key, encoded, ex=self.redis_ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Result cache Redis write failed: {e}")
+
+    def _store_local(self, key: str, encoded: str):
+        with self._lock:
+            self._local[key] = encoded
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "redis_hits": self.redis_hits,
+                "local_entries": len(self._local),
+            }
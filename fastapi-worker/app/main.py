@@ -1,33 +1,114 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+import redis
+from app.core.factory import create_insight_flow_core
 from app.core.insight_flow_core import InsightFlowCore
-from app.models.request_models import AnalysisRequestPayload, AnalysisResult, AnalysisResponse
+from app.bulk_stream import NDJSONStreamingResponse, stream_analysis
+from app.metrics import QUEUE_DEPTH, QUEUE_LANE_DEPTH, REGISTRY, load_worker_snapshots
+from app.priority_lanes import PriorityLaneQueue, parse_lane_weights
+from app.models.request_models import AnalysisRequestPayload, AnalysisResult, AnalysisResponse, BatchAnalysisRequestPayload, BatchAnalysisResponse
 from app.config import settings
-import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build InsightFlowCore once per process: model weights and recommender data are loaded a single time
+    # and shared by every request. The pipeline is blocking, so it runs on a dedicated thread pool.
+    app.state.insight_flow = create_insight_flow_core(settings)
+    app.state.analysis_executor = ThreadPoolExecutor(
+        max_workers=settings.API_ANALYSIS_THREADS, thread_name_prefix="insightflow-api"
+    )
+    # Strategies load lazily, so the app starts serving (/health) at once. Warm-up loads them in the
+    # background; /ready reports when it is done so traffic can be held back until then.
+    app.state.warmup = None
+    if settings.WARMUP_ON_STARTUP:
+        app.state.warmup = asyncio.get_running_loop().run_in_executor(
+            app.state.analysis_executor, app.state.insight_flow.warm_up
+        )
+    # Used by /metrics to read queue depths and the snapshots published by consumer processes
+    app.state.redis = redis.Redis(
+        host=settings.REDIS_HOST, port=settings.REDIS_PORT, db=settings.REDIS_DB, socket_timeout=2.0
+    )
+    logger.info(f"InsightFlowCore created ({settings.API_ANALYSIS_THREADS} analysis threads, warm-up {'on' if settings.WARMUP_ON_STARTUP else 'off'})")
+    try:
+        yield
+    finally:
+        if app.state.warmup is not None and not app.state.warmup.done():
+            app.state.warmup.cancel()
+        app.state.analysis_executor.shutdown(wait=True, cancel_futures=True)
+        app.state.insight_flow.shutdown()
+
 app = FastAPI(
     title="InsightFlow AI Worker API",
     description="This API primarily provides health checks. Main analysis logic is handled by the Redis consumer.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
-# Although the main processing is in consumer.py, InsightFlowCore might still be useful
-# for specific direct API calls or for testing purposes.
-# Re-initialize InsightFlowCore if not done globally to prevent memory issues for long-running services
-# Or you might pass it as a dependency.
+def get_insight_flow_core(request: Request) -> InsightFlowCore:
+    """Dependency returning the process-wide InsightFlowCore built in `lifespan`."""
+    return request.app.state.insight_flow
+
+async def run_in_analysis_pool(request: Request, func, *args):
+    """Runs a blocking pipeline call on the analysis thread pool so the event loop stays responsive."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app.state.analysis_executor, func, *args)
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     return {"status": "ok", "service": "InsightFlow AI Worker API"}
 
+def collect_metrics(redis_client) -> str:
+    """Renders this process's metrics, live queue depths and every consumer's published snapshot."""
+    worker_snapshots = {}
+    try:
+        task_queue = PriorityLaneQueue(redis_client, settings.REDIS_QUEUE_NAME, parse_lane_weights(settings.QUEUE_LANE_WEIGHTS))
+        totals = {"pending": 0, "processing": 0, "dead": 0}
+        for lane, depths in task_queue.lane_depths().items():
+            for list_name, depth in depths.items():
+                QUEUE_LANE_DEPTH.set(depth, lane=lane, list=list_name)
+                totals[list_name] += depth
+        for list_name, depth in totals.items():
+            QUEUE_DEPTH.set(depth, list=list_name)
+        worker_snapshots = load_worker_snapshots(redis_client)
+    except redis.exceptions.RedisError as e:
+        logger.warning(f"Metrics: Redis unavailable, reporting local metrics only: {e}")
+    return REGISTRY.render(worker_snapshots)
+
+@app.get("/ready")
+async def readiness_check(request: Request):
+    """Readiness probe: 200 once warm-up has loaded every strategy, 503 while it runs or if it failed."""
+    warmup = request.app.state.warmup
+    if warmup is None: # Warm-up disabled: strategies load on first use
+        return {"status": "ready", "warmed_up": False}
+    if not warmup.done():
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    if warmup.exception() is not None:
+        return JSONResponse(status_code=503, content={"status": "warmup_failed", "error": str(warmup.exception())})
+    return {"status": "ready", "warmed_up": True, "load_ms": {name: round(ms, 1) for name, ms in warmup.result().items()}}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Prometheus text-format metrics for the API process and all consumer processes."""
+    loop = asyncio.get_running_loop()
+    body = await loop.run_in_executor(None, collect_metrics, request.app.state.redis) # Redis calls are blocking
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 # This endpoint is kept for direct testing or if a synchronous fallback is needed.
 # However, the primary flow is now via Redis Queue and consumer.py
 @app.post("/analyze_sync")
-async def analyze_text_sync(request: AnalysisRequestPayload):
+async def analyze_text_sync(
+    request: AnalysisRequestPayload,
+    http_request: Request,
+    insight_flow: InsightFlowCore = Depends(get_insight_flow_core),
+):
     """
     (Synchronous) Endpoint to perform AI analysis directly.
     For development/testing or specific synchronous needs.
@@ -35,22 +116,9 @@ async def analyze_text_sync(request: AnalysisRequestPayload):
     """
     logger.info(f"(Sync) Received analysis request for task ID: {request.task_id}")
     try:
-        # Initialize InsightFlowCore only when needed for sync calls
-        insight_flow_local = InsightFlowCore({
-            "OPENAI_API_KEY": settings.OPENAI_API_KEY,
-            "HUGGINGFACE_API_TOKEN": settings.HUGGINGFACE_API_TOKEN,
-            "summarizer_model_type": settings.SUMMARIZER_MODEL_TYPE,
-            "sentiment_model_type": settings.SENTIMENT_MODEL_TYPE,
-            "keyword_extractor_type": settings.KEYWORD_EXTRACTOR_TYPE,
-            "intent_recognizer_type": settings.INTENT_RECOGNIZER_TYPE,
-            "sentiment_model_name": settings.SENTIMENT_MODEL_NAME,
-            "recommender_config": {
-                "product_catalog_path": "/app/data/products.json",
-                "customer_segments_path": "/app/data/segments.json"
-            }
-        })
-        
-        analysis_result_dict = insight_flow_local.process_customer_feedback(request.text_content)
+        analysis_result_dict = await run_in_analysis_pool(
+            http_request, insight_flow.process_customer_feedback, request.text_content
+        )
         analysis_output = AnalysisResult(**analysis_result_dict) # Validate output
 
         logger.info(f"(Sync) Analysis completed for task ID: {request.task_id}")
@@ -62,3 +130,57 @@ async def analyze_text_sync(request: AnalysisRequestPayload):
     except Exception as e:
         logger.error(f"(Sync) Error processing task {request.task_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to process analysis synchronously: {e}")
+
+@app.post("/analyze_batch")
+async def analyze_text_batch(
+    request: BatchAnalysisRequestPayload,
+    http_request: Request,
+    insight_flow: InsightFlowCore = Depends(get_insight_flow_core),
+):
+    """
+    (Synchronous) Bulk endpoint: analyzes all submitted tasks with one batched pipeline call.
+    Results are returned in the same order as the submitted tasks.
+    """
+    task_ids = [task.task_id for task in request.tasks]
+    logger.info(f"(Batch) Received {len(task_ids)} analysis requests")
+    try:
+        analysis_result_dicts = await run_in_analysis_pool(
+            http_request, insight_flow.process_customer_feedback_batch, [task.text_content for task in request.tasks]
+        )
+
+        logger.info(f"(Batch) Analysis completed for {len(task_ids)} tasks")
+        return BatchAnalysisResponse(results=[
+            AnalysisResponse(
+                task_id=task_id,
+                status="processed_sync",
+                analysis_output=AnalysisResult(**analysis_result_dict) # Validate output
+            )
+            for task_id, analysis_result_dict in zip(task_ids, analysis_result_dicts)
+        ])
+    except Exception as e:
+        logger.error(f"(Batch) Error processing {len(task_ids)} tasks: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to process batch analysis: {e}")
+
+@app.post("/analyze_stream")
+async def analyze_text_stream(
+    http_request: Request,
+    insight_flow: InsightFlowCore = Depends(get_insight_flow_core),
+):
+    """
+    Streaming bulk endpoint for backfills. The body is NDJSON, one {"task_id", "text_content"} per line.
+    Records are analyzed in chunks through the batch pipeline and results stream back as NDJSON, in
+    input order, while the upload is still being read. Unusable records yield an error line instead.
+    """
+    async def analyze_chunk(texts):
+        return await run_in_analysis_pool(http_request, insight_flow.process_customer_feedback_batch, texts)
+
+    async def analyze_one(text):
+        return await run_in_analysis_pool(http_request, insight_flow.process_customer_feedback, text)
+
+    logger.info("(Stream) Receiving NDJSON analysis upload")
+    return NDJSONStreamingResponse(stream_analysis(
+        http_request.stream(), analyze_chunk, analyze_one,
+        chunk_size=settings.STREAM_CHUNK_SIZE,
+        max_pending_chunks=settings.STREAM_MAX_PENDING_CHUNKS,
+        max_line_bytes=settings.STREAM_MAX_LINE_BYTES,
+    ))
@@ -0,0 +1,303 @@
+"""
+Lightweight in-process metrics (counters, gauges, histograms) rendered in the Prometheus text format.
+
+Consumer processes are forked by the supervisor and the API runs separately, so each consumer
+periodically publishes a snapshot of its registry to Redis (MetricsPublisher). The API's /metrics
+endpoint renders its own registry plus every live worker snapshot, labelled with the worker id.
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers sub-millisecond lookups up to slow model/API calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def snapshot(self) -> List[Tuple[LabelValues, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List[float]] = {} # Per-bucket counts (non-cumulative), then +Inf, sum
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> float:
+        series = self._values.get(self._key(labels))
+        return sum(series[:-1]) if series else 0.0
+
+    def snapshot(self) -> List[Tuple[LabelValues, List[float]]]:
+        with self._lock:
+            return [(key, list(series)) for key, series in self._values.items()]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_class, name: str, *args, **kwargs):
+        with self._lock:
+            existing = self._metrics.get(name)
+            if existing is not None:
+                if not isinstance(existing, metric_class):
+                    raise ValueError(f"Metric {name} is already registered as a {existing.kind}")
+                return existing
+            metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """JSON-serializable copy of every series, as published by consumer processes."""
+        return {
+            name: {
+                "kind": metric.kind,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "buckets": list(getattr(metric, "buckets", ())),
+                "series": [[list(key), value] for key, value in metric.snapshot()],
+            }
+            for name, metric in list(self._metrics.items())
+        }
+
+    def render(self, worker_snapshots: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        """Prometheus text exposition of this registry plus `worker_snapshots` (worker id -> snapshot)."""
+        sources = [({}, self.snapshot())]
+        for worker_id, snapshot in sorted((worker_snapshots or {}).items()):
+            sources.append(({"worker": worker_id}, snapshot))
+        return render_snapshots(sources)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _bucket_label(bound: float) -> str:
+    return repr(float(bound)) if bound != int(bound) else f"{int(bound)}.0"
+
+
+def render_snapshots(sources: List[Tuple[Dict[str, str], Dict[str, Any]]]) -> str:
+    """Renders (extra labels, snapshot) pairs, grouping every series of a metric under one HELP/TYPE header."""
+    families: Dict[str, Dict[str, Any]] = {}
+    for extra_labels, snapshot in sources:
+        for name, family in snapshot.items():
+            merged = families.setdefault(name, {**family, "samples": []})
+            for key, value in family["series"]:
+                labels = {**extra_labels, **dict(zip(family["labelnames"], key))}
+                merged["samples"].append((labels, value))
+
+    lines = []
+    for name, family in sorted(families.items()):
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['kind']}")
+        for labels, value in family["samples"]:
+            if family["kind"] != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            cumulative = 0.0
+            for bound, bucket_count in zip(family["buckets"] + ["+Inf"], value[:-1]):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else _bucket_label(bound)
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': le})} {_format_value(cumulative)}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {_format_value(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsPublisher:
+    """
+    Periodically stores a consumer's registry snapshot in Redis under `{prefix}:{worker_id}` with a TTL,
+    so snapshots of dead workers disappear on their own. Also maintains the tasks-per-second gauge.
+    """
+
+    def __init__(self, client, worker_id: str, registry: "MetricsRegistry", interval_seconds: float = 10.0,
+                 prefix: str = "insightflow:metrics"):
+        self.client = client
+        self.worker_id = worker_id
+        self.registry = registry
+        self.interval_seconds = interval_seconds
+        self.prefix = prefix
+        self._next_publish = 0.0
+        self._last_tasks: Optional[Tuple[float, float]] = None # (monotonic time, tasks processed)
+
+    def maybe_publish(self):
+        now = time.monotonic()
+        if self.interval_seconds <= 0 or now < self._next_publish:
+            return
+        self._next_publish = now + self.interval_seconds
+        self.publish(now)
+
+    def publish(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        processed = sum(value for _, value in TASKS_PROCESSED.snapshot())
+        if self._last_tasks is not None and now > self._last_tasks[0]:
+            TASKS_PER_SECOND.set((processed - self._last_tasks[1]) / (now - self._last_tasks[0]))
+        self._last_tasks = (now, processed)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.set(f"{self.prefix}:{self.worker_id}", json.dumps(self.registry.snapshot()),
+                     ex=max(1, int(self.interval_seconds * 3)))
+            pipe.sadd(f"{self.prefix}:workers", self.worker_id)
+            pipe.execute()
+        except Exception as e: # Metrics must never take the consumer down
+            logger.warning(f"Failed to publish metrics for worker {self.worker_id}: {e}")
+
+
+def load_worker_snapshots(client, prefix: str = "insightflow:metrics") -> Dict[str, Dict[str, Any]]:
+    """Reads the snapshots published by live consumers; forgets workers whose snapshot has expired."""
+    worker_ids = sorted(w.decode() if isinstance(w, bytes) else w for w in client.smembers(f"{prefix}:workers"))
+    if not worker_ids:
+        return {}
+    pipe = client.pipeline(transaction=False)
+    for worker_id in worker_ids:
+        pipe.get(f"{prefix}:{worker_id}")
+    snapshots, expired = {}, []
+    for worker_id, raw in zip(worker_ids, pipe.execute()):
+        if raw is None:
+            expired.append(worker_id)
+        else:
+            snapshots[worker_id] = json.loads(raw)
+    if expired:
+        client.srem(f"{prefix}:workers", *expired)
+    return snapshots
+
+
+# Process-wide registry and the metrics recorded on the hot path
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    "insightflow_stage_duration_seconds", "Time spent in each pipeline stage call (a batched call counts once).", ("stage",)
+)
+MODULE_LOAD_DURATION = REGISTRY.histogram(
+    "insightflow_module_load_duration_seconds", "Time to construct each strategy on first use (imports, weights).", ("module",),
+    buckets=(0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+PIPELINE_DURATION = REGISTRY.histogram(
+    "insightflow_pipeline_duration_seconds", "End-to-end uncached pipeline time per call.", ("mode",)
+)
+RESULT_CACHE_LOOKUPS = REGISTRY.counter(
+    "insightflow_result_cache_lookups_total", "Result cache lookups by outcome.", ("outcome",)
+)
+CHUNK_MEMO_LOOKUPS = REGISTRY.counter(
+    "insightflow_chunk_memo_lookups_total", "Per-window memo lookups on the long-text map-reduce path, by outcome.", ("outcome",)
+)
+NEAR_DUPLICATE_LOOKUPS = REGISTRY.counter(
+    "insightflow_near_duplicate_lookups_total",
+    "Near-duplicate lookups for texts the result cache missed: hit (index), batch_hit (earlier text of the batch) or miss.",
+    ("outcome",)
+)
+QUEUE_POP_DURATION = REGISTRY.histogram(
+    "insightflow_queue_pop_duration_seconds", "Time spent popping a batch from the Redis queue, including the blocking wait."
+)
+QUEUE_WAIT_DURATION = REGISTRY.histogram(
+    "insightflow_queue_wait_duration_seconds", "Time from the producer's push to a consumer picking the task up, by priority lane.",
+    ("lane",), buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0),
+)
+QUEUE_BATCH_SIZE = REGISTRY.histogram(
+    "insightflow_queue_batch_size", "Tasks per popped batch.", buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+TASKS_PROCESSED = REGISTRY.counter(
+    "insightflow_tasks_processed_total", "Tasks finished by the consumer, by outcome.", ("status",)
+)
+TASKS_PER_SECOND = REGISTRY.gauge(
+    "insightflow_tasks_per_second", "Tasks finished per second over the last publish interval."
+)
+CALLBACK_DURATION = REGISTRY.histogram(
+    "insightflow_callback_duration_seconds", "Laravel callback request time, by endpoint.", ("endpoint",)
+)
+CALLBACK_UPDATES = REGISTRY.counter(
+    "insightflow_callback_updates_total", "Status updates sent to Laravel, by outcome.", ("outcome",)
+)
+QUEUE_DEPTH = REGISTRY.gauge(
+    "insightflow_queue_depth", "Tasks in the Redis queue lists, sampled at scrape time.", ("list",)
+)
+QUEUE_LANE_DEPTH = REGISTRY.gauge(
+    "insightflow_queue_lane_depth", "Tasks in each priority lane's lists, sampled at scrape time.", ("lane", "list")
+)
@@ -1,18 +1,37 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, Dict, Any, List, Literal
 
 class AnalysisRequestPayload(BaseModel):
     task_id: str
     text_content: str
+    # Queue lane the producer pushed the task onto (see app/priority_lanes.py)
+    priority: Literal["interactive", "standard", "bulk"] = "standard"
+    enqueued_at: Optional[float] = None # Producer's Unix time at push, for queue wait metrics
 
 class AnalysisResult(BaseModel):
-    summary: List[str]
-    recommendations: List[str]
-    sentiment_score: Dict[str, float]
-    keywords: List[str]
-    intent: Optional[Dict[str, Any]]
+    # InsightFlowCore emits (and Laravel/the frontend consume) the Chinese keys, so they are the aliases.
+    model_config = ConfigDict(populate_by_name=True)
+
+    summary: List[str] = Field(alias="摘要")
+    recommendations: List[str] = Field(alias="推薦")
+    sentiment_score: Dict[str, Any] = Field(alias="情緒分數")
+    keywords: List[str] = Field(alias="關鍵字")
+    intent: Optional[Dict[str, Any]] = Field(alias="意圖")
 
 class AnalysisResponse(BaseModel):
     task_id: str
     status: str
     analysis_output: AnalysisResult # Nested Pydantic model for output
+
+class BatchAnalysisRequestPayload(BaseModel):
+    tasks: List[AnalysisRequestPayload] = Field(min_length=1)
+
+class BatchAnalysisResponse(BaseModel):
+    results: List[AnalysisResponse] # Same order as the submitted tasks
+
+class StreamAnalysisError(BaseModel):
+    # Emitted by /analyze_stream in place of a result for a record that could not be analyzed
+    line: int # 1-based line number in the uploaded NDJSON
+    task_id: Optional[str] = None
+    status: str # "invalid" (unparseable record) or "failed" (analysis error)
+    error: str
@@ -0,0 +1,216 @@
+"""
+Priority lanes on top of the reliable Redis queue.
+
+Producers push each task onto the list of its priority lane: REDIS_QUEUE_NAME itself for the default
+lane ("standard", so producers that know nothing about lanes keep working) and "<REDIS_QUEUE_NAME>:<lane>"
+for the others. Every lane is a ReliableQueue with its own processing, delivery-count and dead-letter
+lists, so acks, nacks and reclaimed tasks all stay in the lane they came from.
+
+A consumer fills each batch across lanes with smooth weighted round-robin over the lanes that currently
+have a backlog (QUEUE_LANE_WEIGHTS, e.g. interactive=8,standard=3,bulk=1): an interactive request does
+not wait behind a backfill, and the backfill still gets its share. On top of the weights, a lane with a
+backlog that this worker has not served for `starvation_seconds` goes first in the next batch, which
+bounds the wait of low-weight lanes even when batches are slow.
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import redis
+
+from app.reliable_queue import ReliableQueue, default_worker_id
+
+PRIORITY_LANES = ("interactive", "standard", "bulk")
+DEFAULT_LANE = "standard"
+
+
+def parse_lane_weights(spec: str, lanes: Sequence[str] = PRIORITY_LANES) -> Dict[str, int]:
+    """Parses "interactive=8,standard=3,bulk=1". Every lane needs a weight of at least 1."""
+    weights: Dict[str, int] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        lane, _, weight = item.partition("=")
+        lane = lane.strip()
+        if lane not in lanes:
+            raise ValueError(f"Unknown priority lane '{lane}' (expected one of {', '.join(lanes)})")
+        if not weight.strip().isdigit() or int(weight) < 1:
+            raise ValueError(f"Lane '{lane}' needs a positive integer weight, got '{weight.strip()}'")
+        weights[lane] = int(weight)
+    missing = [lane for lane in lanes if lane not in weights]
+    if missing:
+        raise ValueError(f"No weight for priority lanes: {', '.join(missing)}")
+    return weights
+
+
+class WeightedLaneScheduler:
+    """Smooth weighted round-robin (as in nginx upstreams) over lanes with a backlog, plus starvation protection."""
+
+    def __init__(self, weights: Dict[str, int], starvation_seconds: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.weights = dict(weights)
+        self.starvation_seconds = starvation_seconds
+        self._clock = clock
+        self._current = {lane: 0 for lane in self.weights}
+        self._last_served = {lane: clock() for lane in self.weights}
+
+    def plan(self, backlog: Dict[str, int], slots: int) -> List[str]:
+        """The lane to pop from for each of up to `slots` tasks, given each lane's pending count."""
+        now = self._clock()
+        remaining = {lane: backlog.get(lane, 0) for lane in self.weights}
+        for lane, pending in remaining.items():
+            if pending <= 0:
+                self._last_served[lane] = now # Nothing waiting, so nothing starving
+
+        picks: List[str] = []
+        starved = [lane for lane, pending in remaining.items()
+                   if pending > 0 and now - self._last_served[lane] >= self.starvation_seconds]
+        for lane in sorted(starved, key=lambda lane: self._last_served[lane])[:slots]:
+            picks.append(lane)
+            remaining[lane] -= 1
+
+        while len(picks) < slots:
+            active = [lane for lane, pending in remaining.items() if pending > 0]
+            if not active:
+                break
+            for lane in active:
+                self._current[lane] += self.weights[lane]
+            chosen = max(active, key=lambda lane: self._current[lane])
+            self._current[chosen] -= sum(self.weights[lane] for lane in active)
+            picks.append(chosen)
+            remaining[chosen] -= 1
+        return picks
+
+    def served(self, lanes: Iterable[str]):
+        now = self._clock()
+        for lane in lanes:
+            self._last_served[lane] = now
+
+
+class PriorityLaneQueue:
+    """
+    The consumer-side view of all lanes, with the ReliableQueue interface the consumer uses
+    (pop_batch, ack, nack, dead_letter, maybe_reap, depths).
+    """
+
+    def __init__(self, client: redis.Redis, queue_name: str, lane_weights: Dict[str, int],
+                 default_lane: str = DEFAULT_LANE, starvation_seconds: float = 30.0, idle_poll_seconds: float = 0.1,
+                 worker_id: Optional[str] = None, **queue_options):
+        self.client = client
+        self.queue_name = queue_name
+        self.default_lane = default_lane
+        self.worker_id = worker_id or default_worker_id()
+        self.idle_poll_seconds = idle_poll_seconds
+        self.lanes: Dict[str, ReliableQueue] = {
+            lane: ReliableQueue(client, self.lane_key(lane), worker_id=self.worker_id, **queue_options)
+            for lane in lane_weights
+        }
+        # Idle waits block on the heaviest lane, so its tasks are picked up the moment they arrive
+        self.urgent_lane = max(lane_weights, key=lambda lane: lane_weights[lane])
+        self.scheduler = WeightedLaneScheduler(lane_weights, starvation_seconds)
+        self._in_flight: Dict[bytes, List[str]] = {} # Raw task -> lanes it was popped from (bodies can repeat)
+        self._in_flight_lock = threading.Lock() # Acks arrive on the callback dispatcher thread
+
+    def lane_key(self, lane: str) -> str:
+        return self.queue_name if lane == self.default_lane else f"{self.queue_name}:{lane}"
+
+    def push(self, raw_task, lane: Optional[str] = None) -> int:
+        """Producer side: appends a task to its lane (unknown or missing lanes use the default lane)."""
+        return self.client.rpush(self.lane_key(lane if lane in self.lanes else self.default_lane), raw_task)
+
+    def heartbeat(self):
+        pipe = self.client.pipeline(transaction=False)
+        for lane_queue in self.lanes.values():
+            pipe.sadd(lane_queue.workers_key, self.worker_id)
+            pipe.set(lane_queue.lease_key_for(self.worker_id), "1", px=lane_queue.visibility_timeout_ms)
+        pipe.execute()
+
+    def _track(self, lane: str, raw_task):
+        with self._in_flight_lock:
+            self._in_flight.setdefault(raw_task, []).append(lane)
+
+    def lane_of(self, raw_task) -> str:
+        """The lane an in-flight task was popped from (and where acks, nacks and retries go)."""
+        with self._in_flight_lock:
+            lanes = self._in_flight.get(raw_task)
+            return lanes[0] if lanes else self.default_lane
+
+    def _release(self, raw_task) -> ReliableQueue:
+        with self._in_flight_lock:
+            lanes = self._in_flight.get(raw_task)
+            lane = lanes.pop(0) if lanes else self.default_lane
+            if not lanes:
+                self._in_flight.pop(raw_task, None)
+        return self.lanes[lane]
+
+    def _drain(self, slots: int) -> List[bytes]:
+        # Two round trips: pending counts per lane, then one LMOVE per planned slot
+        pipe = self.client.pipeline(transaction=False)
+        for lane_queue in self.lanes.values():
+            pipe.llen(lane_queue.queue_name)
+        plan = self.scheduler.plan(dict(zip(self.lanes, pipe.execute())), slots)
+        if not plan:
+            return []
+        pipe = self.client.pipeline(transaction=False)
+        for lane in plan:
+            pipe.lmove(self.lanes[lane].queue_name, self.lanes[lane].processing_key, "LEFT", "RIGHT")
+        moved = [(lane, raw_task) for lane, raw_task in zip(plan, pipe.execute()) if raw_task is not None]
+        self.scheduler.served({lane for lane, _ in moved})
+        for lane, raw_task in moved:
+            self._track(lane, raw_task)
+        return [raw_task for _, raw_task in moved]
+
+    def pop_batch(self, batch_size: int, linger_ms: int, block_timeout: float = 1.0) -> List[bytes]:
+        """
+        Like ReliableQueue.pop_batch, but each slot of the batch is filled from the lane the scheduler picks.
+        While every lane is empty it blocks on the most urgent lane in short slices (`idle_poll_seconds`),
+        re-checking the other lanes between slices, for at most `block_timeout` seconds.
+        """
+        self.heartbeat()
+        batch = self._drain(batch_size)
+        block_deadline = time.monotonic() + block_timeout
+        while not batch:
+            remaining = block_deadline - time.monotonic()
+            if remaining <= 0:
+                return []
+            urgent = self.lanes[self.urgent_lane]
+            first = self.client.blmove(urgent.queue_name, urgent.processing_key,
+                                       min(self.idle_poll_seconds, remaining), "LEFT", "RIGHT")
+            if first is not None:
+                self._track(self.urgent_lane, first)
+                self.scheduler.served([self.urgent_lane])
+                batch = [first]
+            else:
+                batch = self._drain(batch_size)
+
+        deadline = time.monotonic() + linger_ms / 1000.0
+        while len(batch) < batch_size:
+            drained = self._drain(batch_size - len(batch))
+            batch.extend(drained)
+            remaining = deadline - time.monotonic()
+            if len(batch) >= batch_size or remaining <= 0:
+                break
+            if not drained:
+                time.sleep(min(remaining, 0.005)) # Every lane is empty, give producers a moment to catch up
+        return batch
+
+    def ack(self, raw_task) -> bool:
+        return self._release(raw_task).ack(raw_task)
+
+    def nack(self, raw_task):
+        self._release(raw_task).nack(raw_task)
+
+    def dead_letter(self, raw_task):
+        self._release(raw_task).dead_letter(raw_task)
+
+    def maybe_reap(self) -> int:
+        return sum(lane_queue.maybe_reap() for lane_queue in self.lanes.values())
+
+    def lane_depths(self) -> Dict[str, Dict[str, int]]:
+        return {lane: lane_queue.depths() for lane, lane_queue in self.lanes.items()}
+
+    def depths(self) -> Dict[str, int]:
+        """Pending, in-flight and dead-letter counts summed over every lane."""
+        totals = {"pending": 0, "processing": 0, "dead": 0}
+        for lane_depths in self.lane_depths().values():
+            for list_name, depth in lane_depths.items():
+                totals[list_name] += depth
+        return totals
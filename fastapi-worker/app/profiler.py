@@ -0,0 +1,85 @@
+"""
+Opt-in sampling profiler for a single running process.
+
+A background thread samples every thread's Python stack at a fixed interval and counts collapsed
+stacks ("frame;frame;frame count" lines, the input format of flamegraph.pl and speedscope).
+It costs nothing until started. In consumers it is toggled with SIGUSR1:
+
+    kill -USR1 <consumer pid>   # start sampling
+    kill -USR1 <consumer pid>   # stop and write PROFILER_OUTPUT_DIR/profile-<pid>-<timestamp>.folded
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms: float = 5.0, output_dir: str = "/tmp"):
+        self.interval_seconds = interval_ms / 1000.0
+        self.output_dir = output_dir
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self.running:
+            return
+        self.samples = Counter()
+        self._stop.clear()
+        self._started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started (pid {os.getpid()}, every {self.interval_seconds * 1000:.1f} ms)")
+
+    def stop(self) -> Optional[str]:
+        """Stops sampling and writes the collapsed stacks. Returns the output path."""
+        if not self.running:
+            return None
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        return self.dump()
+
+    def toggle(self):
+        """Starts or stops sampling. Only flips state, so it is safe to call from a signal handler."""
+        if self.running:
+            # Joining and writing the file happen off the signal handler
+            threading.Thread(target=self.stop, name="sampling-profiler-dump", daemon=True).start()
+        else:
+            self.start()
+
+    def dump(self) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile-{os.getpid()}-{int(self._started_at)}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Sampling profiler wrote {sum(self.samples.values())} samples to {path}")
+        return path
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_ident:
+                    self.samples[_collapse(frame)] += 1
@@ -0,0 +1,175 @@
+"""
+Reliable FIFO consumption of the Redis task list.
+
+Laravel RPUSHes tasks onto the tail of REDIS_QUEUE_NAME. Each worker atomically moves tasks from the
+head into its own processing list (BLMOVE/LMOVE LEFT -> RIGHT), so a task is never only in a worker's
+memory. It is removed from the processing list (ack) only once the Laravel callback has succeeded.
+
+Every worker refreshes a lease key (PX = visibility timeout) before each pop. If a worker dies, or a
+batch runs longer than the visibility timeout, its lease expires and the reaper (run by whichever
+worker holds the reaper lock) moves that worker's in-flight tasks back to the head of the queue.
+A task that has been reclaimed or nacked `max_deliveries` times goes to the dead-letter list instead.
+"""
+import hashlib
+import logging
+import os
+import socket
+import time
+from typing import Dict, List, Optional
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    # Evaluated per process (after fork), so every supervisor child gets its own processing list
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ReliableQueue:
+    def __init__(self, client: redis.Redis, queue_name: str, worker_id: Optional[str] = None,
+                 visibility_timeout: float = 300.0, reaper_interval: float = 30.0, max_deliveries: int = 5):
+        self.client = client
+        self.queue_name = queue_name
+        self.worker_id = worker_id or default_worker_id()
+        self.visibility_timeout_ms = int(visibility_timeout * 1000)
+        self.reaper_interval = reaper_interval
+        self.max_deliveries = max_deliveries
+
+        self.processing_key = self.processing_key_for(self.worker_id)
+        self.workers_key = f"{queue_name}:workers"
+        self.deliveries_key = f"{queue_name}:deliveries"
+        self.dead_letter_key = f"{queue_name}:dead"
+        self._reaper_lock_key = f"{queue_name}:reaper_lock"
+        self._next_reap = 0.0
+
+    def processing_key_for(self, worker_id: str) -> str:
+        return f"{self.queue_name}:processing:{worker_id}"
+
+    def lease_key_for(self, worker_id: str) -> str:
+        return f"{self.queue_name}:lease:{worker_id}"
+
+    @staticmethod
+    def _task_digest(raw_task) -> str:
+        raw_bytes = raw_task if isinstance(raw_task, bytes) else str(raw_task).encode("utf-8")
+        return hashlib.sha1(raw_bytes).hexdigest()
+
+    def heartbeat(self):
+        """Registers this worker and renews its lease; in-flight tasks stay ours while the lease lives."""
+        pipe = self.client.pipeline(transaction=False)
+        pipe.sadd(self.workers_key, self.worker_id)
+        pipe.set(self.lease_key_for(self.worker_id), "1", px=self.visibility_timeout_ms)
+        pipe.execute()
+
+    def pop_batch(self, batch_size: int, linger_ms: int, block_timeout: float = 1.0) -> List[bytes]:
+        """
+        Moves up to `batch_size` tasks, oldest first, from the queue into this worker's processing list.
+        Blocks (up to `block_timeout` seconds) for the first task, then keeps draining for at most `linger_ms`
+        with pipelined LMOVEs so the rest of the batch costs one round trip per drain.
+        """
+        self.heartbeat()
+        first = self.client.blmove(self.queue_name, self.processing_key, block_timeout, "LEFT", "RIGHT")
+        if first is None:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + linger_ms / 1000.0
+        while len(batch) < batch_size:
+            pipe = self.client.pipeline(transaction=False)
+            for _ in range(batch_size - len(batch)):
+                pipe.lmove(self.queue_name, self.processing_key, "LEFT", "RIGHT")
+            drained = [raw_task for raw_task in pipe.execute() if raw_task is not None]
+            batch.extend(drained)
+
+            remaining = deadline - time.monotonic()
+            if len(batch) >= batch_size or remaining <= 0:
+                break
+            if not drained:
+                time.sleep(min(remaining, 0.005)) # Queue is empty, give producers a moment to catch up
+        return batch
+
+    def depths(self) -> Dict[str, int]:
+        """Lengths of the pending, in-flight (all workers) and dead-letter lists."""
+        worker_ids = [w.decode() if isinstance(w, bytes) else w for w in self.client.smembers(self.workers_key)]
+        pipe = self.client.pipeline(transaction=False)
+        pipe.llen(self.queue_name)
+        pipe.llen(self.dead_letter_key)
+        for worker_id in worker_ids:
+            pipe.llen(self.processing_key_for(worker_id))
+        pending, dead, *processing = pipe.execute()
+        return {"pending": pending, "processing": sum(processing), "dead": dead}
+
+    def ack(self, raw_task) -> bool:
+        """Removes a finished task from the processing list. False means the reaper already reclaimed it."""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lrem(self.processing_key, 1, raw_task)
+        pipe.hdel(self.deliveries_key, self._task_digest(raw_task))
+        removed, _ = pipe.execute()
+        if not removed:
+            logger.warning(f"Ack for a task no longer in {self.processing_key}; it was re-queued after the visibility timeout.")
+        return bool(removed)
+
+    def nack(self, raw_task):
+        """Gives a task back: it goes to the tail of the queue so other tasks are not stuck behind a retry."""
+        if self.client.hincrby(self.deliveries_key, self._task_digest(raw_task), 1) >= self.max_deliveries:
+            logger.error(f"Task exceeded {self.max_deliveries} deliveries, moving it to {self.dead_letter_key}")
+            self.dead_letter(raw_task)
+            return
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lrem(self.processing_key, 1, raw_task)
+        pipe.rpush(self.queue_name, raw_task)
+        pipe.execute()
+
+    def dead_letter(self, raw_task):
+        """Parks an undecodable or repeatedly failing task on the dead-letter list for inspection."""
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lrem(self.processing_key, 1, raw_task)
+        pipe.rpush(self.dead_letter_key, raw_task)
+        pipe.hdel(self.deliveries_key, self._task_digest(raw_task))
+        pipe.execute()
+
+    def maybe_reap(self) -> int:
+        """Runs the reaper at most once per `reaper_interval` across all workers."""
+        now = time.monotonic()
+        if now < self._next_reap:
+            return 0
+        self._next_reap = now + self.reaper_interval
+        if not self.client.set(self._reaper_lock_key, self.worker_id, nx=True, px=int(self.reaper_interval * 1000)):
+            return 0 # Another worker reaped recently
+        return self.reap_expired()
+
+    def reap_expired(self) -> int:
+        """Re-queues in-flight tasks of every worker whose lease has expired. Returns how many were moved."""
+        moved = 0
+        for raw_worker_id in self.client.smembers(self.workers_key):
+            worker_id = raw_worker_id.decode("utf-8") if isinstance(raw_worker_id, bytes) else raw_worker_id
+            if worker_id == self.worker_id or self.client.exists(self.lease_key_for(worker_id)):
+                continue
+            moved += self._reclaim(worker_id)
+            self.client.srem(self.workers_key, worker_id)
+        if moved:
+            logger.warning(f"Reaper re-queued {moved} tasks whose visibility timeout expired.")
+        return moved
+
+    def _reclaim(self, worker_id: str) -> int:
+        processing_key = self.processing_key_for(worker_id)
+        moved = 0
+        # Take from the tail and push to the head, one task at a time: the tasks keep their original order
+        # and go ahead of everything that arrived while they were in flight. Each task is first moved
+        # atomically into our own processing list, so a late ack from a stuck (not dead) worker can no
+        # longer remove it, and the delivery count and the final move apply to the task actually taken.
+        # Should this worker die halfway, the task is reclaimed from its processing list in turn.
+        while True:
+            raw_task = self.client.lmove(processing_key, self.processing_key, "RIGHT", "RIGHT")
+            if raw_task is None:
+                return moved
+            if self.client.hincrby(self.deliveries_key, self._task_digest(raw_task), 1) >= self.max_deliveries:
+                logger.error(f"Task exceeded {self.max_deliveries} deliveries, moving it to {self.dead_letter_key}")
+                self.dead_letter(raw_task)
+            else:
+                pipe = self.client.pipeline(transaction=True)
+                pipe.lrem(self.processing_key, -1, raw_task)
+                pipe.lpush(self.queue_name, raw_task)
+                pipe.execute()
+            moved += 1
@@ -0,0 +1,136 @@
+"""
+Multi-process entry point for the Redis consumer.
+
+The parent builds InsightFlowCore, loads every strategy's model weights (and warms them up when
+WARMUP_ON_STARTUP is set) and then forks WORKER_PROCESSES children, so the weights are shared
+copy-on-write instead of loaded once per process. The parent never consumes tasks itself: it restarts
+children that crash and, on SIGTERM or SIGINT, forwards SIGTERM so every child drains its current
+batch before exiting.
+
+Run with: python -m app.supervisor
+"""
+import gc
+import logging
+import os
+import signal
+import time
+from typing import Callable, Dict
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerSupervisor:
+    def __init__(self, num_workers: int, target: Callable[[int], None], shutdown_timeout: float = 30.0,
+                 min_restart_interval: float = 1.0):
+        self.num_workers = max(1, num_workers)
+        self.target = target # Called in each child with its worker index; must return when asked to stop
+        self.shutdown_timeout = shutdown_timeout
+        self.min_restart_interval = min_restart_interval # Throttle for crash-looping children
+        self.children: Dict[int, int] = {} # pid -> worker index
+        self.restarts = 0
+        self._stopping = False
+        self._last_spawn: Dict[int, float] = {}
+
+    def _spawn(self, worker_index: int):
+        since_last_spawn = time.monotonic() - self._last_spawn.get(worker_index, 0.0)
+        if since_last_spawn < self.min_restart_interval:
+            time.sleep(self.min_restart_interval - since_last_spawn)
+        self._last_spawn[worker_index] = time.monotonic()
+
+        pid = os.fork()
+        if pid == 0: # Child
+            exit_code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                self.target(worker_index)
+            except BaseException:
+                logger.exception(f"Worker {worker_index} crashed")
+                exit_code = 1
+            finally:
+                os._exit(exit_code) # Never fall back into the parent's monitoring loop
+        self.children[pid] = worker_index
+        logger.info(f"Started worker {worker_index} (pid {pid})")
+
+    def _handle_stop_signal(self, signum, frame):
+        self._stopping = True
+
+    def start(self):
+        gc.freeze() # Keep already-loaded objects out of GC passes so their pages stay shared after fork
+        for worker_index in range(self.num_workers):
+            self._spawn(worker_index)
+
+    def reap(self):
+        """Collects exited children and restarts them unless we are shutting down."""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            worker_index = self.children.pop(pid, None)
+            if worker_index is None:
+                continue
+            if self._stopping:
+                logger.info(f"Worker {worker_index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}")
+                continue
+            logger.warning(f"Worker {worker_index} (pid {pid}) died with status {os.waitstatus_to_exitcode(status)}, restarting")
+            self.restarts += 1
+            self._spawn(worker_index)
+
+    def stop(self):
+        """Asks every child to drain and exit; kills stragglers after `shutdown_timeout` seconds."""
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.05)
+        for pid, worker_index in list(self.children.items()):
+            logger.warning(f"Worker {worker_index} (pid {pid}) did not drain in time, killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self.children.clear()
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._handle_stop_signal)
+        signal.signal(signal.SIGINT, self._handle_stop_signal)
+        self.start()
+        while not self._stopping:
+            self.reap()
+            time.sleep(0.5)
+        logger.info("Supervisor stopping, draining workers...")
+        self.stop()
+
+
+def _run_consumer(worker_index: int):
+    from app import consumer
+    consumer.install_signal_handlers()
+    consumer.consume_tasks()
+
+
+if __name__ == "__main__":
+    from app import consumer
+    # Strategies are lazy by default; load them once here, before forking, so children share the weights
+    core = consumer.get_insight_flow_core()
+    if settings.WARMUP_ON_STARTUP:
+        core.warm_up()
+    else:
+        core.load_modules()
+    logger.info(f"Supervisor starting {settings.WORKER_PROCESSES} consumer processes")
+    WorkerSupervisor(
+        num_workers=settings.WORKER_PROCESSES,
+        target=_run_consumer,
+        shutdown_timeout=settings.WORKER_SHUTDOWN_TIMEOUT_SECONDS,
+    ).run()
@@ -0,0 +1,105 @@
+"""
+Wire formats for tasks (Laravel -> Redis -> worker) and status updates (worker -> Laravel).
+
+Every task message carries a version field "v":
+
+    v=1 (or absent)  JSON object, as Laravel has always sent it
+    v=2              msgpack map with the same fields: smaller, and decoded without a text parser
+
+Consumers advertise the newest version they accept under "<REDIS_QUEUE_NAME>:wire_version" (2 only
+when TASK_WIRE_FORMAT=msgpack and msgpack is installed) and producers never send anything newer, so
+msgpack is switched on by configuring the workers, then the producers. Both encodings can be in the
+queue at once: decode_task tells them apart by the first byte (a JSON object starts with "{", a
+msgpack map with 0x80-0x8f, 0xde or 0xdf).
+
+JSON tasks are validated straight from the bytes (model_validate_json), in one pass inside pydantic-core
+with no intermediate dict. That is also the fast path for our own, already validated messages: building
+the model with model_construct instead measured slower than pydantic-core validation (see
+benchmarks/bench_wire_format.py), so nothing is gained by skipping validation.
+
+A bulk status-update body is encoded once per flush, compactly, in a single encoder call, and the
+bytes are reused across retries (requests re-serializes `json=` on every attempt).
+"""
+import json
+from typing import Any, Dict, Iterable, Literal, Optional, Tuple
+
+from pydantic import Field
+
+try:
+    import msgpack
+except ImportError: # Optional: only wire version 2 and msgpack callbacks need it
+    msgpack = None
+
+from app.models.request_models import AnalysisRequestPayload
+
+JSON_VERSION = 1
+MSGPACK_VERSION = 2
+SUPPORTED_VERSIONS = (JSON_VERSION, MSGPACK_VERSION)
+
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/x-msgpack"
+
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":")) # ASCII escaping is the faster path in CPython's encoder
+
+
+class TaskMessage(AnalysisRequestPayload):
+    """A task as it travels through Redis: the payload plus its wire version (not part of dumps)."""
+    v: Literal[1, 2] = Field(JSON_VERSION, exclude=True)
+
+
+class UnsupportedWireFormat(ValueError):
+    pass
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise UnsupportedWireFormat("msgpack wire format requested but the msgpack package is not installed")
+
+
+def wire_version_key(queue_name: str) -> str:
+    return f"{queue_name}:wire_version"
+
+
+def accepted_version(task_wire_format: str) -> int:
+    """The newest task version this process can decode, given TASK_WIRE_FORMAT."""
+    return MSGPACK_VERSION if task_wire_format == "msgpack" and msgpack is not None else JSON_VERSION
+
+
+def publish_accepted_version(client, queue_name: str, task_wire_format: str) -> int:
+    version = accepted_version(task_wire_format)
+    client.set(wire_version_key(queue_name), version)
+    return version
+
+
+def _is_msgpack(raw: bytes) -> bool:
+    first = raw[0]
+    return 0x80 <= first <= 0x8f or first in (0xde, 0xdf)
+
+
+def decode_task(raw) -> AnalysisRequestPayload:
+    """Parses and validates a task message of any supported version; unknown versions fail validation."""
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    if raw and _is_msgpack(raw):
+        _require_msgpack()
+        return TaskMessage.model_validate(msgpack.unpackb(raw, raw=False))
+    return TaskMessage.model_validate_json(raw)
+
+
+def encode_task(fields: Dict[str, Any], version: int = JSON_VERSION) -> bytes:
+    """Producer side (the Python counterpart of ProcessAnalysisTask), used by tests and benchmarks."""
+    message = {"v": version, **fields}
+    if version == MSGPACK_VERSION:
+        _require_msgpack()
+        return msgpack.packb(message, use_bin_type=True)
+    return _JSON_ENCODER.encode(message).encode("utf-8")
+
+
+def encode_status_updates(updates: Iterable[Tuple[str, str, Optional[Dict[str, Any]]]],
+                          wire_format: str = "json") -> Tuple[bytes, str]:
+    """Encodes (task_id, status, result) triples as the bulk-update body. Returns (body, content type)."""
+    body = {"updates": [{"task_id": task_id, "status": status, "result": result} for task_id, status, result in updates]}
+    if wire_format == "msgpack":
+        _require_msgpack()
+        return msgpack.packb(body, use_bin_type=True), MSGPACK_CONTENT_TYPE
+    return _JSON_ENCODER.encode(body).encode("utf-8"), JSON_CONTENT_TYPE
@@ -0,0 +1,343 @@
+"""
+Offline benchmark harness: replays a JSONL corpus through InsightFlowCore and through the full consumer
+path (reliable queue on an in-process fake Redis -> batched core call -> bulk callbacks to a stub Laravel
+HTTP server -> acks), then writes a machine-readable JSON report. Two reports can be compared to catch
+performance regressions before deploying.
+
+Each corpus line is a JSON object; the text is taken from "text_content", "text" or "body" (in that
+order), so the repo-root requests.jsonl works as is. The result cache is disabled unless --cache is
+given, so repeated passes measure the pipeline rather than cache hits.
+
+Usage (from fastapi-worker/):
+    python -m benchmarks.bench run --corpus ../requests.jsonl --repeat 5 --output bench-new.json
+    python -m benchmarks.bench compare bench-old.json bench-new.json --threshold 0.10
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.core.factory import build_core_config
+from app.core.insight_flow_core import InsightFlowCore
+from app.metrics import STAGE_DURATION
+from app.reliable_queue import ReliableQueue
+from benchmarks.fake_redis import FakeRedis
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "..", "..", "requests.jsonl")
+TEXT_FIELDS = ("text_content", "text", "body")
+
+# (report path, True if higher is better); checked by `compare`
+TRACKED_METRICS = [
+    ("core.tasks_per_second", True),
+    ("core.latency_ms.p50", False),
+    ("core.latency_ms.p95", False),
+    ("core.latency_ms.p99", False),
+    ("consumer.tasks_per_second", True),
+    ("consumer.batch_latency_ms.p50", False),
+    ("consumer.batch_latency_ms.p99", False),
+    ("peak_rss_mb", False),
+]
+
+
+def load_corpus(path: str) -> List[str]:
+    texts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = next((record[field] for field in TEXT_FIELDS if isinstance(record.get(field), str)), None)
+            if text is None:
+                raise ValueError(f"{path}:{line_number} has none of the fields {TEXT_FIELDS}")
+            texts.append(text)
+    if not texts:
+        raise ValueError(f"{path} contains no texts")
+    return texts
+
+
+def percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+
+    def at(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 3)
+
+    return {"p50": at(0.50), "p95": at(0.95), "p99": at(0.99), "max": round(ordered[-1], 3),
+            "mean": round(statistics.fmean(ordered), 3)}
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1) # bytes on macOS, KiB on Linux
+
+
+def _stage_totals() -> Dict[str, Tuple[float, float]]:
+    """(seconds, calls) per stage from the process metrics registry."""
+    return {key[0]: (series[-1], sum(series[:-1])) for key, series in STAGE_DURATION.snapshot()}
+
+
+def stage_breakdown(before: Dict[str, Tuple[float, float]], after: Dict[str, Tuple[float, float]]) -> Dict[str, Any]:
+    spent = {stage: (after[stage][0] - before.get(stage, (0, 0))[0], after[stage][1] - before.get(stage, (0, 0))[1])
+             for stage in after}
+    total = sum(seconds for seconds, _ in spent.values()) or 1.0
+    return {
+        stage: {
+            "calls": int(calls),
+            "total_ms": round(seconds * 1000.0, 3),
+            "mean_ms": round(seconds * 1000.0 / calls, 3) if calls else 0.0,
+            "share": round(seconds / total, 4),
+        }
+        for stage, (seconds, calls) in sorted(spent.items())
+    }
+
+
+def build_core(use_cache: bool) -> InsightFlowCore:
+    config = build_core_config(settings)
+    config["result_cache"] = {**config["result_cache"], "enabled": use_cache, "redis_enabled": False}
+    return InsightFlowCore(config)
+
+
+def bench_core(core: InsightFlowCore, texts: List[str], repeat: int) -> Dict[str, Any]:
+    """One `process_customer_feedback` call per text, as the sync API endpoint does."""
+    core.process_customer_feedback(texts[0]) # Warm-up (lazy imports, first model call)
+    before = _stage_totals()
+    latencies_ms = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            call_start = time.perf_counter()
+            core.process_customer_feedback(text)
+            latencies_ms.append((time.perf_counter() - call_start) * 1000.0)
+    elapsed = time.perf_counter() - start
+    return {
+        "tasks": len(latencies_ms),
+        "seconds": round(elapsed, 4),
+        "tasks_per_second": round(len(latencies_ms) / elapsed, 1),
+        "latency_ms": percentiles(latencies_ms),
+        "stages": stage_breakdown(before, _stage_totals()),
+    }
+
+
+class StubLaravel:
+    """Minimal stand-in for Laravel's internal update endpoints; records every status it receives."""
+
+    def __init__(self):
+        self.statuses: Dict[str, str] = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._completed = threading.Event()
+        self.expected = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                updates = body.get("updates", [body])
+                with stub._lock:
+                    stub.requests += 1
+                    for update in updates:
+                        stub.statuses[update["task_id"]] = update["status"]
+                    if sum(status in ("completed", "failed") for status in stub.statuses.values()) >= stub.expected:
+                        stub._completed.set()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(json.dumps({"updated": len(updates)}).encode("utf-8"))
+
+            def log_message(self, format, *args): # Keep the report on stdout clean
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="stub-laravel", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self) -> "StubLaravel":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def wait_for(self, expected: int, timeout: float) -> bool:
+        with self._lock:
+            self.expected = expected
+            if sum(status in ("completed", "failed") for status in self.statuses.values()) >= expected:
+                return True
+        return self._completed.wait(timeout)
+
+
+def bench_consumer(core: InsightFlowCore, texts: List[str], repeat: int, batch_size: int, linger_ms: int,
+                   redis_latency_ms: float) -> Dict[str, Any]:
+    """Drains the corpus through ReliableQueue + process_task_batch with real bulk callbacks and acks."""
+    from app import consumer
+    from app.callbacks import CallbackDispatcher
+
+    client = FakeRedis(latency_ms=redis_latency_ms)
+    task_queue = ReliableQueue(client, "bench_queue", worker_id="bench")
+    total = len(texts) * repeat
+    client.rpush(task_queue.queue_name, *[
+        json.dumps({"task_id": f"bench-{i}", "text_content": texts[i % len(texts)]}) for i in range(total)
+    ])
+
+    original_core, original_dispatcher = consumer.insight_flow, consumer.callback_dispatcher
+    before = _stage_totals()
+    batch_latencies_ms = []
+    with StubLaravel() as laravel:
+        dispatcher = CallbackDispatcher(
+            f"{laravel.url}/api/internal/analysis/bulk-update",
+            max_batch_size=settings.CALLBACK_BATCH_SIZE,
+            flush_interval_ms=settings.CALLBACK_FLUSH_INTERVAL_MS,
+        )
+        dispatcher.start()
+        consumer.insight_flow, consumer.callback_dispatcher = core, dispatcher
+        try:
+            start = time.perf_counter()
+            popped = 0
+            while popped < total:
+                raw_tasks = task_queue.pop_batch(batch_size, linger_ms, block_timeout=0.1)
+                batch_start = time.perf_counter()
+                consumer.process_task_batch(task_queue, raw_tasks)
+                batch_latencies_ms.append((time.perf_counter() - batch_start) * 1000.0)
+                popped += len(raw_tasks)
+            all_reported = laravel.wait_for(total, timeout=60.0)
+            dispatcher.close(timeout=30.0) # Runs the remaining ack hooks
+            elapsed = time.perf_counter() - start
+        finally:
+            consumer.insight_flow, consumer.callback_dispatcher = original_core, original_dispatcher
+
+    return {
+        "tasks": total,
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 4),
+        "tasks_per_second": round(total / elapsed, 1),
+        "batch_latency_ms": percentiles(batch_latencies_ms),
+        "stages": stage_breakdown(before, _stage_totals()),
+        "all_reported": all_reported,
+        "unacked": client.llen(task_queue.processing_key),
+        "laravel_requests": laravel.requests,
+        "redis_round_trips": client.round_trips,
+    }
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> Dict[str, Any]:
+    texts = load_corpus(args.corpus)
+    core = build_core(args.cache)
+    report: Dict[str, Any] = {
+        "meta": {
+            "corpus": os.path.abspath(args.corpus),
+            "corpus_texts": len(texts),
+            "repeat": args.repeat,
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "execution_mode": core.execution_mode,
+            "result_cache": args.cache,
+            "strategies": {name: type(module).__name__ for name, module in (
+                ("summarizer", core.summarizer), ("sentiment", core.sentiment_analyzer),
+                ("keywords", core.keyword_extractor), ("intent", core.intent_recognizer),
+                ("recommender", core.recommender),
+            )},
+        },
+    }
+    try:
+        if args.mode in ("core", "all"):
+            report["core"] = bench_core(core, texts, args.repeat)
+        if args.mode in ("consumer", "all"):
+            report["consumer"] = bench_consumer(
+                core, texts, args.repeat, args.batch_size, args.linger_ms, args.redis_latency_ms
+            )
+    finally:
+        core.shutdown()
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def _lookup(report: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = report
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    """Relative change of every tracked metric; a change worse than `threshold` is a regression."""
+    rows = []
+    for path, higher_is_better in TRACKED_METRICS:
+        old, new = _lookup(baseline, path), _lookup(candidate, path)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        worse = -change if higher_is_better else change
+        rows.append({"metric": path, "baseline": old, "candidate": new,
+                     "change": round(change, 4), "regression": worse > threshold})
+    return {
+        "threshold": threshold,
+        "regressions": [row["metric"] for row in rows if row["regression"]],
+        "metrics": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subcommands.add_parser("run", help="Replay a corpus and write a JSON report")
+    run_parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    run_parser.add_argument("--mode", choices=("core", "consumer", "all"), default="all")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus")
+    run_parser.add_argument("--batch-size", type=int, default=settings.CONSUMER_BATCH_SIZE)
+    run_parser.add_argument("--linger-ms", type=int, default=settings.CONSUMER_BATCH_LINGER_MS)
+    run_parser.add_argument("--redis-latency-ms", type=float, default=0.2)
+    run_parser.add_argument("--cache", action="store_true", help="Keep the result cache enabled")
+    run_parser.add_argument("--output", help="Write the report here as well as to stdout")
+
+    compare_parser = subcommands.add_parser("compare", help="Compare two reports; exit 1 on regression")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Tolerated relative slowdown")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO) # Per-task log lines would dominate the measurement
+
+    if args.command == "run":
+        report = run(args)
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(output + "\n")
+        print(output)
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    result = compare(baseline, candidate, args.threshold)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
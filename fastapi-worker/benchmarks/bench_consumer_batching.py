@@ -0,0 +1,85 @@
+"""
+Throughput benchmark for the consumer's micro-batching mode.
+
+Fills a local fake Redis with tasks and drains it with `ReliableQueue.pop_batch` + `process_task_batch`
+(including the per-task acks) for several batch sizes. The fake Redis adds a fixed latency per round trip and the fake model
+adds a fixed per-invocation overhead, mirroring what batching amortizes in production.
+
+Usage (from fastapi-worker/):
+    python -m benchmarks.bench_consumer_batching --tasks 2000 --batch-sizes 1,4,16,64
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+from app import consumer
+from app.reliable_queue import ReliableQueue
+from benchmarks.fake_redis import FakeRedis
+
+
+class FakeBatchModel:
+    """Charges a fixed cost per invocation plus a small cost per text, like a batched model call."""
+
+    def __init__(self, call_overhead_ms: float, per_item_ms: float):
+        self.call_overhead_ms = call_overhead_ms
+        self.per_item_ms = per_item_ms
+
+    def process_customer_feedback(self, user_input: str) -> Dict[str, Any]:
+        return self.process_customer_feedback_batch([user_input])[0]
+
+    def process_customer_feedback_batch(self, user_inputs: List[str]) -> List[Dict[str, Any]]:
+        time.sleep((self.call_overhead_ms + self.per_item_ms * len(user_inputs)) / 1000.0)
+        return [{"摘要": [text[:20]]} for text in user_inputs]
+
+
+def run_once(batch_size: int, tasks: int, linger_ms: int, redis_latency_ms: float, model: FakeBatchModel) -> Dict[str, Any]:
+    client = FakeRedis(latency_ms=redis_latency_ms)
+    queue_name = "bench_queue"
+    client.rpush(queue_name, *[
+        json.dumps({"task_id": f"task-{i}", "text_content": f"顧客抱怨胃部不適 #{i}"}) for i in range(tasks)
+    ])
+
+    processed = 0
+    task_queue = ReliableQueue(client, queue_name, worker_id="bench")
+    with patch.object(consumer, "insight_flow", model), \
+         patch.object(consumer, "update_laravel_task_status", lambda *args, **kwargs: True):
+        client.round_trips = 0
+        start = time.perf_counter()
+        while processed < tasks:
+            raw_tasks = task_queue.pop_batch(batch_size, linger_ms)
+            consumer.process_task_batch(task_queue, raw_tasks)
+            processed += len(raw_tasks)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "batch_size": batch_size,
+        "tasks": tasks,
+        "seconds": round(elapsed, 4),
+        "tasks_per_second": round(tasks / elapsed, 1),
+        "redis_round_trips": client.round_trips,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--batch-sizes", default="1,4,16,64")
+    parser.add_argument("--linger-ms", type=int, default=5)
+    parser.add_argument("--redis-latency-ms", type=float, default=0.2)
+    parser.add_argument("--model-overhead-ms", type=float, default=2.0)
+    parser.add_argument("--model-per-item-ms", type=float, default=0.1)
+    args = parser.parse_args()
+
+    consumer.logger.disabled = True # Per-task log lines would dominate the measurement
+    model = FakeBatchModel(args.model_overhead_ms, args.model_per_item_ms)
+    results = [
+        run_once(int(size), args.tasks, args.linger_ms, args.redis_latency_ms, model)
+        for size in args.batch_sizes.split(",")
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: near-duplicate reuse (app/core/near_duplicate.py) on reworded copies of the corpus.
+
+Each corpus text is stored in the index once, then looked up again as light rewordings (greeting
+added, trailing thanks, punctuation and whitespace changed, one clause dropped). For each threshold it
+reports the share of rewordings that reuse their original (hits) and that reuse a different text
+(wrong). It also times embedding and search per text at --entries stored vectors, and the save/load
+round trip of an index that size.
+
+Usage (from fastapi-worker/):
+    python -m benchmarks.bench_near_duplicate --corpus ../requests.jsonl --entries 20000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict
+
+import numpy as np
+
+from app.core.insight_flow_core import HashedNgramEmbedder
+from app.core.near_duplicate import NearDuplicateIndex
+from benchmarks.bench import DEFAULT_CORPUS, load_corpus
+
+REWORDINGS: Dict[str, Callable[[str], str]] = {
+    "greeting": lambda text: "您好，" + text,
+    "thanks": lambda text: text + " 謝謝！",
+    "punctuation": lambda text: text.replace("，", ",").replace("。", ".").replace(", ", ",  "),
+    "drop_clause": lambda text: text.rsplit(".", 2)[0] + "." if text.count(".") >= 2 else text[:int(len(text) * 0.9)],
+}
+
+
+def timed_ms(call: Callable[[], object], repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--thresholds", default="0.8,0.85,0.9,0.92,0.95")
+    parser.add_argument("--entries", type=int, default=20000, help="Index size for the timing runs")
+    parser.add_argument("--dim", type=int, default=512)
+    args = parser.parse_args()
+
+    texts = load_corpus(args.corpus)
+    embedder = HashedNgramEmbedder(dim=args.dim)
+    originals = embedder.embed_batch(texts)
+    variants = {name: embedder.embed_batch([reword(text) for text in texts]) for name, reword in REWORDINGS.items()}
+
+    reuse: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for threshold in (float(value) for value in args.thresholds.split(",")):
+        index = NearDuplicateIndex(fingerprint="bench", threshold=threshold, max_entries=len(texts))
+        index.add(originals, [{"text": position} for position in range(len(texts))])
+        reuse[str(threshold)] = {}
+        for name, vectors in variants.items():
+            found = index.search(vectors)
+            reuse[str(threshold)][name] = {
+                "hits": round(sum(1 for position, result in enumerate(found) if result == {"text": position}) / len(texts), 3),
+                "wrong": round(sum(1 for position, result in enumerate(found)
+                                   if result is not None and result != {"text": position}) / len(texts), 3),
+            }
+
+    # Timing at a realistic index size: random unit vectors stand in for stored texts
+    rng = np.random.default_rng(0)
+    index = NearDuplicateIndex(fingerprint="bench", max_entries=args.entries)
+    index.add(rng.random((args.entries, args.dim), dtype=np.float32), [{"v": i} for i in range(args.entries)])
+    queries = variants["thanks"]
+    timings = {
+        "embed_us_per_text": round(timed_ms(lambda: embedder.embed_batch(texts)) * 1000.0 / len(texts), 1),
+        "search_us_per_text": round(timed_ms(lambda: index.search(queries)) * 1000.0 / len(texts), 1),
+        "search_batch_of_1_us": round(timed_ms(lambda: index.search(queries[:1])) * 1000.0, 1),
+    }
+    with tempfile.TemporaryDirectory() as persist_dir:
+        index.persist_dir = persist_dir
+        timings["save_ms"] = round(timed_ms(index.save, repeat=1), 1)
+        timings["load_ms"] = round(timed_ms(lambda: NearDuplicateIndex(
+            fingerprint="bench", max_entries=args.entries, persist_dir=persist_dir), repeat=1), 1)
+        timings["file_bytes"] = sum(os.path.getsize(os.path.join(persist_dir, name)) for name in os.listdir(persist_dir))
+
+    print(json.dumps({"texts": len(texts), "entries": args.entries, "dim": args.dim,
+                      "reuse": reuse, "timings": timings}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark: int8 ONNX strategies against the PyTorch path they replace (transformers sentiment pipeline,
+KeyBERT on sentence-transformers) on CPU. Each backend/task pair runs in its own subprocess so peak
+RSS is not shared between them; the report gives model load time, throughput, per-batch latency and
+memory for each.
+
+Export the ONNX model directories first (benchmarks/export_onnx.py), from the same checkpoints.
+
+Usage (from fastapi-worker/):
+    python -m benchmarks.bench_onnx --corpus ../requests.jsonl --batch-size 32 \\
+        --sentiment-model distilbert-base-uncased-finetuned-sst-2-english --sentiment-onnx-dir models/sentiment-int8 \\
+        --keyword-model sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2 --keyword-onnx-dir models/keywords-int8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+from benchmarks.bench import DEFAULT_CORPUS, load_corpus, peak_rss_mb, percentiles
+
+
+def current_rss_mb() -> float:
+    with open("/proc/self/statm") as f: # Linux only, like the worker image
+        return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024), 1)
+
+
+def _load(backend: str, task: str, args) -> Callable[[List[str]], Any]:
+    if backend == "onnx":
+        from app.core.insight_flow_core import OnnxKeywordExtractor, OnnxSentimentAnalyzer
+        options = {"max_length": args.max_length, "max_batch_size": args.batch_size, "intra_op_threads": args.threads}
+        if task == "sentiment":
+            return OnnxSentimentAnalyzer(args.sentiment_onnx_dir, **options).analyze_batch
+        return OnnxKeywordExtractor(args.keyword_onnx_dir, **options).extract_batch
+
+    import torch
+    torch.set_num_threads(args.threads)
+    if task == "sentiment":
+        from transformers import pipeline
+        classifier = pipeline("sentiment-analysis", model=args.sentiment_model, device=-1)
+        return lambda texts: classifier(texts, batch_size=args.batch_size, truncation=True, max_length=args.max_length)
+    from keybert import KeyBERT
+    keybert = KeyBERT(model=args.keyword_model)
+    return lambda texts: keybert.extract_keywords(texts, keyphrase_ngram_range=(1, 2), top_n=5)
+
+
+def run_one(backend: str, task: str, args) -> Dict[str, Any]:
+    texts = load_corpus(args.corpus)
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    infer = _load(backend, task, args)
+    load_ms = (time.perf_counter() - start) * 1000.0
+    rss_loaded = current_rss_mb()
+    infer(texts[:args.batch_size]) # Warm-up: first-call allocations and lazy initialization
+
+    batch_ms = []
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for offset in range(0, len(texts), args.batch_size):
+            batch_start = time.perf_counter()
+            infer(texts[offset:offset + args.batch_size])
+            batch_ms.append((time.perf_counter() - batch_start) * 1000.0)
+    elapsed = time.perf_counter() - start
+    return {
+        "backend": backend,
+        "task": task,
+        "texts": len(texts) * args.repeat,
+        "load_ms": round(load_ms, 1),
+        "texts_per_second": round(len(texts) * args.repeat / elapsed, 1),
+        "batch_latency_ms": percentiles(batch_ms),
+        "model_rss_mb": round(rss_loaded - rss_before, 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--tasks", default="sentiment,keywords")
+    parser.add_argument("--backends", default="pytorch,onnx")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=1, help="Intra-op threads (one per forked consumer in production)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sentiment-model", default="distilbert-base-uncased-finetuned-sst-2-english")
+    parser.add_argument("--sentiment-onnx-dir", default="models/sentiment-int8")
+    parser.add_argument("--keyword-model", default="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    parser.add_argument("--keyword-onnx-dir", default="models/keywords-int8")
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    parser.add_argument("--child", nargs=2, metavar=("BACKEND", "TASK"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_one(args.child[0], args.child[1], args)))
+        return
+
+    results = []
+    for task in args.tasks.split(","):
+        for backend in args.backends.split(","):
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_onnx", *sys.argv[1:], "--child", backend, task],
+                capture_output=True, text=True,
+            )
+            if completed.returncode != 0:
+                results.append({"backend": backend, "task": task, "error": completed.stderr.strip().splitlines()[-1:]})
+                continue
+            results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    speedups = {}
+    for task in args.tasks.split(","):
+        by_backend = {result["backend"]: result for result in results if result["task"] == task and "error" not in result}
+        if {"pytorch", "onnx"} <= set(by_backend):
+            speedups[task] = {
+                "throughput_x": round(by_backend["onnx"]["texts_per_second"] / by_backend["pytorch"]["texts_per_second"], 2),
+                "peak_rss_saved_mb": round(by_backend["pytorch"]["peak_rss_mb"] - by_backend["onnx"]["peak_rss_mb"], 1),
+            }
+    report = {"results": results, "onnx_vs_pytorch": speedups}
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark: chained `"term" in text` scans (how KeyBERTKeywordExtractor/OpenAIIntentRecognizer match today)
+versus the precompiled Aho–Corasick automaton, as the term dictionary grows to thousands of entries.
+
+Usage (from fastapi-worker/):
+    python -m benchmarks.bench_pattern_matcher --term-counts 4,100,1000,5000 --texts 2000
+"""
+import argparse
+import json
+import random
+import time
+from typing import Dict, List
+
+from app.core.pattern_matcher import AhoCorasickMatcher
+
+# Common CJK characters used to build synthetic product/symptom terms and feedback texts
+ALPHABET = "保健食品胃部不適睡眠品質促銷方案益生菌膠原蛋白魚油葉黃素維他命失眠便秘脹氣退貨款運費客服顧客抱怨希望感謝滿意"
+
+
+def synthetic_terms(count: int, rng: random.Random) -> List[str]:
+    terms = {"保健食品", "胃部不適", "睡眠品質", "促銷方案"}
+    while len(terms) < count:
+        terms.add("".join(rng.choice(ALPHABET) for _ in range(rng.randint(2, 6))))
+    return sorted(terms)[:count]
+
+
+def synthetic_texts(count: int, terms: List[str], rng: random.Random, length: int) -> List[str]:
+    texts = []
+    for _ in range(count):
+        chunks = []
+        while sum(map(len, chunks)) < length:
+            chunks.append(rng.choice(terms) if rng.random() < 0.2 else "".join(rng.choice(ALPHABET) for _ in range(4)))
+        texts.append("，".join(chunks))
+    return texts
+
+
+def chained_substring_counts(terms: List[str], text: str) -> Dict[str, int]:
+    return {term: text.count(term) for term in terms if term in text}
+
+
+def measure(fn, texts: List[str]) -> float:
+    start = time.perf_counter()
+    for text in texts:
+        fn(text)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--term-counts", default="4,100,1000,5000")
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--text-length", type=int, default=200, help="Approximate characters per text")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    results = []
+    for term_count in map(int, args.term_counts.split(",")):
+        rng = random.Random(args.seed)
+        terms = synthetic_terms(term_count, rng)
+        texts = synthetic_texts(args.texts, terms, rng, args.text_length)
+
+        build_start = time.perf_counter()
+        matcher = AhoCorasickMatcher(terms)
+        build_ms = (time.perf_counter() - build_start) * 1000.0
+
+        assert all(matcher.count(t).keys() == chained_substring_counts(terms, t).keys() for t in texts[:50])
+        substring_rate = measure(lambda text: chained_substring_counts(terms, text), texts)
+        automaton_rate = measure(matcher.count, texts)
+        results.append({
+            "terms": term_count,
+            "automaton_build_ms": round(build_ms, 2),
+            "chained_substring_texts_per_second": round(substring_rate, 1),
+            "aho_corasick_texts_per_second": round(automaton_rate, 1),
+            "speedup": round(automaton_rate / substring_rate, 2),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: interactive queue wait under a bulk backfill, with priority lanes versus a single FIFO queue.
+
+A backlog of bulk tasks is pushed up front, then interactive tasks arrive at a steady rate while
+consumers drain everything from an in-process fake Redis. Analysis is simulated with a fixed cost per
+task (plus per batch), so the numbers isolate scheduling. Reports per-lane wait percentiles
+(push -> pickup) for both modes; in "fifo" mode every task goes through the single standard list,
+which is how the queue behaved before lanes.
+
+Usage (from fastapi-worker/):
+    python -m benchmarks.bench_priority_lanes --bulk 5000 --interactive 200 --interactive-rate 20 --consumers 2
+"""
+import argparse
+import json
+import threading
+import time
+from typing import Dict, List
+
+from app.priority_lanes import PriorityLaneQueue, parse_lane_weights
+from benchmarks.bench import percentiles
+from benchmarks.fake_redis import FakeRedis
+
+
+def run(mode: str, args) -> Dict[str, Dict[str, float]]:
+    client = FakeRedis(latency_ms=args.redis_latency_ms)
+    weights = parse_lane_weights(args.weights) if mode == "lanes" else {"interactive": 1, "standard": 1, "bulk": 1}
+    producer = PriorityLaneQueue(client, "bench_lanes", weights, worker_id="producer")
+
+    def push(task_id: str, lane: str):
+        raw_task = json.dumps({"task_id": task_id, "priority": lane, "enqueued_at": time.monotonic()})
+        producer.push(raw_task, lane if mode == "lanes" else "standard")
+
+    for i in range(args.bulk):
+        push(f"bulk-{i}", "bulk")
+
+    waits: Dict[str, List[float]] = {"interactive": [], "bulk": []}
+    waits_lock = threading.Lock()
+    remaining = [args.bulk + args.interactive]
+    done = threading.Event()
+
+    def consume(worker_index: int):
+        task_queue = PriorityLaneQueue(client, "bench_lanes", weights, worker_id=f"bench-{worker_index}",
+                                       starvation_seconds=args.starvation_seconds, idle_poll_seconds=0.01)
+        while not done.is_set():
+            batch = task_queue.pop_batch(args.batch_size, args.linger_ms, block_timeout=0.1)
+            if not batch:
+                continue
+            picked_up = time.monotonic()
+            time.sleep((args.batch_cost_ms + args.task_cost_ms * len(batch)) / 1000.0) # Simulated analysis
+            with waits_lock:
+                for raw_task in batch:
+                    task = json.loads(raw_task)
+                    waits[task["priority"]].append((picked_up - task["enqueued_at"]) * 1000.0)
+                    task_queue.ack(raw_task)
+                remaining[0] -= len(batch)
+                if remaining[0] <= 0:
+                    done.set()
+
+    consumers = [threading.Thread(target=consume, args=(i,), daemon=True) for i in range(args.consumers)]
+    for thread in consumers:
+        thread.start()
+    for i in range(args.interactive):
+        push(f"interactive-{i}", "interactive")
+        time.sleep(1.0 / args.interactive_rate)
+    done.wait()
+    for thread in consumers:
+        thread.join()
+    return {lane: percentiles(samples) for lane, samples in waits.items() if samples}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bulk", type=int, default=5000)
+    parser.add_argument("--interactive", type=int, default=200)
+    parser.add_argument("--interactive-rate", type=float, default=20.0, help="Interactive tasks per second")
+    parser.add_argument("--consumers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--linger-ms", type=int, default=5)
+    parser.add_argument("--task-cost-ms", type=float, default=1.0)
+    parser.add_argument("--batch-cost-ms", type=float, default=5.0)
+    parser.add_argument("--redis-latency-ms", type=float, default=0.2)
+    parser.add_argument("--weights", default="interactive=8,standard=3,bulk=1")
+    parser.add_argument("--starvation-seconds", type=float, default=30.0)
+    parser.add_argument("--modes", default="fifo,lanes")
+    args = parser.parse_args()
+
+    report = {mode: run(mode, args) for mode in args.modes.split(",")}
+    print(json.dumps({"wait_ms": report}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: RuleBasedRecommender against a synthetic catalog of ~100k SKUs and a few hundred segment
+rules. Reports index build (hot-reload) time and per-call latency percentiles.
+
+Usage (from fastapi-worker/):
+    python -m benchmarks.bench_recommender --products 100000 --segments 500 --calls 5000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.core.catalog_index import CatalogIndex
+from app.core.insight_flow_core import RuleBasedRecommender
+
+CATEGORIES = ["睡眠產品", "腸胃照護產品", "美容保養", "關節保健", "眼睛保健", "體重管理"]
+KEYWORDS = ["失眠", "胃痛", "便秘", "脹氣", "膠原蛋白", "魚油", "葉黃素", "益生菌", "維他命", "促銷方案", "退貨", "運費"]
+INTENTS = ["產品諮詢", "促銷活動查詢", "退換貨", "客訴", "物流查詢"]
+
+
+def synthetic_catalog(products: int, segments: int, rng: random.Random):
+    catalog = [{
+        "sku": f"SKU-{i:06d}",
+        "name": f"商品{i}",
+        "category": rng.choice(CATEGORIES),
+        "keywords": rng.sample(KEYWORDS, rng.randint(1, 4)),
+        "score": round(rng.random(), 4),
+    } for i in range(products)]
+    rules = []
+    for i in range(segments):
+        key = rng.choice(["intent", "product_category", "keyword"])
+        value = rng.choice({"intent": INTENTS, "product_category": CATEGORIES, "keyword": KEYWORDS}[key])
+        rules.append({"name": f"rule-{i}", "when": {key: value}, "recommendations": [f"建議 {i}"]})
+    return catalog, rules
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--segments", type=int, default=500)
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    catalog, rules = synthetic_catalog(args.products, args.segments, rng)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        products_path = os.path.join(tmp_dir, "products.json")
+        segments_path = os.path.join(tmp_dir, "segments.json")
+        with open(products_path, "w", encoding="utf-8") as f:
+            json.dump({"products": catalog}, f, ensure_ascii=False)
+        with open(segments_path, "w", encoding="utf-8") as f:
+            json.dump({"segments": rules}, f, ensure_ascii=False)
+
+        build_start = time.perf_counter()
+        CatalogIndex.from_files(products_path, segments_path)
+        build_ms = (time.perf_counter() - build_start) * 1000.0
+        recommender = RuleBasedRecommender(products_path, segments_path, reload_interval_seconds=0)
+
+    latencies_ms = []
+    for _ in range(args.calls):
+        sentiment = {"label": rng.choice(["positive", "negative"]), "score": rng.random()}
+        keywords = rng.sample(KEYWORDS, 3)
+        intent = {"intent": rng.choice(INTENTS), "product_category": rng.choice(CATEGORIES)}
+        start = time.perf_counter()
+        recommender.generate_recommendations(["客戶回饋摘要"], sentiment, keywords, intent)
+        latencies_ms.append((time.perf_counter() - start) * 1000.0)
+
+    print(json.dumps({
+        "products": args.products,
+        "segments": args.segments,
+        "index_build_ms": round(build_ms, 1),
+        "calls": args.calls,
+        "p50_ms": round(statistics.median(latencies_ms), 4),
+        "p99_ms": round(percentile(latencies_ms, 0.99), 4),
+        "max_ms": round(max(latencies_ms), 4),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
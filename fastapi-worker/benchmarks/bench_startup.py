@@ -0,0 +1,72 @@
+"""
+Startup benchmark: how long a fresh interpreter takes to import the API and consumer modules, to build
+InsightFlowCore, and to warm it up, plus which heavy ML/API libraries got imported along the way.
+Each measurement runs in its own subprocess so nothing is already cached in sys.modules.
+
+`import app.main` must stay fast (strategies load lazily); use --max-import-ms to fail CI when it regresses.
+
+Usage (from fastapi-worker/):
+    python -m benchmarks.bench_startup --runs 5 --max-import-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HEAVY_MODULES = ("torch", "transformers", "keybert", "sentence_transformers", "openai", "onnxruntime")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed_ms = (time.perf_counter() - start) * 1000.0
+print(json.dumps({{"ms": elapsed_ms, "heavy": sorted(m for m in {heavy!r} if m in sys.modules)}}))
+"""
+
+SCENARIOS = {
+    "import_app_main": "import app.main",
+    "import_app_consumer": "import app.consumer",
+    "create_core": "from app.config import settings\nfrom app.core.factory import create_insight_flow_core\n"
+                   "create_insight_flow_core(settings)",
+    "create_core_and_warm_up": "from app.config import settings\nfrom app.core.factory import create_insight_flow_core\n"
+                               "create_insight_flow_core(settings).warm_up()",
+}
+
+
+def probe(statement: str) -> dict:
+    """Runs `statement` in a fresh interpreter and returns its wall time (interpreter start excluded)."""
+    code = _PROBE.format(statement=statement, heavy=HEAVY_MODULES)
+    completed = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        cwd=os.path.join(os.path.dirname(__file__), ".."),
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, help="Exit 1 if the median `import app.main` is slower")
+    args = parser.parse_args()
+
+    report = {}
+    for name, statement in SCENARIOS.items():
+        samples = [probe(statement) for _ in range(args.runs)]
+        timings = [sample["ms"] for sample in samples]
+        report[name] = {
+            "median_ms": round(statistics.median(timings), 1),
+            "min_ms": round(min(timings), 1),
+            "max_ms": round(max(timings), 1),
+            "heavy_modules_imported": samples[-1]["heavy"],
+        }
+    print(json.dumps(report, indent=2))
+
+    if args.max_import_ms is not None and report["import_app_main"]["median_ms"] > args.max_import_ms:
+        print(f"import app.main took {report['import_app_main']['median_ms']} ms (> {args.max_import_ms} ms)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
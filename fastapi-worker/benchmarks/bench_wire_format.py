@@ -0,0 +1,98 @@
+"""
+Micro-benchmark: task decoding and status-update encoding, current JSON path versus app/wire_format.py.
+
+Decode variants, per task message:
+    baseline          json.loads + AnalysisRequestPayload(**payload) (the consumer before wire formats)
+    json              decode_task: model_validate_json straight from the bytes
+    construct         json.loads + model_construct, i.e. skipping validation for trusted producers
+    msgpack           decode_task for wire version 2 (when msgpack is installed)
+
+Encode variants, per bulk status update body of --updates results:
+    baseline          {"updates": [dict, ...]} serialized the way requests' json= does (ASCII-escaped)
+    json / msgpack    encode_status_updates
+
+Usage (from fastapi-worker/):
+    python -m benchmarks.bench_wire_format --corpus ../requests.jsonl --rounds 20
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List
+
+from app.core.insight_flow_core import InsightFlowCore
+from app.core.factory import build_core_config
+from app.config import settings
+from app.models.request_models import AnalysisRequestPayload
+from app.wire_format import MSGPACK_VERSION, decode_task, encode_status_updates, encode_task, msgpack
+from benchmarks.bench import DEFAULT_CORPUS, load_corpus
+
+
+def time_per_item(function: Callable[[Any], Any], items: List[Any], rounds: int) -> float:
+    """Best-of-`rounds` time per item, in microseconds."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        best = min(best, time.perf_counter() - start)
+    return round(best / len(items) * 1e6, 3)
+
+
+def baseline_decode(raw: bytes) -> AnalysisRequestPayload:
+    payload = json.loads(raw)
+    return AnalysisRequestPayload(**payload)
+
+
+def construct_decode(raw: bytes) -> AnalysisRequestPayload:
+    return AnalysisRequestPayload.model_construct(**json.loads(raw))
+
+
+def baseline_encode(updates) -> bytes:
+    body = {"updates": [{"task_id": task_id, "status": status, "result": result} for task_id, status, result in updates]}
+    return json.dumps(body, allow_nan=False).encode("utf-8") # What requests does with json=
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--updates", type=int, default=100, help="Status updates per bulk body")
+    args = parser.parse_args()
+
+    texts = load_corpus(args.corpus)
+    tasks = [{"task_id": f"task-{i}", "text_content": text, "priority": "standard", "enqueued_at": 1700000000.0 + i}
+             for i, text in enumerate(texts)]
+    messages = {"baseline": [json.dumps(task).encode("utf-8") for task in tasks],
+                "json": [encode_task(task) for task in tasks]}
+    if msgpack is not None:
+        messages["msgpack"] = [encode_task(task, version=MSGPACK_VERSION) for task in tasks]
+
+    decode: Dict[str, Dict[str, float]] = {
+        "baseline": {"us_per_task": time_per_item(baseline_decode, messages["baseline"], args.rounds)},
+    }
+    for wire in ("json", "msgpack"):
+        if wire not in messages:
+            continue
+        size = sum(len(raw) for raw in messages[wire]) / len(tasks)
+        decode[wire] = {"us_per_task": time_per_item(decode_task, messages[wire], args.rounds), "bytes_per_task": round(size, 1)}
+    decode["construct"] = {"us_per_task": time_per_item(construct_decode, messages["baseline"], args.rounds)}
+    decode["baseline"]["bytes_per_task"] = round(sum(len(raw) for raw in messages["baseline"]) / len(tasks), 1)
+
+    core = InsightFlowCore({**build_core_config(settings), "result_cache": {"enabled": False}})
+    results = core.process_customer_feedback_batch((texts * (args.updates // len(texts) + 1))[:args.updates])
+    core.shutdown()
+    bodies = [[(f"task-{i}", "completed", {"analysis_output": result}) for i, result in enumerate(results)]]
+    encode = {"baseline": {"us_per_body": time_per_item(baseline_encode, bodies, args.rounds * 10),
+                           "bytes_per_body": len(baseline_encode(bodies[0]))}}
+    for wire in ("json", "msgpack") if msgpack is not None else ("json",):
+        encode[wire] = {
+            "us_per_body": time_per_item(lambda updates: encode_status_updates(updates, wire), bodies, args.rounds * 10),
+            "bytes_per_body": len(encode_status_updates(bodies[0], wire)[0]),
+        }
+
+    print(json.dumps({"tasks": len(tasks), "msgpack_installed": msgpack is not None,
+                      "decode": decode, "encode": encode}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
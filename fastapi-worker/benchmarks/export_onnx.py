@@ -0,0 +1,67 @@
+"""
+Exports the Hugging Face models behind the PyTorch strategies to int8 ONNX model directories for the
+onnx_* strategies (see app/core/onnx_encoder.py): model.onnx, tokenizer.json and config.json.
+
+The export runs torch.onnx with dynamic batch and sequence axes, then onnxruntime's dynamic (weight-only
+int8, per-channel) quantization. Needs torch, transformers and onnxruntime; run it on a build machine,
+not in the worker image.
+
+Usage (from fastapi-worker/):
+    python -m benchmarks.export_onnx sentiment distilbert-base-uncased-finetuned-sst-2-english models/sentiment-int8
+    python -m benchmarks.export_onnx keywords sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2 models/keywords-int8
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+
+def export(task: str, model_name: str, output_dir: str, opset: int = 17) -> str:
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    model_class = AutoModelForSequenceClassification if task == "sentiment" else AutoModel
+    model = model_class.from_pretrained(model_name).eval()
+    sample = tokenizer(["warm-up text", "另一段比較長一點的範例文字"], padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    output_name = "logits" if task == "sentiment" else "last_hidden_state"
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes[output_name] = {0: "batch"} if task == "sentiment" else {0: "batch", 1: "sequence"}
+
+    os.makedirs(output_dir, exist_ok=True)
+    with tempfile.TemporaryDirectory() as work_dir:
+        float_path = os.path.join(work_dir, "model-fp32.onnx")
+        with torch.no_grad():
+            torch.onnx.export(
+                model, tuple(sample[name] for name in input_names), float_path,
+                input_names=input_names, output_names=[output_name], dynamic_axes=dynamic_axes, opset_version=opset,
+            )
+        quantize_dynamic(float_path, os.path.join(output_dir, "model.onnx"), weight_type=QuantType.QInt8, per_channel=True)
+
+    tokenizer.backend_tokenizer.save(os.path.join(output_dir, "tokenizer.json"))
+    model.config.to_json_file(os.path.join(output_dir, "config.json"))
+    with open(os.path.join(output_dir, "export.json"), "w", encoding="utf-8") as f:
+        json.dump({"task": task, "model_name": model_name, "opset": opset, "quantization": "dynamic int8"}, f, indent=2)
+    size_mb = os.path.getsize(os.path.join(output_dir, "model.onnx")) / (1024 * 1024)
+    print(f"Wrote {output_dir}/model.onnx ({size_mb:.1f} MB)")
+    return output_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("task", choices=["sentiment", "keywords"])
+    parser.add_argument("model_name")
+    parser.add_argument("output_dir")
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+    if os.path.exists(args.output_dir) and args.overwrite:
+        shutil.rmtree(args.output_dir)
+    export(args.task, args.model_name, args.output_dir, args.opset)
+
+
+if __name__ == "__main__":
+    main()
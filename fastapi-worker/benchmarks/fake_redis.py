@@ -0,0 +1,185 @@
+"""
+Minimal in-process stand-in for the subset of redis-py the worker uses.
+Each client call (or pipeline execute) counts as one round trip and can be given
+a simulated network latency, which is what makes batching visible in benchmarks.
+"""
+import threading
+import time
+from collections import deque
+
+
+class FakePipeline:
+    def __init__(self, client: "FakeRedis"):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        def queue_command(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue_command
+
+    def execute(self):
+        self._client._round_trip()
+        with self._client._lock:
+            return [getattr(self._client, f"_{name}")(*args, **kwargs) for name, args, kwargs in self._commands]
+
+
+class FakeRedis:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.round_trips = 0
+        self._lists = {}
+        self._strings = {}
+        self._hashes = {}
+        self._sets = {}
+        self._lock = threading.RLock()
+        self._not_empty = threading.Condition(self._lock)
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    @staticmethod
+    def _encode(value):
+        return value if isinstance(value, bytes) else str(value).encode("utf-8")
+
+    # --- Unlocked command implementations (shared by direct calls and pipelines) ---
+    def _rpush(self, key, *values):
+        items = self._lists.setdefault(key, deque())
+        items.extend(self._encode(v) for v in values)
+        self._not_empty.notify_all()
+        return len(items)
+
+    def _lpush(self, key, *values):
+        items = self._lists.setdefault(key, deque())
+        items.extendleft(self._encode(v) for v in values)
+        self._not_empty.notify_all()
+        return len(items)
+
+    def _llen(self, key):
+        return len(self._lists.get(key, ()))
+
+    def _lrange(self, key, start, end):
+        items = list(self._lists.get(key, ()))
+        end = len(items) + end if end < 0 else end
+        return items[start if start >= 0 else max(len(items) + start, 0):end + 1]
+
+    def _ltrim(self, key, start, end):
+        items = self._lists.get(key)
+        if items is not None:
+            self._lists[key] = deque(self._lrange(key, start, end))
+        return True
+
+    def _lpop_side(self, key, side):
+        items = self._lists.get(key)
+        if not items:
+            return None
+        return items.popleft() if side.upper() == "LEFT" else items.pop()
+
+    def _lmove(self, source, destination, src="LEFT", dest="RIGHT"):
+        value = self._lpop_side(source, src)
+        if value is not None:
+            (self._lpush if dest.upper() == "LEFT" else self._rpush)(destination, value)
+        return value
+
+    def _lrem(self, key, count, value):
+        items = self._lists.get(key)
+        if not items:
+            return 0
+        value = self._encode(value)
+        kept, removed = deque(), 0
+        for item in items:
+            if item == value and (count == 0 or removed < abs(count)):
+                removed += 1
+            else:
+                kept.append(item)
+        self._lists[key] = kept
+        return removed
+
+    def _lindex(self, key, index):
+        items = self._lists.get(key, ())
+        try:
+            return items[index]
+        except IndexError:
+            return None
+
+    def _hincrby(self, key, field, amount=1):
+        fields = self._hashes.setdefault(key, {})
+        fields[field] = int(fields.get(field, 0)) + amount
+        return fields[field]
+
+    def _hdel(self, key, *fields):
+        hash_ = self._hashes.get(key, {})
+        return sum(1 for field in fields if hash_.pop(field, None) is not None)
+
+    def _sadd(self, key, *values):
+        members = self._sets.setdefault(key, set())
+        before = len(members)
+        members.update(self._encode(v) for v in values)
+        return len(members) - before
+
+    def _srem(self, key, *values):
+        members = self._sets.get(key, set())
+        before = len(members)
+        members.difference_update(self._encode(v) for v in values)
+        return before - len(members)
+
+    def _smembers(self, key):
+        return set(self._sets.get(key, ()))
+
+    def _exists(self, *keys):
+        return sum(1 for key in keys if key in self._lists or self._get(key) is not None or key in self._hashes)
+
+    def _get(self, key):
+        value, expires_at = self._strings.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._strings[key]
+            return None
+        return value
+
+    def _set(self, key, value, ex=None, px=None, nx=False):
+        if nx and self._get(key) is not None:
+            return None
+        ttl = ex if ex else (px / 1000.0 if px else None)
+        self._strings[key] = (self._encode(value), time.monotonic() + ttl if ttl else None)
+        return True
+
+    def _delete(self, *keys):
+        return sum(
+            1 for key in keys
+            if any(store.pop(key, None) is not None for store in (self._lists, self._strings, self._hashes, self._sets))
+        )
+
+    # --- Public API ---
+    def __getattr__(self, name):
+        implementation = getattr(type(self), f"_{name}", None)
+        if implementation is None:
+            raise AttributeError(name)
+
+        def command(*args, **kwargs):
+            self._round_trip()
+            with self._lock:
+                return implementation(self, *args, **kwargs)
+        return command
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def brpop(self, key, timeout: float = 0):
+        self._round_trip()
+        with self._not_empty:
+            if not self._lists.get(key):
+                self._not_empty.wait_for(lambda: self._lists.get(key), timeout=timeout or None)
+            items = self._lists.get(key)
+            if not items:
+                return None
+            return (self._encode(key), items.pop())
+
+    def blmove(self, source, destination, timeout: float = 0, src="LEFT", dest="RIGHT"):
+        self._round_trip()
+        with self._not_empty:
+            if not self._lists.get(source):
+                self._not_empty.wait_for(lambda: self._lists.get(source), timeout=timeout or None)
+            return self._lmove(source, destination, src, dest)
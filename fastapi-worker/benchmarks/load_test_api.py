@@ -0,0 +1,134 @@
+"""
+Load test for POST /analyze_sync: p50/p99 latency and throughput.
+
+By default both variants run in-process:
+  * "per_request": the previous handler, which built a fresh InsightFlowCore on every request and ran the
+    blocking pipeline directly on the event loop.
+  * "shared": app.main as shipped, with one InsightFlowCore built in the lifespan handler and the pipeline
+    offloaded to the analysis thread pool.
+`--model-load-ms` emulates the cost of loading model weights when a core is constructed (the placeholder
+strategies load nothing, so without it the construction cost is only the recommender's JSON reads).
+Pass `--url` to load-test a running server instead.
+
+Usage (from fastapi-worker/):
+    python -m benchmarks.load_test_api --requests 500 --concurrency 32 --model-load-ms 50
+    python -m benchmarks.load_test_api --url http://localhost:8001 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from typing import Any, Dict, List
+from unittest.mock import patch
+
+import httpx
+from fastapi import FastAPI
+
+from app import main
+from app.config import settings
+from app.core import factory
+from app.models.request_models import AnalysisRequestPayload, AnalysisResponse, AnalysisResult
+
+SAMPLE_TEXTS = [
+    "顧客抱怨胃部不適，希望有促銷方案。",
+    "最近睡眠品質很差，想找適合的保健食品。",
+    "非常感謝客服的協助，很滿意這次的服務！",
+    "請問目前有哪些促銷方案可以參加？",
+]
+
+
+def build_legacy_app() -> FastAPI:
+    legacy_app = FastAPI()
+
+    @legacy_app.post("/analyze_sync")
+    async def analyze_text_sync(request: AnalysisRequestPayload):
+        insight_flow_local = factory.create_insight_flow_core(settings) # Built on every request
+        try:
+            analysis_result_dict = insight_flow_local.process_customer_feedback(request.text_content) # Blocks the loop
+            return AnalysisResponse(
+                task_id=request.task_id, status="processed_sync", analysis_output=AnalysisResult(**analysis_result_dict)
+            )
+        finally:
+            insight_flow_local.shutdown()
+
+    return legacy_app
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_load(client: httpx.AsyncClient, total_requests: int, concurrency: int) -> Dict[str, Any]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies_ms: List[float] = []
+    errors = 0
+
+    async def one_request(i: int):
+        nonlocal errors
+        payload = {"task_id": f"load-{i}", "text_content": f"{SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]} #{i}"}
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/analyze_sync", json=payload)
+            latencies_ms.append((time.perf_counter() - start) * 1000.0)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request(i) for i in range(total_requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms.sort()
+    return {
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_second": round(total_requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies_ms, 0.50), 3),
+        "p99_ms": round(percentile(latencies_ms, 0.99), 3),
+        "mean_ms": round(statistics.fmean(latencies_ms), 3),
+    }
+
+
+async def run_in_process(app: FastAPI, total_requests: int, concurrency: int) -> Dict[str, Any]:
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            return await run_load(client, total_requests, concurrency)
+
+
+async def main_async(args) -> Dict[str, Any]:
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+            return {"remote": await run_load(client, args.requests, args.concurrency)}
+
+    original_create = factory.create_insight_flow_core
+
+    def create_with_load_cost(settings_):
+        time.sleep(args.model_load_ms / 1000.0)
+        return original_create(settings_)
+
+    with patch.object(factory, "create_insight_flow_core", create_with_load_cost), \
+         patch.object(main, "create_insight_flow_core", create_with_load_cost):
+        return {
+            "per_request": await run_in_process(build_legacy_app(), args.requests, args.concurrency),
+            "shared": await run_in_process(main.app, args.requests, args.concurrency),
+        }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--model-load-ms", type=float, default=20.0)
+    parser.add_argument("--url", help="Base URL of a running worker API; skips the in-process comparison")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO) # Per-request log lines would dominate the measurement
+    print(json.dumps(asyncio.run(main_async(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -1,5 +1,7 @@
+import json
 import pytest
-from httpx import AsyncClient
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
 from app.main import app # Import the FastAPI app
 from app.config import settings # Import settings
 import redis # Import redis for testing consumer
@@ -16,30 +18,83 @@ def cleanup_redis_queue():
     yield
     TEST_REDIS_CLIENT.delete(settings.REDIS_QUEUE_NAME) # Ensure cleanup after test too
 
+@pytest_asyncio.fixture
+async def client():
+    """Runs the app lifespan (shared InsightFlowCore + analysis thread pool) around an in-process client."""
+    async with app.router.lifespan_context(app):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+
 @pytest.mark.asyncio
-async def test_health_check():
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        response = await client.get("/health")
-        assert response.status_code == 200
-        assert response.json() == {"status": "ok", "service": "InsightFlow AI Worker API"}
+async def test_health_check(client):
+    response = await client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "service": "InsightFlow AI Worker API"}
 
 @pytest.mark.asyncio
-async def test_analyze_sync_endpoint():
+async def test_analyze_sync_endpoint(client):
     # This tests the /analyze_sync endpoint, not the primary queue-based flow.
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        test_payload = {
-            "task_id": "test-sync-uuid-123",
-            "text_content": "顧客抱怨胃部不適，希望有促銷方案。"
-        }
-        response = await client.post("/analyze_sync", json=test_payload)
-        
-        assert response.status_code == 200
-        data = response.json()
-        assert data["task_id"] == "test-sync-uuid-123"
-        assert data["status"] == "processed_sync"
-        assert "analysis_output" in data
-        assert "摘要" in data["analysis_output"]
-        assert "推薦" in data["analysis_output"]
-        assert "情緒分數" in data["analysis_output"]
-        assert "關鍵字" in data["analysis_output"]
-        assert "意圖" in data["analysis_output"]
+    test_payload = {
+        "task_id": "test-sync-uuid-123",
+        "text_content": "顧客抱怨胃部不適，希望有促銷方案。"
+    }
+    response = await client.post("/analyze_sync", json=test_payload)
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert data["task_id"] == "test-sync-uuid-123"
+    assert data["status"] == "processed_sync"
+    assert "analysis_output" in data
+    assert "摘要" in data["analysis_output"]
+    assert "推薦" in data["analysis_output"]
+    assert "情緒分數" in data["analysis_output"]
+    assert "關鍵字" in data["analysis_output"]
+    assert "意圖" in data["analysis_output"]
+
+@pytest.mark.asyncio
+async def test_analyze_batch_endpoint_preserves_order(client):
+    test_payload = {"tasks": [
+        {"task_id": "test-batch-1", "text_content": "顧客抱怨胃部不適。"},
+        {"task_id": "test-batch-2", "text_content": "非常感謝，很滿意！"},
+    ]}
+    response = await client.post("/analyze_batch", json=test_payload)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["task_id"] for r in results] == ["test-batch-1", "test-batch-2"]
+    assert results[0]["analysis_output"]["情緒分數"]["label"] == "negative"
+    assert results[1]["analysis_output"]["情緒分數"]["label"] == "positive"
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_stage_latency(client):
+    await client.post("/analyze_sync", json={"task_id": "test-metrics-1", "text_content": "顧客抱怨胃部不適。"})
+    response = await client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE insightflow_stage_duration_seconds histogram" in response.text
+    assert 'insightflow_queue_depth{list="pending"}' in response.text
+
+@pytest.mark.asyncio
+async def test_analyze_stream_endpoint_streams_ndjson(client):
+    body = "\n".join([
+        '{"task_id": "test-stream-1", "text_content": "顧客抱怨胃部不適。"}',
+        "not json",
+        '{"task_id": "test-stream-2", "text_content": "非常感謝，很滿意！"}',
+    ])
+    response = await client.post("/analyze_stream", content=body.encode("utf-8"))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["status"] for row in rows] == ["processed_sync", "invalid", "processed_sync"]
+    assert rows[2]["analysis_output"]["情緒分數"]["label"] == "positive"
+
+@pytest.mark.asyncio
+async def test_ready_endpoint_reports_warm_up(client):
+    await app.state.warmup # Warm-up runs in the background from the lifespan
+    response = await client.get("/ready")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert "warmup_total" in response.json()["load_ms"]
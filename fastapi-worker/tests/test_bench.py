@@ -0,0 +1,42 @@
+import json
+import pytest
+from benchmarks.bench import bench_consumer, build_core, compare, load_corpus
+
+def test_load_corpus_accepts_task_and_request_records(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text("\n".join([
+        json.dumps({"task_id": "1", "text_content": "顧客抱怨胃部不適"}),
+        json.dumps({"request_id": "r-1", "title": "t", "body": "想問促銷方案"}),
+        "",
+    ]), encoding="utf-8")
+
+    assert load_corpus(str(corpus)) == ["顧客抱怨胃部不適", "想問促銷方案"]
+
+def test_load_corpus_rejects_records_without_text(tmp_path):
+    corpus = tmp_path / "corpus.jsonl"
+    corpus.write_text(json.dumps({"title": "no text"}), encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        load_corpus(str(corpus))
+
+def test_compare_flags_regressions_in_the_right_direction():
+    baseline = {"core": {"tasks_per_second": 100.0, "latency_ms": {"p99": 10.0}}, "peak_rss_mb": 100.0}
+    candidate = {"core": {"tasks_per_second": 120.0, "latency_ms": {"p99": 12.0}}, "peak_rss_mb": 105.0}
+
+    result = compare(baseline, candidate, threshold=0.10)
+
+    assert result["regressions"] == ["core.latency_ms.p99"]
+    assert {row["metric"] for row in result["metrics"]} == {"core.tasks_per_second", "core.latency_ms.p99", "peak_rss_mb"}
+
+def test_consumer_path_reports_and_acks_every_task():
+    core = build_core(use_cache=False)
+    try:
+        report = bench_consumer(core, ["顧客抱怨胃部不適", "非常感謝，很滿意！"], repeat=3,
+                                batch_size=4, linger_ms=0, redis_latency_ms=0.0)
+    finally:
+        core.shutdown()
+
+    assert report["tasks"] == 6
+    assert report["all_reported"] is True
+    assert report["unacked"] == 0
+    assert report["stages"]["summarize"]["calls"] == 2
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import pytest
+from app.bulk_stream import LineTooLong, iter_lines, stream_analysis
+
+def _record(i):
+    return {"task_id": f"t{i}", "text_content": f"text {i}"}
+
+def _result(text):
+    return {"摘要": [text], "推薦": [], "情緒分數": {}, "關鍵字": [], "意圖": None}
+
+async def _body(lines, piece_size=7):
+    data = "".join(line + "\n" for line in lines).encode("utf-8")
+    for start in range(0, len(data), piece_size): # Split records across body messages
+        yield data[start:start + piece_size]
+
+async def _analyze_chunk(texts):
+    return [_result(text) for text in texts]
+
+async def _analyze_one(text):
+    return _result(text)
+
+async def _collect(stream):
+    return [json.loads(line) for block in [b async for b in stream] for line in block.splitlines()]
+
+def test_iter_lines_handles_split_records_and_missing_final_newline():
+    async def body():
+        yield b'{"a":'
+        yield b'1}\n{"b":2}\n\n{"c"'
+        yield b':3}'
+
+    async def collect():
+        return [item async for item in iter_lines(body(), max_line_bytes=100)]
+
+    assert asyncio.run(collect()) == [(1, b'{"a":1}'), (2, b'{"b":2}'), (3, b""), (4, b'{"c":3}')]
+
+def test_iter_lines_rejects_oversized_line():
+    async def body():
+        yield b"x" * 50
+
+    async def collect():
+        return [item async for item in iter_lines(body(), max_line_bytes=10)]
+
+    with pytest.raises(LineTooLong):
+        asyncio.run(collect())
+
+def test_results_keep_input_order_with_invalid_records():
+    lines = [json.dumps(_record(0)), "not json", json.dumps(_record(1)), json.dumps({"task_id": "no-text"}), json.dumps(_record(2))]
+
+    output = asyncio.run(_collect(stream_analysis(_body(lines), _analyze_chunk, _analyze_one, chunk_size=2)))
+
+    assert [row.get("task_id") for row in output] == ["t0", None, "t1", "no-text", "t2"]
+    assert [row["status"] for row in output] == ["processed_sync", "invalid", "processed_sync", "invalid", "processed_sync"]
+    assert output[1]["line"] == 2
+    assert output[2]["analysis_output"]["摘要"] == ["text 1"]
+
+def test_failed_chunk_falls_back_to_single_records():
+    async def failing_chunk(texts):
+        raise RuntimeError("batch failed")
+
+    async def analyze_one(text):
+        if text == "text 1":
+            raise RuntimeError("bad text")
+        return _result(text)
+
+    lines = [json.dumps(_record(i)) for i in range(3)]
+    output = asyncio.run(_collect(stream_analysis(_body(lines), failing_chunk, analyze_one, chunk_size=3)))
+
+    assert [row["status"] for row in output] == ["processed_sync", "failed", "processed_sync"]
+    assert output[1] == {"line": 2, "task_id": "t1", "status": "failed", "error": "bad text"}
+
+def test_slow_consumer_bounds_work_ahead():
+    analyzed_chunks = []
+
+    async def analyze_chunk(texts):
+        analyzed_chunks.append(len(texts))
+        return [_result(text) for text in texts]
+
+    async def run():
+        stream = stream_analysis(_body([json.dumps(_record(i)) for i in range(100)]), analyze_chunk, _analyze_one,
+                                 chunk_size=5, max_pending_chunks=2)
+        first = await stream.__anext__()
+        await asyncio.sleep(0.05) # Client stops reading; the reader must stall rather than buffer everything
+        ahead = len(analyzed_chunks)
+        rest = [block async for block in stream]
+        return first, ahead, rest
+
+    first, ahead, rest = asyncio.run(run())
+
+    # One chunk delivered, two queued, one finished and waiting for queue space
+    assert ahead <= 4
+    assert sum(block.count(b"\n") for block in [first, *rest]) == 100
+
+def test_closing_the_stream_with_a_full_queue_stops_the_reader():
+    async def run():
+        stream = stream_analysis(_body([json.dumps(_record(i)) for i in range(100)]), _analyze_chunk, _analyze_one,
+                                 chunk_size=5, max_pending_chunks=1)
+        await stream.__anext__()
+        await asyncio.sleep(0.05) # The reader fills the queue and blocks on it
+        reader, = asyncio.all_tasks() - {asyncio.current_task()}
+        await stream.aclose() # Client disconnected
+        return reader.done()
+
+    assert asyncio.run(run())
+
+def test_stream_ends_when_the_reader_finishes_with_a_full_queue():
+    async def run():
+        stream = stream_analysis(_body([json.dumps(_record(i)) for i in range(20)]), _analyze_chunk, _analyze_one,
+                                 chunk_size=5, max_pending_chunks=1)
+        blocks = []
+        async for block in stream:
+            blocks.append(block)
+            await asyncio.sleep(0.02) # Slow client: the reader finishes while the queue is full
+        return blocks
+
+    blocks = asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+    assert sum(block.count(b"\n") for block in blocks) == 20
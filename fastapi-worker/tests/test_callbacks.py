@@ -0,0 +1,100 @@
+import json
+import threading
+import requests
+from app.callbacks import CallbackDispatcher
+
+class FakeSession:
+    """Records bulk payloads and answers with the queued status codes (200 once they run out)."""
+
+    def __init__(self, status_codes=(), body=None):
+        self.status_codes = list(status_codes)
+        self.body = body
+        self.payloads = []
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        assert headers["Content-Type"] == "application/json"
+        self.payloads.append(json.loads(data))
+        status_code = self.status_codes.pop(0) if self.status_codes else 200
+        if status_code is None:
+            raise requests.exceptions.ConnectionError("connection refused")
+        response = requests.Response()
+        response.status_code = status_code
+        response.url = url
+        if self.body is not None:
+            response._content = json.dumps(self.body).encode()
+        return response
+
+    def close(self):
+        pass
+
+def _dispatcher(session, **kwargs):
+    options = {"flush_interval_ms": 20, "backoff_base": 0, "max_retries": 2}
+    options.update(kwargs)
+    return CallbackDispatcher("http://laravel/bulk-update", session=session, **options)
+
+def test_updates_are_coalesced_into_one_bulk_request():
+    session = FakeSession()
+    dispatcher = _dispatcher(session)
+    delivered = []
+    dispatcher.submit("task-1", "processing")
+    dispatcher.submit("task-2", "processing")
+    dispatcher.submit("task-1", "completed", {"analysis_output": {}}, on_delivered=lambda: delivered.append("task-1"))
+
+    dispatcher.start()
+    dispatcher.close(timeout=5)
+
+    assert len(session.payloads) == 1
+    assert session.payloads[0]["updates"] == [
+        {"task_id": "task-2", "status": "processing", "result": None},
+        {"task_id": "task-1", "status": "completed", "result": {"analysis_output": {}}},
+    ]
+    assert delivered == ["task-1"]
+
+def test_transient_failures_are_retried():
+    session = FakeSession(status_codes=[None, 503])
+    dispatcher = _dispatcher(session)
+    delivered = threading.Event()
+    dispatcher.submit("task-1", "completed", on_delivered=delivered.set)
+
+    dispatcher.start()
+    dispatcher.close(timeout=5)
+
+    assert len(session.payloads) == 3
+    assert delivered.is_set()
+
+def test_exhausted_retries_and_rejections_run_on_failed():
+    failed = []
+    for status_codes in ([503, 503, 503], [422]):
+        session = FakeSession(status_codes=status_codes)
+        dispatcher = _dispatcher(session)
+        dispatcher.submit("task-1", "completed", on_failed=lambda: failed.append("task-1"))
+        dispatcher.start()
+        dispatcher.close(timeout=5)
+
+    assert failed == ["task-1", "task-1"]
+    assert dispatcher.failed == 1
+
+def test_only_updates_rejected_by_laravel_run_on_failed():
+    session = FakeSession(body={"updated": 1, "missing": [], "rejected": ["task-2"]})
+    dispatcher = _dispatcher(session)
+    delivered, failed = [], []
+    for task_id in ("task-1", "task-2"):
+        dispatcher.submit(task_id, "completed", on_delivered=lambda t=task_id: delivered.append(t),
+                          on_failed=lambda t=task_id: failed.append(t))
+
+    dispatcher.start()
+    dispatcher.close(timeout=5)
+
+    assert delivered == ["task-1"]
+    assert failed == ["task-2"]
+    assert (dispatcher.delivered, dispatcher.failed) == (1, 1)
+
+def test_full_buffer_fails_fast_instead_of_blocking():
+    dispatcher = _dispatcher(FakeSession(), max_buffer=1)
+    failed = []
+    dispatcher.submit("task-1", "processing")
+    dispatcher.submit("task-2", "completed", on_failed=lambda: failed.append("task-2"))
+
+    assert failed == ["task-2"]
+    assert dispatcher.dropped == 1
+    assert dispatcher.pending() == 1
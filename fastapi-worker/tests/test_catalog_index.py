@@ -0,0 +1,85 @@
+import json
+import os
+from app.core.catalog_index import CatalogIndex, CatalogStore, DEFAULT_SEGMENT_RULES
+from app.core.insight_flow_core import RuleBasedRecommender
+
+PRODUCTS = [
+    {"sku": "SLP-1", "name": "助眠茶", "category": "睡眠產品", "keywords": ["失眠", "睡眠"], "score": 0.5},
+    {"sku": "SLP-2", "name": "褪黑激素", "category": "睡眠產品", "keywords": ["失眠"], "score": 0.9},
+    {"sku": "GUT-1", "name": "益生菌", "category": "腸胃照護產品", "keywords": ["益生菌", "胃痛"], "score": 0.7},
+]
+
+def _write_json(path, data):
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+def test_products_ranked_by_hits_then_score():
+    index = CatalogIndex(PRODUCTS, DEFAULT_SEGMENT_RULES)
+
+    assert [p["sku"] for p in index.products_for("睡眠產品", [], limit=3)] == ["SLP-2", "SLP-1"]
+    # SLP-1 matches the category and both keywords, so it outranks the higher-scored SLP-2
+    assert [p["sku"] for p in index.products_for("睡眠產品", ["失眠", "睡眠"], limit=3)] == ["SLP-1", "SLP-2"]
+    assert [p["sku"] for p in index.products_for(None, ["胃痛"], limit=3)] == ["GUT-1"]
+    assert index.products_for("不存在", ["沒有"], limit=3) == []
+
+def test_default_rules_match_original_recommendations():
+    index = CatalogIndex([], DEFAULT_SEGMENT_RULES)
+    facts = {
+        "intent": "促銷活動查詢", "product_category": "睡眠產品", "sentiment_label": "negative",
+        "sentiment_score": 0.95, "keywords": [], "summary_text": "",
+    }
+
+    assert [rule["name"] for rule in index.matching_rules(facts)] == ["睡眠需求", "促銷關注", "負面情緒"]
+    assert index.matching_rules({**facts, "intent": None, "product_category": None, "sentiment_score": 0.5}) == []
+    assert [rule["name"] for rule in index.matching_rules({"summary_text": "詢問促銷方案"})] == ["促銷關注"]
+
+def test_keyword_rules_and_file_order():
+    rules = [
+        {"name": "魚油", "when": {"keyword": "魚油"}, "recommendations": ["a"]},
+        {"name": "高分負面", "when": {"sentiment_label": "negative", "min_sentiment_score": 0.5}, "recommendations": ["b"]},
+    ]
+    index = CatalogIndex([], rules)
+
+    facts = {"sentiment_label": "negative", "sentiment_score": 0.9, "keywords": ["魚油"]}
+    assert [rule["name"] for rule in index.matching_rules(facts)] == ["魚油", "高分負面"]
+
+def test_recommender_combines_rules_and_products(tmp_path):
+    products_path = tmp_path / "products.json"
+    _write_json(products_path, {"products": PRODUCTS})
+    recommender = RuleBasedRecommender(str(products_path), None, reload_interval_seconds=0, max_products=1)
+
+    result = recommender.generate_recommendations(
+        ["客戶失眠"], {"label": "neutral", "score": 0.5}, ["失眠"], {"product_category": "睡眠產品"}
+    )
+
+    assert result == ["根據分析，建議：", "寄送「睡眠系列產品」推薦郵件。", "推薦商品：褪黑激素（SLP-2）"]
+
+def test_store_swaps_in_rebuilt_index_when_files_change(tmp_path):
+    products_path = tmp_path / "products.json"
+    _write_json(products_path, PRODUCTS[:1])
+    store = CatalogStore(str(products_path), None, reload_interval_seconds=0)
+    old_index, old_version = store.current(), store.version
+
+    assert store.reload() is False # Unchanged files are not rebuilt
+
+    _write_json(products_path, PRODUCTS)
+    stat = os.stat(products_path)
+    os.utime(products_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert store.reload() is True
+
+    assert store.current() is not old_index
+    assert store.current().product_count == 3
+    assert old_index.product_count == 1 # Readers holding the old snapshot are unaffected
+    assert store.version != old_version
+    assert store.reloads == 1
+
+def test_store_keeps_previous_index_on_bad_file(tmp_path):
+    products_path = tmp_path / "products.json"
+    _write_json(products_path, PRODUCTS)
+    store = CatalogStore(str(products_path), None, reload_interval_seconds=0)
+
+    products_path.write_text("{not json", encoding="utf-8")
+    stat = os.stat(products_path)
+    os.utime(products_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert store.reload() is False
+    assert store.current().product_count == 3
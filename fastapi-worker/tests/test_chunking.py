@@ -0,0 +1,143 @@
+import pytest
+from app.core.chunking import (
+    chunk_text, estimate_tokens, reduce_intents, reduce_keywords, reduce_sentiments, reduce_summaries, split_sentences,
+)
+from app.core.insight_flow_core import InsightFlowCore
+
+def _transcript(turns, offset=0):
+    return "".join(
+        f"客服：第{i}通來電，請問有什麼可以幫您？顧客：我要抱怨，益生菌吃了之後胃部不適，想問退貨流程。"
+        for i in range(offset, offset + turns)
+    )
+
+@pytest.fixture
+def chunking_config():
+    return {
+        "OPENAI_API_KEY": "mock_openai_key",
+        "summarizer_model_type": "gpt_summarizer",
+        "sentiment_model_type": "hf_sentiment_analyzer",
+        "keyword_extractor_type": "keybert_extractor",
+        "intent_recognizer_type": "openai_function_calling_recognizer",
+        "sentiment_model_name": "mock-hf-model",
+        "recommender_config": {
+            "product_catalog_path": "/app/data/products.json",
+            "customer_segments_path": "/app/data/segments.json"
+        },
+        "chunking": {"enabled": True, "max_tokens": 120, "map_workers": 4},
+    }
+
+def test_split_sentences_keeps_chinese_punctuation_and_quotes():
+    text = "客服：您好。顧客說：「胃很痛！」真的嗎？OK, thanks! 最後一句"
+
+    assert split_sentences(text) == ["客服：您好。", "顧客說：「胃很痛！」", "真的嗎？", "OK, thanks!", " 最後一句"]
+
+def test_english_text_is_split_at_periods_but_not_decimals():
+    text = "The probiotic costs 3.5 dollars. It upset my stomach (again.) I want a refund.\nThanks"
+    assert split_sentences(text) == [
+        "The probiotic costs 3.5 dollars.", " It upset my stomach (again.)", " I want a refund.\n", "Thanks",
+    ]
+
+    text = " ".join(f"Call {i} was about version {i}.2 of the order and a delayed refund." for i in range(60))
+    windows = chunk_text(text, max_tokens=60)
+    assert len(windows) > 1
+    assert "".join(windows) == text
+    assert all(window.endswith("refund.") for window in windows) # Never cut mid-sentence
+
+def test_chunk_text_respects_budget_and_keeps_all_text():
+    text = _transcript(40)
+    windows = chunk_text(text, max_tokens=120)
+
+    assert len(windows) > 1
+    assert "".join(windows) == text
+    assert all(estimate_tokens(window) <= 120 for window in windows)
+
+def test_unpunctuated_text_is_hard_split():
+    windows = chunk_text("胃" * 250, max_tokens=100)
+
+    assert [len(window) for window in windows] == [100, 100, 50]
+
+def test_appending_only_changes_the_tail():
+    original = chunk_text(_transcript(40), max_tokens=120)
+    appended = chunk_text(_transcript(40) + _transcript(5, offset=40), max_tokens=120)
+
+    assert appended[:len(original) - 1] == original[:-1]
+
+def test_edit_in_the_middle_changes_few_windows():
+    original = chunk_text(_transcript(60), max_tokens=120)
+    edited_text = _transcript(60).replace("第30通來電", "第三十通來電")
+    edited = chunk_text(edited_text, max_tokens=120)
+
+    changed = set(edited) - set(original)
+    assert 1 <= len(changed) <= 3 # Content-defined boundaries re-align after the edit
+    assert len(original) > 10
+
+def test_reducers_merge_window_results():
+    assert reduce_sentiments(
+        [{"label": "negative", "score": 0.9}, {"label": "positive", "score": 0.6}, {"label": "negative", "score": 0.7}],
+        weights=[10, 30, 10],
+    ) == {"label": "positive", "score": 0.6}
+    assert reduce_keywords([["退貨", "胃痛"], ["胃痛"], ["益生菌", "胃痛"]], top_n=2) == ["胃痛", "退貨"]
+    assert reduce_intents([{"intent": "退換貨"}, None, {"intent": "客訴", "product_category": "x"}, {"intent": "客訴"}],
+                          weights=[50, 10, 20, 20]) == {"intent": "退換貨"}
+    assert reduce_intents([None, None], weights=[1, 1]) is None
+
+def test_reduce_summaries_resummarizes_when_over_budget():
+    calls = []
+
+    def summarize(text):
+        calls.append(text)
+        return ["濃縮摘要"]
+
+    assert reduce_summaries([["短句一"], ["短句二"]], summarize, max_tokens=100) == ["短句一", "短句二"]
+    assert calls == []
+    assert reduce_summaries([["很長的摘要句子" * 10], ["另一段很長的摘要" * 10]], summarize, max_tokens=50) == ["濃縮摘要"]
+
+def test_core_map_reduces_long_text_and_reuses_windows(chunking_config):
+    core = InsightFlowCore(chunking_config)
+    analyzed = []
+    original = core.summarizer.summarize
+    core.summarizer.summarize = lambda text: analyzed.append(text) or original(text)
+    try:
+        result = core.process_customer_feedback(_transcript(40))
+        first_pass = len(analyzed)
+        analyzed.clear()
+        core.process_customer_feedback(_transcript(40) + _transcript(3, offset=40))
+    finally:
+        core.shutdown()
+
+    assert first_pass > 1
+    assert result["情緒分數"]["label"] == "negative"
+    assert result["關鍵字"] == ["胃部不適"]
+    assert result["意圖"]["intent"] == "健康問題諮詢"
+    assert len(analyzed) <= 3 # Only the changed tail windows were re-analyzed
+
+def test_core_batch_mixes_short_and_long_texts(chunking_config):
+    core = InsightFlowCore(chunking_config)
+    try:
+        results = core.process_customer_feedback_batch(["非常感謝，很滿意！", _transcript(40), "想問促銷方案"])
+    finally:
+        core.shutdown()
+
+    assert results[0]["情緒分數"]["label"] == "positive"
+    assert results[1]["意圖"]["intent"] == "健康問題諮詢"
+    assert results[2]["意圖"]["intent"] == "促銷活動查詢"
+
+def test_chunk_map_uses_its_per_stage_timeout(chunking_config):
+    import threading
+    release = threading.Event()
+    core = InsightFlowCore({**chunking_config, "stage_timeout_seconds": 30, "stage_timeouts": {"chunk_map": 0.05}})
+    core.intent_recognizer.recognize = lambda text: release.wait(5)
+    try:
+        with pytest.raises(TimeoutError, match="Stage 'chunk_map' timed out after 0.05s"):
+            core.process_customer_feedback(_transcript(40))
+    finally:
+        release.set()
+        core.shutdown()
+
+def test_short_text_skips_chunking(chunking_config):
+    core = InsightFlowCore(chunking_config)
+    core._map_reduce = lambda text: pytest.fail("short text should not be chunked")
+    try:
+        assert core.process_customer_feedback("顧客抱怨胃部不適。")["情緒分數"]["label"] == "negative"
+    finally:
+        core.shutdown()
@@ -0,0 +1,72 @@
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from app import consumer
+from app.reliable_queue import ReliableQueue
+from benchmarks.fake_redis import FakeRedis
+
+QUEUE = "test_queue"
+
+def _task(i):
+    return json.dumps({"task_id": f"task-{i}", "text_content": f"text {i}"})
+
+@pytest.fixture
+def task_queue():
+    client = FakeRedis()
+    client.rpush(QUEUE, *[_task(i) for i in range(3)])
+    return ReliableQueue(client, QUEUE, worker_id="test-worker")
+
+def test_process_task_batch_uses_single_core_call_and_acks(task_queue):
+    raw_tasks = task_queue.pop_batch(batch_size=3, linger_ms=0)
+    core = MagicMock()
+    core.process_customer_feedback_batch.side_effect = lambda texts: [{"摘要": [t]} for t in texts]
+
+    with patch.object(consumer, "insight_flow", core), \
+         patch.object(consumer, "update_laravel_task_status", return_value=True) as mock_update:
+        consumer.process_task_batch(task_queue, raw_tasks)
+
+    core.process_customer_feedback_batch.assert_called_once_with(["text 0", "text 1", "text 2"])
+    mock_update.assert_any_call("task-0", "completed", {"analysis_output": {"摘要": ["text 0"]}})
+    assert task_queue.client.llen(task_queue.processing_key) == 0
+
+def test_process_task_batch_nacks_when_callback_fails(task_queue):
+    raw_tasks = task_queue.pop_batch(batch_size=1, linger_ms=0)
+    core = MagicMock()
+    core.process_customer_feedback_batch.side_effect = lambda texts: [{"摘要": [t]} for t in texts]
+
+    with patch.object(consumer, "insight_flow", core), \
+         patch.object(consumer, "update_laravel_task_status", return_value=False):
+        consumer.process_task_batch(task_queue, raw_tasks)
+
+    assert task_queue.client.llen(task_queue.processing_key) == 0
+    assert json.loads(task_queue.client.lrange(QUEUE, -1, -1)[0])["task_id"] == "task-0" # Back in line for a retry
+
+def test_process_task_batch_dead_letters_undecodable_tasks(task_queue):
+    task_queue.client.delete(QUEUE)
+    task_queue.client.rpush(QUEUE, "not json")
+    raw_tasks = task_queue.pop_batch(batch_size=1, linger_ms=0)
+
+    with patch.object(consumer, "update_laravel_task_status") as mock_update:
+        consumer.process_task_batch(task_queue, raw_tasks)
+
+    mock_update.assert_not_called()
+    assert task_queue.client.lrange(task_queue.dead_letter_key, 0, -1) == [b"not json"]
+
+def test_process_task_batch_isolates_failing_task(task_queue):
+    raw_tasks = task_queue.pop_batch(batch_size=2, linger_ms=0)
+    core = MagicMock()
+    core.process_customer_feedback_batch.side_effect = Exception("batch failed")
+
+    def process_one(text):
+        if text == "text 1":
+            raise Exception("bad text")
+        return {"摘要": [text]}
+    core.process_customer_feedback.side_effect = process_one
+
+    with patch.object(consumer, "insight_flow", core), \
+         patch.object(consumer, "update_laravel_task_status", return_value=True) as mock_update:
+        consumer.process_task_batch(task_queue, raw_tasks)
+
+    mock_update.assert_any_call("task-0", "completed", {"analysis_output": {"摘要": ["text 0"]}})
+    mock_update.assert_any_call("task-1", "failed", {"error": "bad text", "details": "Worker processing failed"})
+    assert task_queue.client.llen(task_queue.processing_key) == 0
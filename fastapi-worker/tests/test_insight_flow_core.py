@@ -75,3 +75,108 @@ def test_process_customer_feedback_error_handling(mock_config):
         with pytest.raises(Exception, match="API error from summarizer"):
             core.process_customer_feedback("some text")
 
+
+def test_process_customer_feedback_batch_preserves_order(mock_config):
+    core = InsightFlowCore(mock_config)
+    texts = ["顧客抱怨胃部不適。", "非常感謝，很滿意！", "想了解睡眠品質相關的促銷方案。"]
+
+    results = core.process_customer_feedback_batch(texts)
+
+    assert results == [core.process_customer_feedback(text) for text in texts]
+    assert results[0]["意圖"]["product_category"] == "腸胃照護產品"
+    assert results[1]["情緒分數"]["label"] == "positive"
+    assert results[2]["關鍵字"] == ["睡眠品質", "促銷方案"]
+
+def test_process_customer_feedback_batch_calls_each_module_once(insight_flow_core):
+    texts = ["第一筆", "第二筆"]
+    insight_flow_core.summarizer.summarize_batch.return_value = [["s1"], ["s2"]]
+    insight_flow_core.sentiment_analyzer.analyze_batch.return_value = [{"label": "neutral", "score": 0.5}] * 2
+    insight_flow_core.keyword_extractor.extract_batch.return_value = [["k1"], ["k2"]]
+    insight_flow_core.intent_recognizer.recognize_batch.return_value = [{"intent": "a"}, {"intent": "b"}]
+    insight_flow_core.recommender.generate_recommendations_batch.return_value = [["r1"], ["r2"]]
+
+    results = insight_flow_core.process_customer_feedback_batch(texts)
+
+    assert [r["摘要"] for r in results] == [["s1"], ["s2"]]
+    assert [r["推薦"] for r in results] == [["r1"], ["r2"]]
+    insight_flow_core.summarizer.summarize_batch.assert_called_once_with(texts)
+    insight_flow_core.summarizer.summarize.assert_not_called()
+
+def test_concurrent_mode_matches_sequential_and_reports_timings(mock_config):
+    sequential_core = InsightFlowCore(mock_config)
+    concurrent_core = InsightFlowCore({**mock_config, "execution_mode": "concurrent", "stage_timeout_seconds": 5})
+    text = "顧客抱怨胃部不適，希望有促銷方案。"
+
+    result = concurrent_core.process_customer_feedback(text)
+    metadata = result.pop("中繼資料")
+
+    assert result == sequential_core.process_customer_feedback(text)
+    assert metadata["execution_mode"] == "concurrent"
+    assert set(metadata["stage_timings_ms"]) == {"summarize", "sentiment", "keywords", "intent", "recommend"}
+    concurrent_core.shutdown()
+
+def test_concurrent_batch_results_do_not_share_metadata(mock_config):
+    core = InsightFlowCore({**mock_config, "execution_mode": "concurrent", "result_cache": {"enabled": False}})
+    first, second = core.process_customer_feedback_batch(["胃部不適", "促銷方案"])
+
+    assert first["中繼資料"] == second["中繼資料"]
+    first["中繼資料"]["stage_timings_ms"]["summarize"] = -1.0
+    assert second["中繼資料"]["stage_timings_ms"]["summarize"] != -1.0
+    core.shutdown()
+
+def test_concurrent_mode_enforces_stage_timeout(mock_config):
+    import threading
+    release = threading.Event()
+    core = InsightFlowCore({**mock_config, "execution_mode": "concurrent", "stage_timeouts": {"intent": 0.05}})
+    core.intent_recognizer.recognize = lambda text: release.wait(5)
+
+    with pytest.raises(TimeoutError, match="Stage 'intent' timed out"):
+        core.process_customer_feedback("some text")
+    release.set()
+    core.shutdown()
+
+def test_stage_timeouts_setting_is_parsed_into_the_core_config():
+    from app.config import Settings
+    from app.core.factory import build_core_config, parse_stage_timeouts
+
+    assert parse_stage_timeouts("summarize=20, intent=2.5") == {"summarize": 20.0, "intent": 2.5}
+    assert parse_stage_timeouts("chunk_map=60") == {"chunk_map": 60.0}
+    assert parse_stage_timeouts("") == {}
+    with pytest.raises(ValueError, match="Unknown pipeline stage 'recommend'"):
+        parse_stage_timeouts("recommend=5")
+    with pytest.raises(ValueError, match="positive timeout"):
+        parse_stage_timeouts("summarize=0")
+    with pytest.raises(ValueError, match="positive timeout"):
+        parse_stage_timeouts("summarize")
+    assert build_core_config(Settings(PIPELINE_STAGE_TIMEOUTS="keywords=3"))["stage_timeouts"] == {"keywords": 3.0}
+
+def test_unknown_execution_mode_is_rejected(mock_config):
+    with pytest.raises(ValueError, match="Unknown execution mode"):
+        InsightFlowCore({**mock_config, "execution_mode": "parallel"})
+
+def test_strategies_are_constructed_on_first_use(mock_config):
+    with patch('app.core.insight_flow_core.GPTSummarizer', autospec=True) as MockGPTSummarizer:
+        core = InsightFlowCore(mock_config)
+        MockGPTSummarizer.assert_not_called()
+
+        assert core.summarizer is MockGPTSummarizer.return_value
+        assert core.summarizer is MockGPTSummarizer.return_value
+        MockGPTSummarizer.assert_called_once_with(api_key="mock_openai_key")
+    assert set(core.module_load_ms) == {"summarizer"}
+
+def test_eager_loading_constructs_strategies_at_init(mock_config):
+    with patch('app.core.insight_flow_core.GPTSummarizer', autospec=True) as MockGPTSummarizer:
+        core = InsightFlowCore({**mock_config, "lazy_modules": False})
+        MockGPTSummarizer.assert_called_once()
+    assert set(core.module_load_ms) == set(InsightFlowCore.MODULE_NAMES)
+
+def test_unknown_module_type_fails_at_init_even_when_lazy(mock_config):
+    with pytest.raises(ValueError, match="Unknown module type"):
+        InsightFlowCore({**mock_config, "summarizer_model_type": "no_such_summarizer"})
+
+def test_warm_up_loads_every_strategy_and_runs_a_sample(mock_config):
+    core = InsightFlowCore(mock_config)
+    timings = core.warm_up()
+
+    assert core.warmed_up
+    assert set(timings) == set(InsightFlowCore.MODULE_NAMES) | {"warmup_total"}
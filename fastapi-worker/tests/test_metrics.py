@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+import pytest
+from app.metrics import MetricsPublisher, MetricsRegistry, load_worker_snapshots
+from app.profiler import SamplingProfiler
+from app.reliable_queue import ReliableQueue
+from benchmarks.fake_redis import FakeRedis
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, stage="summarize")
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ["# HELP latency_seconds Latency.", "# TYPE latency_seconds histogram"]
+    assert 'latency_seconds_bucket{stage="summarize",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="summarize",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{stage="summarize",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{stage="summarize"} 4.05' in lines
+    assert 'latency_seconds_count{stage="summarize"} 4' in lines
+
+def test_labels_must_match_declaration():
+    counter = MetricsRegistry().counter("tasks_total", "Tasks.", ("status",))
+
+    with pytest.raises(ValueError):
+        counter.inc(outcome="completed")
+
+def test_worker_snapshots_round_trip_through_redis():
+    client = FakeRedis()
+    worker_registry = MetricsRegistry()
+    worker_registry.counter("tasks_total", "Tasks.", ("status",)).inc(3, status="completed")
+    MetricsPublisher(client, "host:42", worker_registry, interval_seconds=10).publish()
+
+    api_registry = MetricsRegistry()
+    api_registry.counter("tasks_total", "Tasks.", ("status",)).inc(status="completed")
+    text = api_registry.render(load_worker_snapshots(client))
+
+    assert text.count("# TYPE tasks_total counter") == 1
+    assert 'tasks_total{status="completed"} 1' in text
+    assert 'tasks_total{worker="host:42",status="completed"} 3' in text
+
+def test_expired_worker_snapshots_are_forgotten():
+    client = FakeRedis()
+    client.sadd("insightflow:metrics:workers", "gone:1")
+
+    assert load_worker_snapshots(client) == {}
+    assert client.smembers("insightflow:metrics:workers") == set()
+
+def test_queue_depths_cover_pending_in_flight_and_dead():
+    client = FakeRedis()
+    client.rpush("q", "a", "b", "c")
+    task_queue = ReliableQueue(client, "q", worker_id="w1")
+    task_queue.pop_batch(batch_size=2, linger_ms=0)
+    task_queue.dead_letter(b"a")
+
+    assert task_queue.depths() == {"pending": 1, "processing": 1, "dead": 1}
+
+def test_profiler_collects_collapsed_stacks(tmp_path):
+    profiler = SamplingProfiler(interval_ms=1, output_dir=str(tmp_path))
+    done = threading.Event()
+
+    def busy_worker():
+        while not done.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_worker)
+    worker.start()
+    profiler.toggle()
+    time.sleep(0.1)
+    path = profiler.stop()
+    done.set()
+    worker.join()
+
+    assert os.path.dirname(path) == str(tmp_path)
+    with open(path, encoding="utf-8") as f:
+        assert any("busy_worker" in line for line in f)
+    assert not profiler.running
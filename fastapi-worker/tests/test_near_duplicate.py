@@ -0,0 +1,165 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.core.insight_flow_core import HashedNgramEmbedder, InsightFlowCore
+from app.core.near_duplicate import NearDuplicateIndex
+
+COMPLAINT = "您好，我買的益生菌吃了之後胃部不適，想問怎麼退貨？"
+REWORDED = "我買的益生菌吃了之後胃部不適，想問怎麼退貨？謝謝"
+UNRELATED = "請問這個月有什麼促銷方案？"
+
+@pytest.fixture
+def near_duplicate_config():
+    return {
+        "OPENAI_API_KEY": "mock_openai_key",
+        "summarizer_model_type": "gpt_summarizer",
+        "sentiment_model_type": "hf_sentiment_analyzer",
+        "keyword_extractor_type": "keybert_extractor",
+        "intent_recognizer_type": "openai_function_calling_recognizer",
+        "sentiment_model_name": "mock-hf-model",
+        "recommender_config": {
+            "product_catalog_path": "/app/data/products.json",
+            "customer_segments_path": "/app/data/segments.json"
+        },
+        "result_cache": {"enabled": True},
+        "near_duplicate": {"enabled": True, "threshold": 0.9},
+    }
+
+def _unit(*values):
+    return np.array([values], dtype=np.float32)
+
+def test_search_reuses_only_results_above_threshold():
+    index = NearDuplicateIndex(fingerprint="fp", threshold=0.9)
+    index.add(_unit(1.0, 0.0), [{"v": 1}])
+
+    assert index.search(np.vstack([_unit(1.0, 0.1), _unit(1.0, 1.0)])) == [{"v": 1}, None]
+    assert index.stats() == {"hits": 1, "misses": 1, "evictions": 0, "entries": 1}
+
+def test_least_recently_used_entry_is_evicted():
+    index = NearDuplicateIndex(fingerprint="fp", threshold=0.99, max_entries=2)
+    index.add(np.vstack([_unit(1.0, 0.0, 0.0), _unit(0.0, 1.0, 0.0)]), [{"v": 1}, {"v": 2}])
+    index.search(_unit(1.0, 0.0, 0.0)) # Entry 1 is now the most recently used
+    index.add(_unit(0.0, 0.0, 1.0), [{"v": 3}])
+
+    assert index.search(np.vstack([_unit(1.0, 0.0, 0.0), _unit(0.0, 1.0, 0.0), _unit(0.0, 0.0, 1.0)])) == [
+        {"v": 1}, None, {"v": 3},
+    ]
+    assert index.stats()["evictions"] == 1
+
+def test_data_version_change_clears_the_index():
+    index = NearDuplicateIndex(fingerprint="fp")
+    index.add(_unit(1.0, 0.0), [{"v": 1}], data_version="catalog-1")
+
+    assert index.search(_unit(1.0, 0.0), data_version="catalog-2") == [None]
+    assert len(index) == 0
+
+def test_representatives_group_near_duplicates_within_a_batch():
+    vectors = HashedNgramEmbedder().embed_batch([COMPLAINT, UNRELATED, REWORDED, UNRELATED + " "])
+
+    assert NearDuplicateIndex(fingerprint="fp", threshold=0.9).representatives(vectors) == [0, 1, 0, 1]
+
+def test_index_persists_across_restarts(tmp_path):
+    index = NearDuplicateIndex(fingerprint="fp", threshold=0.9, persist_dir=str(tmp_path))
+    index.add(np.vstack([_unit(1.0, 0.0), _unit(0.0, 1.0)]), [{"摘要": ["胃部不適"]}, {"v": 2}], data_version="catalog-1")
+    assert index.save()
+
+    restarted = NearDuplicateIndex(fingerprint="fp", threshold=0.9, persist_dir=str(tmp_path))
+    assert restarted.search(_unit(1.0, 0.05), data_version="catalog-1") == [{"摘要": ["胃部不適"]}]
+    assert len(NearDuplicateIndex(fingerprint="other", persist_dir=str(tmp_path))) == 0
+
+    smaller = NearDuplicateIndex(fingerprint="fp", threshold=0.9, max_entries=1, persist_dir=str(tmp_path))
+    assert smaller.search(np.vstack([_unit(1.0, 0.0), _unit(0.0, 1.0)]), data_version="catalog-1") == [None, {"v": 2}]
+
+def test_interleaved_saves_never_mix_vectors_and_results(tmp_path, monkeypatch):
+    from app.core import near_duplicate
+
+    first = NearDuplicateIndex(fingerprint="fp", threshold=0.9, persist_dir=str(tmp_path))
+    first.add(np.vstack([_unit(1.0, 0.0), _unit(0.0, 1.0)]), [{"v": "first-a"}, {"v": "first-b"}])
+    second = NearDuplicateIndex(fingerprint="fp", threshold=0.9, persist_dir=str(tmp_path))
+    second.add(np.vstack([_unit(0.0, 1.0), _unit(1.0, 0.0)]), [{"v": "second-b"}, {"v": "second-a"}])
+
+    replace = os.replace
+    def replace_after_the_other_save(src, dst):
+        # The first consumer has written its vectors; the second saves completely before it continues
+        if dst.endswith(near_duplicate.ENTRIES_FILE) and not replaced:
+            replaced.append(dst)
+            second.save()
+        replace(src, dst)
+    replaced = []
+    monkeypatch.setattr(near_duplicate.os, "replace", replace_after_the_other_save)
+    assert first.save()
+    monkeypatch.undo()
+
+    restarted = NearDuplicateIndex(fingerprint="fp", threshold=0.9, persist_dir=str(tmp_path))
+    assert restarted.search(np.vstack([_unit(1.0, 0.0), _unit(0.0, 1.0)])) == [{"v": "first-a"}, {"v": "first-b"}]
+
+def test_stale_vector_files_are_removed(tmp_path, monkeypatch):
+    from app.core import near_duplicate
+
+    index = NearDuplicateIndex(fingerprint="fp", persist_dir=str(tmp_path))
+    index.add(_unit(1.0, 0.0), [{"v": 1}])
+    index.save()
+    index.save()
+    assert len(list(tmp_path.glob("vectors*.npy"))) == 2 # The older file may still be another save's, for now
+
+    monkeypatch.setattr(near_duplicate, "STALE_VECTORS_SECONDS", -1.0)
+    index.save()
+    assert len(list(tmp_path.glob("vectors*.npy"))) == 1
+    assert NearDuplicateIndex(fingerprint="fp", persist_dir=str(tmp_path)).search(_unit(1.0, 0.0)) == [{"v": 1}]
+
+def test_full_index_is_memory_mapped_and_still_writable(tmp_path):
+    index = NearDuplicateIndex(fingerprint="fp", threshold=0.9, max_entries=2, persist_dir=str(tmp_path))
+    index.add(np.vstack([_unit(1.0, 0.0, 0.0), _unit(0.0, 1.0, 0.0)]), [{"v": 1}, {"v": 2}])
+    index.save()
+
+    restarted = NearDuplicateIndex(fingerprint="fp", threshold=0.9, max_entries=2, persist_dir=str(tmp_path))
+    assert isinstance(restarted._vectors, np.memmap)
+    restarted.add(_unit(0.0, 0.0, 1.0), [{"v": 3}]) # Copy-on-write: the file is not modified
+    assert restarted.search(_unit(0.0, 0.0, 1.0)) == [{"v": 3}]
+    assert NearDuplicateIndex(fingerprint="fp", threshold=0.9, persist_dir=str(tmp_path)).search(
+        _unit(1.0, 0.0, 0.0)
+    ) == [{"v": 1}]
+
+def test_core_reuses_the_analysis_of_a_reworded_text(near_duplicate_config):
+    core = InsightFlowCore(near_duplicate_config)
+    analyzed = []
+    original = core.summarizer.summarize
+    core.summarizer.summarize = lambda text: analyzed.append(text) or original(text)
+
+    first = core.process_customer_feedback(COMPLAINT)
+    reworded = core.process_customer_feedback(REWORDED)
+    unrelated = core.process_customer_feedback(UNRELATED)
+
+    assert analyzed == [COMPLAINT, UNRELATED]
+    assert reworded == first
+    assert unrelated["意圖"]["intent"] == "促銷活動查詢"
+
+def test_core_batch_analyzes_near_duplicates_once(near_duplicate_config):
+    near_duplicate_config["result_cache"] = {"enabled": False}
+    core = InsightFlowCore(near_duplicate_config)
+    batches = []
+    original = core.summarizer.summarize_batch
+    core.summarizer.summarize_batch = lambda texts: batches.append(list(texts)) or original(texts)
+
+    results = core.process_customer_feedback_batch([COMPLAINT, UNRELATED, REWORDED])
+    again = core.process_customer_feedback_batch([REWORDED, UNRELATED])
+
+    assert batches == [[COMPLAINT, UNRELATED]]
+    assert results[2] == results[0] and results[2] is not results[0]
+    assert again == [results[0], results[1]]
+
+def test_texts_over_the_token_limit_are_always_analyzed(near_duplicate_config):
+    near_duplicate_config["near_duplicate"]["max_tokens"] = 10
+    core = InsightFlowCore(near_duplicate_config)
+    analyzed = []
+    original = core.summarizer.summarize
+    core.summarizer.summarize = lambda text: analyzed.append(text) or original(text)
+
+    core.process_customer_feedback(COMPLAINT)
+    core.process_customer_feedback(REWORDED)
+
+    assert analyzed == [COMPLAINT, REWORDED]
+    assert len(core.near_duplicates) == 0
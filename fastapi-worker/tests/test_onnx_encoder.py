@@ -0,0 +1,85 @@
+from app.core.insight_flow_core import InsightFlowCore, OnnxKeywordExtractor, OnnxSentimentAnalyzer
+from app.core.onnx_encoder import candidate_phrases, length_buckets, padded_length
+
+class FakeEncoder:
+    """Stands in for OnnxTextEncoder: canned vectors per text, pure-Python cosine similarity."""
+
+    def __init__(self, vectors, model_config=None):
+        self.vectors = vectors
+        self.model_config = model_config or {}
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        return [self.vectors[text] for text in texts]
+
+    def similarities(self, query, vectors):
+        def norm(vector):
+            return sum(value * value for value in vector) ** 0.5
+        return [sum(a * b for a, b in zip(query, vector)) / (norm(query) * norm(vector)) for vector in vectors]
+
+def test_padded_length_rounds_up_to_multiple():
+    assert [padded_length(length, 8) for length in (0, 1, 8, 9, 17)] == [8, 8, 8, 16, 24]
+
+def test_length_buckets_group_similar_lengths_and_cover_every_index():
+    lengths = [120, 5, 7, 118, 6, 300, 9]
+    buckets = length_buckets(lengths, max_batch_size=3, max_batch_tokens=10_000)
+
+    assert sorted(index for bucket in buckets for index in bucket) == list(range(len(lengths)))
+    assert buckets == [[1, 4, 2], [6, 3, 0], [5]]
+
+def test_length_buckets_respect_padded_token_budget():
+    buckets = length_buckets([64] * 10 + [256], max_batch_size=32, max_batch_tokens=256)
+
+    assert [len(bucket) for bucket in buckets] == [4, 4, 2, 1]
+    assert buckets[-1] == [10] # A long text gets a bucket of its own instead of padding the short ones
+
+def test_candidate_phrases_ranks_cjk_ngrams_and_latin_words_by_frequency():
+    candidates = candidate_phrases("胃部不適，胃部脹氣。Probiotic probiotic!", ngram_range=(2, 3))
+
+    assert candidates[:2] == ["胃部", "probiotic"]
+    assert "部不適" in candidates
+    assert len(candidate_phrases("胃" * 500, max_candidates=10)) <= 10
+
+def test_onnx_sentiment_maps_logits_to_labels():
+    analyzer = OnnxSentimentAnalyzer.__new__(OnnxSentimentAnalyzer)
+    analyzer.encoder = FakeEncoder({"好": [-2.0, 2.0], "差": [3.0, -1.0]})
+    analyzer.labels = {0: "negative", 1: "positive"}
+
+    assert analyzer.analyze_batch(["好", "差"]) == [
+        {"label": "positive", "score": 0.982}, {"label": "negative", "score": 0.982},
+    ]
+
+def test_onnx_keywords_embed_shared_candidates_once_and_skip_overlaps():
+    extractor = OnnxKeywordExtractor.__new__(OnnxKeywordExtractor)
+    extractor.max_candidates = 48
+    texts = ["胃部不適", "胃部不適，胃部不適"]
+    phrases = set(candidate_phrases(texts[0]) + candidate_phrases(texts[1]))
+    vectors = {phrase: [1.0, 0.1 * len(phrase)] for phrase in phrases}
+    vectors.update({"胃部不適": [1.0, 0.4], "胃部不適，胃部不適": [1.0, 0.4]})
+    extractor.encoder = FakeEncoder(vectors)
+
+    results = extractor.extract_batch(texts, top_n=3)
+
+    assert results == [["胃部不適"], ["胃部不適"]]
+    embedded = extractor.encoder.calls[0]
+    assert len(embedded) == len(set(embedded)) + 1 # "胃部不適" is both a text and a candidate
+
+def test_core_resolves_onnx_strategies_without_loading_them():
+    config = {
+        "summarizer_model_type": "gpt_summarizer",
+        "sentiment_model_type": "onnx_sentiment_analyzer",
+        "keyword_extractor_type": "onnx_keyword_extractor",
+        "intent_recognizer_type": "openai_function_calling_recognizer",
+        "recommender_config": {},
+        "onnx": {"sentiment_model_dir": "/models/sentiment-int8", "keyword_model_dir": "/models/keywords-int8",
+                 "max_batch_size": 16},
+    }
+    core = InsightFlowCore(config)
+
+    assert core._module_specs["sentiment_analyzer"] == (
+        OnnxSentimentAnalyzer, {"model_dir": "/models/sentiment-int8", "max_batch_size": 16}
+    )
+    assert core._module_specs["keyword_extractor"][1]["model_dir"] == "/models/keywords-int8"
+    assert core.module_load_ms == {}
+    assert core._module_fingerprint() != InsightFlowCore({**config, "onnx": {**config["onnx"], "max_length": 128}})._module_fingerprint()
@@ -0,0 +1,63 @@
+import os
+from app.core.insight_flow_core import InsightFlowCore, AhoCorasickKeywordExtractor, AhoCorasickIntentRecognizer
+from app.core.pattern_matcher import AhoCorasickMatcher, PatternMatch
+
+TERM_DICTIONARY_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "data", "term_dictionary.json")
+
+def test_matcher_reports_overlapping_matches_with_positions():
+    matcher = AhoCorasickMatcher(["促銷", "促銷方案", "方案", "he", "she", "hers"])
+
+    assert matcher.find_all("想問促銷方案") == [
+        PatternMatch("促銷", 2, 4),
+        PatternMatch("促銷方案", 2, 6),
+        PatternMatch("方案", 4, 6),
+    ]
+    assert [(m.term, m.start) for m in matcher.find_all("uSHERS")] == [("she", 1), ("he", 2), ("hers", 2)]
+
+def test_matcher_positions_survive_characters_that_lowercase_to_several():
+    text = "İİ 促銷 İstanbul ΟΔΟΣ"
+    matcher = AhoCorasickMatcher(["促銷", "istanbul", "İstanbul", "οδοσ"])
+
+    matches = matcher.find_all(text)
+
+    assert [(m.term, text[m.start:m.end]) for m in matches] == [
+        ("促銷", "促銷"), ("İstanbul", "İstanbul"), ("οδοσ", "ΟΔΟΣ"),
+    ]
+
+def test_matcher_counts_in_order_of_first_appearance():
+    matcher = AhoCorasickMatcher(["失眠", "胃痛"])
+
+    assert matcher.count("胃痛又失眠，失眠好幾天") == {"胃痛": 1, "失眠": 2}
+    assert matcher.count("沒有相關字詞") == {}
+
+def test_keyword_extractor_ranks_by_count():
+    extractor = AhoCorasickKeywordExtractor(TERM_DICTIONARY_PATH)
+
+    assert extractor.extract("想買保健食品改善睡眠品質，睡眠品質真的很差") == ["睡眠品質", "保健食品"]
+    assert extractor.extract("益生菌、魚油、葉黃素、維他命、膠原蛋白、保健食品", top_n=3) == ["益生菌", "魚油", "葉黃素"]
+
+def test_intent_recognizer_follows_rule_order():
+    recognizer = AhoCorasickIntentRecognizer(TERM_DICTIONARY_PATH)
+
+    intent = recognizer.recognize("有優惠嗎？最近胃痛又脹氣")
+    assert intent == {"intent": "健康問題諮詢", "product_category": "腸胃照護產品", "matched_terms": {"胃痛": 1, "脹氣": 1}}
+    assert recognizer.recognize("請問有折扣嗎")["intent"] == "促銷活動查詢"
+    assert recognizer.recognize("你好") == {"intent": "產品諮詢", "product_category": "保健食品"}
+
+def test_core_selects_aho_corasick_strategies_by_type():
+    core = InsightFlowCore({
+        "summarizer_model_type": "gpt_summarizer",
+        "sentiment_model_type": "hf_sentiment_analyzer",
+        "keyword_extractor_type": "aho_corasick_extractor",
+        "intent_recognizer_type": "aho_corasick_recognizer",
+        "term_dictionary_path": TERM_DICTIONARY_PATH,
+        "recommender_config": {
+            "product_catalog_path": "/app/data/products.json",
+            "customer_segments_path": "/app/data/segments.json"
+        },
+    })
+
+    result = core.process_customer_feedback("顧客抱怨胃部不適，希望有促銷方案。")
+
+    assert result["關鍵字"] == ["胃部不適", "促銷方案"]
+    assert result["意圖"]["product_category"] == "腸胃照護產品"
@@ -0,0 +1,117 @@
+import json
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from app import consumer
+from app.metrics import QUEUE_WAIT_DURATION
+from app.priority_lanes import PriorityLaneQueue, WeightedLaneScheduler, parse_lane_weights
+from benchmarks.fake_redis import FakeRedis
+
+QUEUE = "test_queue"
+WEIGHTS = {"interactive": 8, "standard": 3, "bulk": 1}
+
+def _task(task_id, priority="standard", **extra):
+    return json.dumps({"task_id": task_id, "text_content": f"text {task_id}", "priority": priority, **extra})
+
+def _ids(raw_tasks):
+    return [json.loads(raw)["task_id"] for raw in raw_tasks]
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def lanes():
+    return PriorityLaneQueue(FakeRedis(), QUEUE, WEIGHTS, worker_id="w1", idle_poll_seconds=0.01)
+
+def test_parse_lane_weights():
+    assert parse_lane_weights("interactive=8, standard=3,bulk=1") == WEIGHTS
+    with pytest.raises(ValueError, match="Unknown priority lane"):
+        parse_lane_weights("interactive=8,standard=3,bulk=1,urgent=9")
+    with pytest.raises(ValueError, match="positive integer"):
+        parse_lane_weights("interactive=0,standard=3,bulk=1")
+    with pytest.raises(ValueError, match="No weight"):
+        parse_lane_weights("interactive=8,standard=3")
+
+def test_scheduler_shares_slots_by_weight_and_interleaves():
+    scheduler = WeightedLaneScheduler(WEIGHTS)
+    plan = scheduler.plan({"interactive": 100, "standard": 100, "bulk": 100}, slots=12)
+
+    assert {lane: plan.count(lane) for lane in WEIGHTS} == {"interactive": 8, "standard": 3, "bulk": 1}
+    assert plan[:5] == ["interactive", "standard", "interactive", "interactive", "bulk"] # Smooth: lanes interleave
+
+def test_scheduler_only_uses_lanes_with_a_backlog():
+    scheduler = WeightedLaneScheduler(WEIGHTS)
+
+    assert scheduler.plan({"interactive": 1, "bulk": 50}, slots=4) == ["interactive", "bulk", "bulk", "bulk"]
+    assert scheduler.plan({}, slots=4) == []
+
+def test_starved_lane_is_served_first():
+    clock = FakeClock()
+    scheduler = WeightedLaneScheduler({"interactive": 100, "standard": 1, "bulk": 1}, starvation_seconds=5, clock=clock)
+    backlog = {"interactive": 1000, "bulk": 1000}
+
+    picks = []
+    for _ in range(20): # One slow single-task batch per second
+        plan = scheduler.plan(backlog, slots=1)
+        scheduler.served(plan)
+        picks.extend(plan)
+        clock.now += 1.0
+
+    assert "bulk" in picks[:6] # Weight alone would give bulk 1 slot in 101
+    assert picks.count("bulk") >= 3
+
+def test_interactive_tasks_jump_a_bulk_backfill(lanes):
+    for i in range(50):
+        lanes.push(_task(f"bulk-{i}", "bulk"), "bulk")
+    lanes.push(_task("agent-1", "interactive"), "interactive")
+    lanes.push(_task("agent-2", "interactive"), "interactive")
+
+    batch = lanes.pop_batch(batch_size=4, linger_ms=0)
+
+    assert _ids(batch)[:2] == ["agent-1", "agent-2"]
+    assert _ids(batch)[2:] == ["bulk-0", "bulk-1"]
+    assert lanes.depths() == {"pending": 48, "processing": 4, "dead": 0}
+
+def test_standard_lane_is_the_plain_queue_and_unknown_lanes_fall_back_to_it(lanes):
+    lanes.push(_task("laravel-1"))
+    lanes.push(_task("odd-1"), "urgent")
+
+    assert lanes.lane_key("standard") == QUEUE
+    assert lanes.lane_key("bulk") == f"{QUEUE}:bulk"
+    assert lanes.client.llen(QUEUE) == 2
+
+def test_ack_and_nack_go_back_to_the_tasks_lane(lanes):
+    lanes.push(_task("agent-1", "interactive"), "interactive")
+    lanes.push(_task("bulk-1", "bulk"), "bulk")
+    interactive_task, bulk_task = lanes.pop_batch(batch_size=2, linger_ms=0)
+
+    assert lanes.lane_of(bulk_task) == "bulk"
+    assert lanes.ack(interactive_task) is True
+    lanes.nack(bulk_task)
+
+    assert lanes.lane_depths()["interactive"] == {"pending": 0, "processing": 0, "dead": 0}
+    assert lanes.lane_depths()["bulk"] == {"pending": 1, "processing": 0, "dead": 0}
+
+def test_idle_pop_returns_empty_after_block_timeout(lanes):
+    start = time.monotonic()
+
+    assert lanes.pop_batch(batch_size=4, linger_ms=0, block_timeout=0.05) == []
+    assert time.monotonic() - start < 1.0
+
+def test_consumer_records_queue_wait_per_lane(lanes):
+    lanes.push(_task("agent-1", "interactive", enqueued_at=time.time() - 2.0), "interactive")
+    raw_tasks = lanes.pop_batch(batch_size=1, linger_ms=0)
+    core = MagicMock()
+    core.process_customer_feedback_batch.side_effect = lambda texts: [{"摘要": [t]} for t in texts]
+    before = QUEUE_WAIT_DURATION.count(lane="interactive")
+
+    with patch.object(consumer, "insight_flow", core), \
+         patch.object(consumer, "update_laravel_task_status", return_value=True):
+        consumer.process_task_batch(lanes, raw_tasks)
+
+    assert QUEUE_WAIT_DURATION.count(lane="interactive") == before + 1
+    assert lanes.lane_depths()["interactive"]["processing"] == 0 # Acked in its own lane
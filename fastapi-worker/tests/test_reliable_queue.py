@@ -0,0 +1,112 @@
+import json
+import pytest
+from app.reliable_queue import ReliableQueue
+from benchmarks.fake_redis import FakeRedis
+
+QUEUE = "test_queue"
+
+def _task(i):
+    return json.dumps({"task_id": f"task-{i}", "text_content": f"text {i}"}).encode("utf-8")
+
+def _ids(raw_tasks):
+    return [json.loads(raw)["task_id"] for raw in raw_tasks]
+
+@pytest.fixture
+def fake_redis():
+    client = FakeRedis()
+    client.rpush(QUEUE, *[_task(i) for i in range(5)]) # Same as Laravel's RPUSH
+    return client
+
+def test_pop_batch_is_fifo_and_tracks_in_flight_tasks(fake_redis):
+    queue = ReliableQueue(fake_redis, QUEUE, worker_id="w1")
+
+    batch = queue.pop_batch(batch_size=3, linger_ms=0)
+
+    assert _ids(batch) == ["task-0", "task-1", "task-2"]
+    assert _ids(fake_redis.lrange(queue.processing_key, 0, -1)) == ["task-0", "task-1", "task-2"]
+    assert fake_redis.llen(QUEUE) == 2
+
+def test_pop_batch_returns_partial_batch_after_linger(fake_redis):
+    queue = ReliableQueue(fake_redis, QUEUE, worker_id="w1")
+
+    assert len(queue.pop_batch(batch_size=10, linger_ms=10)) == 5
+    assert fake_redis.llen(QUEUE) == 0
+
+def test_ack_removes_task_from_processing_list(fake_redis):
+    queue = ReliableQueue(fake_redis, QUEUE, worker_id="w1")
+    batch = queue.pop_batch(batch_size=2, linger_ms=0)
+
+    assert queue.ack(batch[0]) is True
+    assert queue.ack(batch[0]) is False # Already gone
+    assert _ids(fake_redis.lrange(queue.processing_key, 0, -1)) == ["task-1"]
+
+def test_nack_requeues_at_tail(fake_redis):
+    queue = ReliableQueue(fake_redis, QUEUE, worker_id="w1")
+    batch = queue.pop_batch(batch_size=1, linger_ms=0)
+
+    queue.nack(batch[0])
+
+    assert fake_redis.llen(queue.processing_key) == 0
+    assert _ids(fake_redis.lrange(QUEUE, 0, -1)) == ["task-1", "task-2", "task-3", "task-4", "task-0"]
+
+def test_reaper_requeues_tasks_of_expired_worker_at_head_in_order(fake_redis):
+    crashed = ReliableQueue(fake_redis, QUEUE, worker_id="crashed")
+    crashed.pop_batch(batch_size=2, linger_ms=0)
+    fake_redis.delete(crashed.lease_key_for("crashed")) # Lease ran past the visibility timeout
+
+    reaper = ReliableQueue(fake_redis, QUEUE, worker_id="reaper")
+    assert reaper.reap_expired() == 2
+
+    assert _ids(fake_redis.lrange(QUEUE, 0, -1)) == ["task-0", "task-1", "task-2", "task-3", "task-4"]
+    assert fake_redis.llen(crashed.processing_key) == 0
+    assert b"crashed" not in fake_redis.smembers(reaper.workers_key)
+
+def test_late_ack_from_a_stuck_worker_does_not_mix_up_reclaimed_tasks(fake_redis):
+    stuck = ReliableQueue(fake_redis, QUEUE, worker_id="stuck")
+    stuck.pop_batch(batch_size=2, linger_ms=0)
+    fake_redis.delete(stuck.lease_key_for("stuck"))
+    reaper = ReliableQueue(fake_redis, QUEUE, worker_id="reaper")
+
+    hincrby = fake_redis.hincrby
+    counted = []
+    def ack_while_counting(key, field, amount=1):
+        if not counted: # The stuck worker finishes task-1 just as the reaper counts a delivery
+            assert stuck.ack(_task(1)) is False # Already taken over by the reaper
+        counted.append(field)
+        return hincrby(key, field, amount)
+    fake_redis.hincrby = ack_while_counting
+
+    assert reaper.reap_expired() == 2
+
+    assert counted == [reaper._task_digest(_task(1)), reaper._task_digest(_task(0))]
+    assert _ids(fake_redis.lrange(QUEUE, 0, -1)) == ["task-0", "task-1", "task-2", "task-3", "task-4"]
+    assert fake_redis.llen(reaper.processing_key) == 0
+
+def test_reaper_leaves_live_workers_alone(fake_redis):
+    ReliableQueue(fake_redis, QUEUE, worker_id="alive").pop_batch(batch_size=2, linger_ms=0)
+
+    assert ReliableQueue(fake_redis, QUEUE, worker_id="reaper").reap_expired() == 0
+    assert fake_redis.llen(QUEUE) == 3
+
+def test_task_is_dead_lettered_after_max_deliveries(fake_redis):
+    reaper = ReliableQueue(fake_redis, QUEUE, worker_id="reaper", max_deliveries=2)
+    for attempt in range(2):
+        worker = ReliableQueue(fake_redis, QUEUE, worker_id=f"worker-{attempt}")
+        worker.pop_batch(batch_size=1, linger_ms=0)
+        fake_redis.delete(worker.lease_key_for(worker.worker_id))
+        reaper.reap_expired()
+
+    assert _ids(fake_redis.lrange(reaper.dead_letter_key, 0, -1)) == ["task-0"]
+    assert _ids(fake_redis.lrange(QUEUE, 0, -1)) == ["task-1", "task-2", "task-3", "task-4"]
+
+def test_maybe_reap_is_rate_limited_across_workers(fake_redis):
+    first = ReliableQueue(fake_redis, QUEUE, worker_id="first", reaper_interval=60)
+    second = ReliableQueue(fake_redis, QUEUE, worker_id="second", reaper_interval=60)
+    stuck = ReliableQueue(fake_redis, QUEUE, worker_id="stuck")
+    stuck.pop_batch(batch_size=1, linger_ms=0)
+    fake_redis.delete(stuck.lease_key_for("stuck"))
+
+    assert first.maybe_reap() == 1
+    stuck.pop_batch(batch_size=1, linger_ms=0)
+    fake_redis.delete(stuck.lease_key_for("stuck"))
+    assert second.maybe_reap() == 0 # first holds the reaper lock
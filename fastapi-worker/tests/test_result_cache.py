@@ -0,0 +1,90 @@
+import os
+import pytest
+from app.core.insight_flow_core import InsightFlowCore
+from app.core.result_cache import ResultCache, normalize_text
+from benchmarks.fake_redis import FakeRedis
+
+@pytest.fixture
+def cached_config():
+    return {
+        "OPENAI_API_KEY": "mock_openai_key",
+        "summarizer_model_type": "gpt_summarizer",
+        "sentiment_model_type": "hf_sentiment_analyzer",
+        "keyword_extractor_type": "keybert_extractor",
+        "intent_recognizer_type": "openai_function_calling_recognizer",
+        "sentiment_model_name": "mock-hf-model",
+        "recommender_config": {
+            "product_catalog_path": "/app/data/products.json",
+            "customer_segments_path": "/app/data/segments.json"
+        },
+        "result_cache": {"enabled": True, "max_entries": 2},
+    }
+
+def test_normalize_text_collapses_whitespace_and_width():
+    assert normalize_text("  顧客抱怨\n胃部不適  ！") == normalize_text("顧客抱怨 胃部不適 !")
+
+def test_lru_evicts_least_recently_used_entry():
+    cache = ResultCache(fingerprint="fp", max_entries=2)
+    keys = [cache.make_key(text) for text in ("a", "b", "c")]
+    cache.set(keys[0], {"v": 1})
+    cache.set(keys[1], {"v": 2})
+    cache.get(keys[0]) # "a" is now most recently used
+    cache.set(keys[2], {"v": 3})
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == {"v": 1}
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+def test_redis_tier_serves_other_processes():
+    shared_redis = FakeRedis()
+    writer = ResultCache(fingerprint="fp", redis_client=shared_redis, redis_ttl_seconds=60)
+    reader = ResultCache(fingerprint="fp", redis_client=shared_redis)
+    writer.set(writer.make_key("text"), {"v": 1})
+
+    assert reader.get(reader.make_key("text")) == {"v": 1}
+    assert reader.stats()["redis_hits"] == 1
+
+def test_core_reuses_cached_result(cached_config):
+    core = InsightFlowCore(cached_config)
+    calls = []
+    original = core.summarizer.summarize
+    core.summarizer.summarize = lambda text: calls.append(text) or original(text)
+
+    first = core.process_customer_feedback("顧客抱怨胃部不適。")
+    first["摘要"].append("mutated by caller")
+    second = core.process_customer_feedback("  顧客抱怨胃部不適。 ")
+
+    assert len(calls) == 1
+    assert "mutated by caller" not in second["摘要"]
+    assert core.result_cache.stats() == {"hits": 1, "misses": 1, "redis_hits": 0, "local_entries": 1}
+
+def test_core_batch_analyzes_duplicates_once(cached_config):
+    core = InsightFlowCore(cached_config)
+    calls = []
+    original = core.summarizer.summarize_batch
+    core.summarizer.summarize_batch = lambda texts: calls.append(list(texts)) or original(texts)
+
+    results = core.process_customer_feedback_batch(["同一段文字", "另一段文字", "同一段文字"])
+
+    assert calls == [["同一段文字", "另一段文字"]]
+    assert results[0] == results[2] and results[0] is not results[2]
+
+def test_changing_strategies_changes_cache_namespace(cached_config):
+    core = InsightFlowCore(cached_config)
+    other_core = InsightFlowCore({**cached_config, "sentiment_model_name": "another-model"})
+
+    assert core.result_cache.make_key("text") != other_core.result_cache.make_key("text")
+
+def test_catalog_reload_changes_cache_key(cached_config, tmp_path):
+    products_path = tmp_path / "products.json"
+    products_path.write_text("[]", encoding="utf-8")
+    cached_config["recommender_config"] = {"product_catalog_path": str(products_path), "reload_interval_seconds": 0}
+    core = InsightFlowCore(cached_config)
+    core.process_customer_feedback("顧客抱怨胃部不適。")
+
+    products_path.write_text('[{"sku": "GUT-1", "category": "腸胃照護產品"}]', encoding="utf-8")
+    os.utime(products_path, ns=(0, os.stat(products_path).st_mtime_ns + 1_000_000_000))
+    assert core.recommender.catalog.reload() is True
+    core.process_customer_feedback("顧客抱怨胃部不適。")
+
+    assert core.result_cache.stats()["misses"] == 2 # Results cached against the old catalog are not reused
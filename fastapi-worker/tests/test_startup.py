@@ -0,0 +1,22 @@
+import json
+import os
+import subprocess
+import sys
+
+WORKER_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+def _import_in_fresh_interpreter(statement):
+    code = (
+        f"{statement}\nimport json, sys\n"
+        "print(json.dumps(sorted(m for m in ('torch', 'transformers', 'keybert', 'sentence_transformers', 'openai') if m in sys.modules)))"
+    )
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=WORKER_DIR)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def test_importing_the_api_does_not_import_model_libraries():
+    assert _import_in_fresh_interpreter("import app.main") == []
+
+def test_importing_the_consumer_does_not_build_the_core():
+    assert _import_in_fresh_interpreter(
+        "import app.consumer\nassert app.consumer.insight_flow is None and app.consumer.r is None"
+    ) == []
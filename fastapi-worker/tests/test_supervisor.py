@@ -0,0 +1,45 @@
+import gc
+import os
+import signal
+import threading
+import time
+import pytest
+from app.supervisor import WorkerSupervisor
+
+def _wait_for_sigterm(worker_index):
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    stop.wait(10)
+
+@pytest.fixture
+def supervisor():
+    supervisor = WorkerSupervisor(num_workers=2, target=_wait_for_sigterm, shutdown_timeout=5, min_restart_interval=0)
+    yield supervisor
+    supervisor.stop()
+    gc.unfreeze()
+
+def test_supervisor_restarts_crashed_worker(supervisor):
+    supervisor.start()
+    assert sorted(supervisor.children.values()) == [0, 1]
+
+    crashed_pid = next(pid for pid, index in supervisor.children.items() if index == 1)
+    os.kill(crashed_pid, signal.SIGKILL)
+    deadline = time.monotonic() + 5
+    while supervisor.restarts == 0 and time.monotonic() < deadline:
+        supervisor.reap()
+        time.sleep(0.05)
+
+    assert supervisor.restarts == 1
+    assert crashed_pid not in supervisor.children
+    assert sorted(supervisor.children.values()) == [0, 1]
+
+def test_supervisor_stop_drains_all_workers(supervisor):
+    supervisor.start()
+    pids = list(supervisor.children)
+
+    supervisor.stop()
+
+    assert supervisor.children == {}
+    for pid in pids:
+        with pytest.raises(ChildProcessError):
+            os.waitpid(pid, os.WNOHANG)
@@ -0,0 +1,72 @@
+import json
+import pytest
+from pydantic import ValidationError
+from app.wire_format import (
+    JSON_VERSION, MSGPACK_VERSION, accepted_version, decode_task, encode_status_updates,
+    encode_task, publish_accepted_version, wire_version_key,
+)
+from benchmarks.fake_redis import FakeRedis
+
+TASK = {"task_id": "task-1", "text_content": "顧客抱怨胃部不適。", "priority": "interactive", "enqueued_at": 1700000000.5}
+
+def test_legacy_json_without_version_still_decodes():
+    payload = decode_task(b'{"task_id": "task-1", "text_content": "text"}')
+
+    assert (payload.task_id, payload.text_content, payload.priority) == ("task-1", "text", "standard")
+
+def test_json_round_trip():
+    payload = decode_task(encode_task(TASK))
+
+    assert payload.model_dump() == TASK # The version field is not part of the payload
+
+def test_malformed_tasks_fail_validation():
+    with pytest.raises(ValidationError):
+        decode_task(encode_task({"task_id": 42, "text_content": "text"}))
+    with pytest.raises(ValidationError):
+        decode_task(encode_task({"task_id": "task-1", "text_content": "text", "priority": "urgent"}))
+    with pytest.raises(ValidationError):
+        decode_task(b'{"task_id": "task-1", "text_con')
+    with pytest.raises(ValidationError):
+        decode_task(b"[1, 2]")
+    assert decode_task(encode_task({**TASK, "enqueued_at": "1700000000.5"})).enqueued_at == 1700000000.5
+
+def test_unknown_version_is_rejected():
+    with pytest.raises(ValidationError, match="v"):
+        decode_task(json.dumps({"v": 9, **TASK}))
+
+def test_msgpack_round_trip():
+    pytest.importorskip("msgpack")
+    raw = encode_task(TASK, version=MSGPACK_VERSION)
+
+    assert len(raw) < len(json.dumps(TASK).encode("utf-8"))
+    assert decode_task(raw).model_dump() == TASK
+
+def test_consumers_advertise_msgpack_only_when_they_can_decode_it():
+    client = FakeRedis()
+
+    assert publish_accepted_version(client, "q", "json") == JSON_VERSION
+    assert client.get(wire_version_key("q")) == b"1"
+    try:
+        import msgpack # noqa: F401
+        expected = MSGPACK_VERSION
+    except ImportError:
+        expected = JSON_VERSION
+    assert accepted_version("msgpack") == expected
+
+def test_status_updates_encode_to_compact_json():
+    updates = [("task-1", "processing", None), ("task-2", "completed", {"analysis_output": {"摘要": ["胃部不適"]}})]
+    body, content_type = encode_status_updates(updates)
+
+    assert content_type == "application/json"
+    assert b", " not in body and b": " not in body
+    assert json.loads(body) == {"updates": [
+        {"task_id": "task-1", "status": "processing", "result": None},
+        {"task_id": "task-2", "status": "completed", "result": {"analysis_output": {"摘要": ["胃部不適"]}}},
+    ]}
+
+def test_status_updates_encode_to_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+    body, content_type = encode_status_updates([("task-1", "completed", {"摘要": ["x"]})], wire_format="msgpack")
+
+    assert content_type == "application/x-msgpack"
+    assert msgpack.unpackb(body) == {"updates": [{"task_id": "task-1", "status": "completed", "result": {"摘要": ["x"]}}]}
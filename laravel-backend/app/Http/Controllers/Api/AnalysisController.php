@@ -27,7 +27,7 @@ class AnalysisController extends Controller
             ]);
 
             // Dispatch job to Redis Queue, which will be consumed by FastAPI worker via its own Redis consumer
-            ProcessAnalysisTask::dispatch($task->uuid, $request->input('text_content'));
+            ProcessAnalysisTask::dispatch($task->uuid, $request->input('text_content'), $request->input('priority') ?? 'standard'); // null or "" mean the default lane
 
             Log::info("Analysis task submitted: " . $task->uuid);
 
@@ -5,7 +5,9 @@ namespace App\Http\Controllers\Api;
 use App\Http\Controllers\Controller;
 use App\Models\AnalysisTask;
 use Illuminate\Http\Request;
+use Illuminate\Support\Facades\DB;
 use Illuminate\Support\Facades\Log;
+use Illuminate\Support\Facades\Validator;
 use Illuminate\Validation\ValidationException;
 
 class InternalAnalysisUpdateController extends Controller
@@ -48,4 +50,82 @@ class InternalAnalysisUpdateController extends Controller
             return response()->json(['error' => 'Internal server error', 'details' => $e->getMessage()], 500);
         }
     }
+
+    /**
+     * Internal bulk endpoint: the FastAPI worker coalesces status updates for many tasks into one request.
+     * Tasks that no longer exist are reported back in `missing`, and malformed updates in `rejected`
+     * (their task_id, where there is one), instead of failing the whole batch.
+     * The body is JSON or, with Content-Type application/x-msgpack, msgpack.
+     */
+    public function bulkUpdateStatus(Request $request)
+    {
+        // Workers with CALLBACK_WIRE_FORMAT=msgpack send the same body as msgpack
+        if (str_starts_with((string) $request->header('Content-Type'), 'application/x-msgpack')) {
+            if (!function_exists('msgpack_unpack')) {
+                return response()->json(['error' => 'msgpack bodies need the PHP msgpack extension'], 415);
+            }
+            $body = msgpack_unpack($request->getContent());
+            if (!is_array($body)) {
+                return response()->json(['error' => 'Invalid msgpack body'], 400);
+            }
+            $request->merge($body);
+        }
+
+        try {
+            $validatedData = $request->validate([
+                'updates' => 'required|array|min:1|max:500',
+            ]);
+
+            // Each update is validated on its own: one bad entry must not fail (and re-queue) its neighbours
+            $valid = [];
+            $rejected = [];
+            foreach ($validatedData['updates'] as $update) {
+                $validator = Validator::make(is_array($update) ? $update : [], [
+                    'task_id' => 'required|uuid',
+                    'status' => 'required|string|in:processing,completed,failed',
+                    'result' => 'nullable|array',
+                ]);
+                if ($validator->fails()) {
+                    $rejected[] = is_array($update) && is_string($update['task_id'] ?? null) ? $update['task_id'] : null;
+                    Log::warning("Internal bulk update: rejected update", ['update' => $update, 'errors' => $validator->errors()->toArray()]);
+                    continue;
+                }
+                $valid[] = $validator->validated();
+            }
+
+            $updates = collect($valid)->keyBy('task_id'); // Last update per task wins
+            $tasks = AnalysisTask::whereIn('uuid', $updates->keys())->get()->keyBy('uuid');
+
+            DB::transaction(function () use ($updates, $tasks) {
+                foreach ($tasks as $uuid => $task) {
+                    $update = $updates[$uuid];
+                    $task->status = $update['status'];
+                    if (isset($update['result'])) {
+                        $task->result = $update['result'];
+                    }
+                    $task->save();
+                }
+            });
+
+            $missing = $updates->keys()->diff($tasks->keys())->values();
+            if ($missing->isNotEmpty()) {
+                Log::warning("Internal bulk update: tasks not found: " . $missing->implode(', '));
+            }
+            Log::info("Internal bulk update: {$tasks->count()} tasks updated");
+
+            return response()->json([
+                'message' => 'Task statuses updated successfully',
+                'updated' => $tasks->count(),
+                'missing' => $missing,
+                'rejected' => $rejected,
+            ]);
+
+        } catch (ValidationException $e) {
+            Log::error("Internal bulk update validation error: " . $e->getMessage(), ['errors' => $e->errors()]);
+            return response()->json(['error' => 'Validation failed', 'details' => $e->errors()], 422);
+        } catch (\Exception $e) {
+            Log::error("Internal bulk update failed: " . $e->getMessage(), ['exception' => $e]);
+            return response()->json(['error' => 'Internal server error', 'details' => $e->getMessage()], 500);
+        }
+    }
 }
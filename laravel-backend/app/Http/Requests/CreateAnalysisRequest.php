@@ -23,6 +23,7 @@ class CreateAnalysisRequest extends FormRequest
     {
         return [
             'text_content' => ['required', 'string', 'min:10', 'max:5000'],
+            'priority' => ['nullable', 'in:interactive,standard,bulk'],
         ];
     }
 
@@ -36,6 +37,7 @@ class CreateAnalysisRequest extends FormRequest
             'text_content.string' => '分析內容必須是文字。',
             'text_content.min' => '分析內容至少需要 :min 個字元。',
             'text_content.max' => '分析內容不能超過 :max 個字元。',
+            'priority.in' => '優先順序必須是 interactive、standard 或 bulk。',
         ];
     }
 }
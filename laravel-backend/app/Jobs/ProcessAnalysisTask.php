@@ -17,14 +17,17 @@ class ProcessAnalysisTask implements ShouldQueue
 
     protected $taskId;
     protected $textContent;
+    protected $priority;
 
     /**
      * Create a new job instance.
+     * $priority picks the worker queue lane: interactive, standard or bulk.
      */
-    public function __construct(string $taskId, string $textContent)
+    public function __construct(string $taskId, string $textContent, string $priority = 'standard')
     {
         $this->taskId = $taskId;
         $this->textContent = $textContent;
+        $this->priority = $priority;
     }
 
     /**
@@ -46,9 +49,19 @@ class ProcessAnalysisTask implements ShouldQueue
 
             // Push the task details to a Redis list/queue that FastAPI worker listens to
             // Using `lpush` or `rpush` to push to a list. `fastapi_analysis_queue` should be defined in .env
-            Redis::rpush(env('REDIS_QUEUE_NAME_FASTAPI', 'fastapi_analysis_queue'), json_encode([
+            // The standard lane is the queue itself; interactive and bulk tasks go to "<queue>:<priority>"
+            // Jobs serialized before lanes existed have no priority
+            $priority = $this->priority ?? 'standard';
+            $queueBase = env('REDIS_QUEUE_NAME_FASTAPI', 'fastapi_analysis_queue');
+            $queueName = $queueBase;
+            if ($priority !== 'standard') {
+                $queueName .= ':' . $priority;
+            }
+            Redis::rpush($queueName, $this->encodeMessage($queueBase, [
                 'task_id' => $this->taskId,
                 'text_content' => $this->textContent,
+                'priority' => $priority,
+                'enqueued_at' => microtime(true), // Lets the worker measure queue wait per lane
             ]));
 
             Log::info("Task {$this->taskId} successfully pushed to FastAPI Redis queue.");
@@ -62,4 +75,18 @@ class ProcessAnalysisTask implements ShouldQueue
             Log::error($errorMessage, ['exception' => $e]);
         }
     }
+
+    /**
+     * Encodes the task message in the wire format the workers accept (see fastapi-worker/app/wire_format.py).
+     * msgpack (version 2) is used only when FASTAPI_WIRE_FORMAT=msgpack, the msgpack extension is loaded and
+     * the workers advertise version 2 under "<queue>:wire_version"; otherwise JSON (version 1).
+     */
+    protected function encodeMessage(string $queueBase, array $fields): string
+    {
+        if (env('FASTAPI_WIRE_FORMAT', 'json') === 'msgpack' && function_exists('msgpack_pack')
+            && (int) Redis::get($queueBase . ':wire_version') >= 2) {
+            return msgpack_pack(['v' => 2] + $fields);
+        }
+        return json_encode(['v' => 1] + $fields);
+    }
 }
@@ -25,4 +25,5 @@ Route::prefix('analysis')->group(function () {
 // Internal API for worker callbacks (should be secured, e.g., with IP whitelisting or shared secret)
 Route::prefix('internal/analysis')->group(function () {
     Route::post('/update', [InternalAnalysisUpdateController::class, 'updateStatus']);
+    Route::post('/bulk-update', [InternalAnalysisUpdateController::class, 'bulkUpdateStatus']);
 });
@@ -71,6 +71,49 @@ class AnalysisApiTest extends TestCase
         $this->assertNotNull($pushedData);
         $this->assertEquals($task->uuid, $pushedData['task_id']);
         $this->assertEquals($textContent, $pushedData['text_content']);
+        $this->assertEquals(1, $pushedData['v']); // JSON wire version unless workers and producer opt into msgpack
+    }
+
+    /**
+     * Test that an interactive task is pushed onto the interactive lane of the FastAPI queue.
+     *
+     * @return void
+     */
+    public function test_interactive_task_is_pushed_to_interactive_lane()
+    {
+        $textContent = $this->faker->sentence(20);
+        $task = AnalysisTask::create([
+            'uuid' => (string) Str::uuid(),
+            'input_data' => $textContent,
+            'status' => 'pending',
+        ]);
+        $laneName = env('REDIS_QUEUE_NAME_FASTAPI', 'fastapi_analysis_queue') . ':interactive';
+        Redis::del($laneName);
+
+        (new ProcessAnalysisTask($task->uuid, $textContent, 'interactive'))->handle();
+
+        $pushedData = json_decode(Redis::rpop($laneName), true);
+        $this->assertEquals($task->uuid, $pushedData['task_id']);
+        $this->assertEquals('interactive', $pushedData['priority']);
+        $this->assertArrayHasKey('enqueued_at', $pushedData);
+    }
+
+    /**
+     * Test that an empty or null priority falls back to the standard lane instead of failing the dispatch.
+     *
+     * @return void
+     */
+    public function test_null_priority_is_dispatched_to_standard_lane()
+    {
+        foreach ([null, ''] as $priority) {
+            $response = $this->postJson('/api/analysis/submit', [
+                'text_content' => $this->faker->sentence(20),
+                'priority' => $priority,
+            ]);
+
+            $response->assertStatus(202);
+        }
+        Queue::assertPushed(ProcessAnalysisTask::class, 2);
     }
 
     /**
@@ -196,4 +239,66 @@ class AnalysisApiTest extends TestCase
         $response->assertStatus(422)
                  ->assertJsonValidationErrors(['status']);
     }
+
+    /**
+     * Test internal bulk update endpoint.
+     */
+    public function test_internal_bulk_update_task_statuses()
+    {
+        $tasks = collect(range(1, 2))->map(fn () => AnalysisTask::create([
+            'uuid' => (string) Str::uuid(),
+            'input_data' => 'Some input data',
+            'status' => 'queued_for_worker',
+            'result' => null,
+        ]));
+        $missingUuid = (string) Str::uuid();
+
+        $result = ['analysis_output' => ['summary' => ['Bulk Summary']]];
+        $response = $this->postJson('/api/internal/analysis/bulk-update', [
+            'updates' => [
+                ['task_id' => $tasks[0]->uuid, 'status' => 'completed', 'result' => $result],
+                ['task_id' => $tasks[1]->uuid, 'status' => 'failed', 'result' => ['error' => 'boom']],
+                ['task_id' => $missingUuid, 'status' => 'completed', 'result' => null],
+            ],
+        ]);
+
+        $response->assertStatus(200)
+                 ->assertJson(['updated' => 2, 'missing' => [$missingUuid]]);
+
+        $this->assertDatabaseHas('analysis_tasks', ['uuid' => $tasks[0]->uuid, 'status' => 'completed']);
+        $this->assertDatabaseHas('analysis_tasks', ['uuid' => $tasks[1]->uuid, 'status' => 'failed']);
+    }
+
+    /**
+     * Test internal bulk update with an invalid status: only that update is rejected.
+     */
+    public function test_internal_bulk_update_invalid_status()
+    {
+        $task = AnalysisTask::create([
+            'uuid' => (string) Str::uuid(),
+            'input_data' => 'Some input data',
+            'status' => 'queued_for_worker',
+        ]);
+        $invalidUuid = (string) Str::uuid();
+
+        $response = $this->postJson('/api/internal/analysis/bulk-update', [
+            'updates' => [
+                ['task_id' => $invalidUuid, 'status' => 'invalid_status'],
+                ['task_id' => $task->uuid, 'status' => 'completed', 'result' => null],
+            ],
+        ]);
+
+        $response->assertStatus(200)
+                 ->assertJson(['updated' => 1, 'rejected' => [$invalidUuid]]);
+        $this->assertDatabaseHas('analysis_tasks', ['uuid' => $task->uuid, 'status' => 'completed']);
+    }
+
+    /**
+     * Test internal bulk update without any updates.
+     */
+    public function test_internal_bulk_update_requires_updates()
+    {
+        $response = $this->postJson('/api/internal/analysis/bulk-update', ['updates' => []]);
+        $response->assertStatus(422);
+    }
 }